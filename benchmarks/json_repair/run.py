@@ -0,0 +1,69 @@
+"""
+Benchmark for file_utils.parse_json_lenient on malformed LLM JSON.
+
+corpus.jsonl holds one case per line: {"id", "fault", "text", "expected"}. "expected" is
+the value the text should parse to, or null when the JSON is unrecoverable (truncated,
+absent) and the caller must escalate to an LLM repair call.
+
+For each fault class the report shows how many cases the old fenced-block json.loads
+parsed, how many the lenient parser gets right, and its mean time per case. Every case
+the lenient parser fixes is a repair call (up to 2000 output tokens) not made.
+
+    PYTHONPATH=src python benchmarks/json_repair/run.py
+"""
+
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from libriscribe.utils.file_utils import parse_json_lenient
+
+CORPUS = Path(__file__).with_name("corpus.jsonl")
+REPEATS = 200
+
+
+def strict_fenced(text: str):
+    """What extract_json_from_markdown did before: json.loads of a closed ```json block, else None."""
+    start = text.find("```json")
+    if start == -1:
+        return None
+    end = text.find("```", start + 7)
+    if end == -1:
+        return None
+    try:
+        return json.loads(text[start + 7:end].strip())
+    except json.JSONDecodeError:
+        return None
+
+
+def main() -> int:
+    cases = [json.loads(line) for line in CORPUS.read_text(encoding="utf-8").splitlines() if line.strip()]
+    rows = defaultdict(lambda: {"cases": 0, "strict": 0, "lenient": 0, "seconds": 0.0})
+    failures = []
+    for case in cases:
+        row = rows[case["fault"]]
+        row["cases"] += 1
+        row["strict"] += strict_fenced(case["text"]) == case["expected"]
+        started = time.perf_counter()
+        for _ in range(REPEATS):
+            parsed = parse_json_lenient(case["text"])
+        row["seconds"] += (time.perf_counter() - started) / REPEATS
+        if parsed == case["expected"]:
+            row["lenient"] += 1
+        else:
+            failures.append((case["id"], parsed))
+
+    print(f"{'fault':<16}{'cases':>6}{'strict':>8}{'lenient':>9}{'mean us':>10}")
+    for fault, row in rows.items():
+        print(f"{fault:<16}{row['cases']:>6}{row['strict']:>8}{row['lenient']:>9}{row['seconds'] / row['cases'] * 1e6:>10.1f}")
+    total = {key: sum(row[key] for row in rows.values()) for key in ("cases", "strict", "lenient")}
+    print(f"{'total':<16}{total['cases']:>6}{total['strict']:>8}{total['lenient']:>9}")
+    for case_id, parsed in failures:
+        print(f"MISMATCH {case_id}: {parsed!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,13 +16,16 @@ setup(
         "pydantic-settings",
         "beautifulsoup4",
         "requests",
+        "httpx",
         "markdown",
         "fpdf",
-        "tenacity",
         "anthropic",
         "google-generativeai",
         "rich",
     ],
+    extras_require={
+        "tokenizers": ["tiktoken"],  # Exact token counts for OpenAI models
+    },
     entry_points={
         "console_scripts": [
             "scribemaster=libriscribe.main:app",
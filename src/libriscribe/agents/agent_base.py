@@ -9,9 +9,13 @@ logger = logging.getLogger(__name__)
 class Agent:
     """Base class for all agents."""
 
+    # Set to False on agents whose output should vary between runs (skips the response cache)
+    use_llm_cache = True
+
     def __init__(self, name: str, llm_client: LLMClient):  # Receive LLMClient
         self.name = name
-        self.llm_client = llm_client  # Use the passed LLMClient
+        # Each agent gets its own view of the shared client
+        self.llm_client = llm_client.for_agent(name, use_cache=self.use_llm_cache) if llm_client is not None else None
         self.logger = logging.getLogger(self.name)
 
     def execute(self, *args, **kwargs) -> Any:
@@ -1,14 +1,22 @@
 # src/libriscribe/agents/chapter_writer.py
 
+import asyncio
 import logging
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from libriscribe.agents.agent_base import Agent
 from libriscribe.utils import prompts_context as prompts
-from libriscribe.utils.file_utils import read_markdown_file, read_json_file, write_markdown_file, extract_json_from_markdown
+from libriscribe.utils.file_utils import read_markdown_file, read_json_file, extract_json_from_markdown
 from libriscribe.knowledge_base import ProjectKnowledgeBase, Chapter, Scene
-from libriscribe.utils.llm_client import LLMClient
-from libriscribe.utils.context_manager import get_previous_chapter_context
+from libriscribe.codex import MasterCodex
+from libriscribe.utils.llm_client import LLMClient, run_async
+from libriscribe.utils.llm_errors import LLMError
+from libriscribe.utils.codex_context import assemble_scene_context
+from libriscribe.utils.context_manager import get_previous_chapter_context, previous_chapter_context_from_text
+from libriscribe.utils.retrieval_index import RetrievalIndex, render_passages, scene_query
+from libriscribe.utils.scene_checkpoint import SceneCheckpoint
+from libriscribe.utils.summary_store import SummaryStore
+from libriscribe.utils.streaming import ensure_prefix, stream_to_file
 
 import json
 from rich.console import Console
@@ -24,115 +32,314 @@ class ChapterWriterAgent(Agent):
         super().__init__("ChapterWriterAgent", llm_client)
 
 
-    def execute(self, project_knowledge_base: ProjectKnowledgeBase, chapter_number: int, output_path: Optional[str] = None) -> None:
-        """Writes a chapter scene by scene."""
+    def ensure_chapter_outline(self, project_knowledge_base: ProjectKnowledgeBase, chapter_number: int) -> Chapter:
+        """
+        The chapter from the knowledge base, first adding a default chapter or scene if the outline lacks
+        them. Once it has run, execute() leaves the knowledge base alone, so the chapter pipeline calls it
+        under its save lock before writing.
+        """
+        chapter = project_knowledge_base.get_chapter(chapter_number)
+        if not chapter:
+            console.print(f"[red]ERROR: Chapter {chapter_number} not found in knowledge base.[/red]")
+            # Create a default chapter if not found
+            chapter = Chapter(
+                chapter_number=chapter_number,
+                title=f"Chapter {chapter_number}",
+                summary="A new chapter in the unfolding story."
+            )
+            # Add a default scene
+            chapter.scenes.append(self._default_scene())
+            project_knowledge_base.add_chapter(chapter)
+            console.print(f"[yellow]Created default chapter {chapter_number} to proceed.[/yellow]")
+
+        # Make sure there's at least one scene
+        if not chapter.scenes:
+            console.print(f"[yellow]No scenes found for Chapter {chapter_number}. Creating a default scene.[/yellow]")
+            chapter.scenes.append(self._default_scene())
+        return chapter
+
+    @staticmethod
+    def _default_scene() -> Scene:
+        return Scene(
+            scene_number=1,
+            summary="The story continues with new developments.",
+            characters=["Shade"],
+            setting="Neo-London",
+            goal="Advance the plot",
+            emotional_beat="Tension"
+        )
+
+    def execute(self, project_knowledge_base: ProjectKnowledgeBase, chapter_number: int, output_path: Optional[str] = None,
+                previous_chapter_text: Optional[str] = None) -> None:
+        """
+        Writes a chapter scene by scene.
+        `previous_chapter_text` stands in for the previous chapter's file (e.g. a draft the chapter pipeline kept).
+        """
         try:
             # Get chapter data
-            chapter = project_knowledge_base.get_chapter(chapter_number)
-            if not chapter:
-                console.print(f"[red]ERROR: Chapter {chapter_number} not found in knowledge base.[/red]")
-                # Create a default chapter if not found
-                chapter = Chapter(
-                    chapter_number=chapter_number,
-                    title=f"Chapter {chapter_number}",
-                    summary="A new chapter in the unfolding story."
-                )
-                # Add a default scene
-                default_scene = Scene(
-                    scene_number=1,
-                    summary="The story continues with new developments.",
-                    characters=["Shade"],
-                    setting="Neo-London",
-                    goal="Advance the plot",
-                    emotional_beat="Tension"
-                )
-                chapter.scenes.append(default_scene)
-                project_knowledge_base.add_chapter(chapter)
-                console.print(f"[yellow]Created default chapter {chapter_number} to proceed.[/yellow]")
+            chapter = self.ensure_chapter_outline(project_knowledge_base, chapter_number)
 
             console.print(f"\n[cyan]📝 Writing Chapter {chapter_number}: {chapter.title}[/cyan]")
 
-            
-            # Make sure there's at least one scene
-            if not chapter.scenes:
-                console.print(f"[yellow]No scenes found for Chapter {chapter_number}. Creating a default scene.[/yellow]")
-                default_scene = Scene(
-                    scene_number=1,
-                    summary="The story continues with new developments.",
-                    characters=["Shade"],
-                    setting="Neo-London",
-                    goal="Advance the plot",
-                    emotional_beat="Tension"
-                )
-                chapter.scenes.append(default_scene)
-            
             # Make sure scenes are ordered by scene number
             ordered_scenes = sorted(chapter.scenes, key=lambda s: s.scene_number)
-            # Process each scene individually
-            scene_contents = []
-            
+
             # ### 2. NEW LOGIC: Get Context BEFORE the loop starts ###
             # We get the text of the PREVIOUS chapter (e.g. if writing Ch 2, get Ch 1 text)
-            previous_chapter_context = get_previous_chapter_context(
-                project_knowledge_base.project_dir, 
-                chapter_number
-            )
-
-            for scene in ordered_scenes:
-                console.print(f"🎬 Creating Scene/Section {scene.scene_number} of {len(ordered_scenes)}...")
-
-                # Generate a scene title if none exists
-                scene_title = f"Scene {scene.scene_number}: {scene.summary[:30]}..." if len(scene.summary) > 30 else f"Scene {scene.scene_number}: {scene.summary}"
-                
-                # Create a prompt for this specific scene
-                scene_prompt = prompts.SCENE_PROMPT.format(
-                    chapter_number=chapter_number,
-                    chapter_title=chapter.title,
-                    book_title=project_knowledge_base.title,
-                    genre=project_knowledge_base.genre,
-                    category=project_knowledge_base.category,
-                    language=project_knowledge_base.language,  # Add language parameter
-                    chapter_summary=chapter.summary,
-                    scene_number=scene.scene_number,
-                    scene_summary=scene.summary,
-                    characters=", ".join(scene.characters) if scene.characters else "None specified",
-                    setting=scene.setting if scene.setting else "None specified",
-                    goal=scene.goal if scene.goal else "None specified",
-                    emotional_beat=scene.emotional_beat if scene.emotional_beat else "None specified",
-                    total_scenes=len(ordered_scenes)
+            settings = self.llm_client.settings
+            if settings.story_summaries_enabled:
+                # A digest of the whole book so far plus the previous chapter's ending
+                previous_chapter_context = SummaryStore(project_knowledge_base.project_dir, self.llm_client).story_context(
+                    project_knowledge_base, chapter_number, previous_chapter_text)
+            elif previous_chapter_text is not None:
+                previous_chapter_context = previous_chapter_context_from_text(
+                    previous_chapter_text, settings.previous_chapter_context_tokens,
+                    self.llm_client.llm_provider, self.llm_client.model)
+            else:
+                previous_chapter_context = get_previous_chapter_context(
+                    project_knowledge_base.project_dir, 
+                    chapter_number,
+                    settings.previous_chapter_context_tokens,
+                    self.llm_client.llm_provider,
+                    self.llm_client.model,
                 )
-                
-                # ### 3. UPDATE: Inject the Context into the prompt ###
-                # We append the previous chapter text so the AI knows what just happened.
-                scene_prompt += f"\n\n--- STORY CONTEXT (PREVIOUS CHAPTER) ---\n{previous_chapter_context}\n----------------------------------------"
-                
-                scene_prompt += f"\n\nIMPORTANT: Begin the scene with the title: **{scene_title}**"
-
-                
-                # Generate the scene content
-                scene_content = self.llm_client.generate_content(scene_prompt, max_tokens=2000)
-                if not scene_content:
-                    console.print(f"[yellow]Warning: Failed to generate content for Scene {scene.scene_number}. Using placeholder.[/yellow]")
-                    scene_content = f"[Scene {scene.scene_number} content unavailable]"
-                
-                # Ensure the scene title is included
-                if not scene_content.startswith(f"**{scene_title}**") and not scene_content.startswith(f"# {scene_title}"):
-                    scene_content = f"**{scene_title}**\n\n{scene_content}"
-                
-                scene_contents.append(scene_content)
-            
-            
-            # Combine scenes into a complete chapter
-            chapter_content = f"## Chapter {chapter_number}: {chapter.title}\n\n"
-            chapter_content += "\n\n".join(scene_contents)
-            
-            # Save the chapter
+
             if output_path is None:
                 output_path = str(Path(project_knowledge_base.project_dir) / f"chapter_{chapter_number}.md")
-            write_markdown_file(output_path, chapter_content)
-            
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+
+            # Finished scenes are also saved one by one, so a rerun only regenerates missing or failed ones
+            checkpoint = SceneCheckpoint(project_knowledge_base.project_dir, chapter_number)
+            if checkpoint.manifest["scenes"]:
+                console.print(f"[yellow]Resuming Chapter {chapter_number} from its scene checkpoints...[/yellow]")
+
+            # Scenes are streamed straight into the chapter file, so progress survives a late failure
+            with open(output_path, "w", encoding="utf-8") as chapter_file:
+                chapter_file.write(f"## Chapter {chapter_number}: {chapter.title}\n\n")
+                chapter_file.flush()
+
+                # Identical for every scene of the chapter, so it is sent as a cacheable prompt prefix
+                scene_context = self.build_scene_context(previous_chapter_context)
+                codex = self.load_codex(project_knowledge_base.project_dir)
+                retrieval = self.load_retrieval_index(project_knowledge_base)
+
+                # Scene prompts never depend on other scenes' text, so they can be written concurrently
+                width = min(self.llm_client.settings.scene_concurrency, len(ordered_scenes))
+                if width > 1:
+                    console.print(f"🎬 Creating {len(ordered_scenes)} Scenes/Sections, {width} at a time...")
+                    scene_prompts = [
+                        (scene,
+                         self.build_scene_prompt(project_knowledge_base, chapter, scene, len(ordered_scenes), codex, retrieval),
+                         self.scene_key(project_knowledge_base, chapter, scene, len(ordered_scenes), scene_context))
+                        for scene in ordered_scenes
+                    ]
+                    run_async(self.awrite_scenes(chapter_file, scene_prompts, scene_context, width, checkpoint))
+                else:
+                    for index, scene in enumerate(ordered_scenes):
+                        if index > 0:
+                            chapter_file.write("\n\n")
+
+                        scene_title = self.scene_title(scene)
+                        scene_prompt = self.build_scene_prompt(project_knowledge_base, chapter, scene, len(ordered_scenes), codex, retrieval)
+                        key = self.scene_key(project_knowledge_base, chapter, scene, len(ordered_scenes), scene_context)
+                        saved = checkpoint.completed(scene.scene_number, key)
+                        if saved is not None:
+                            console.print(f"♻️ Scene/Section {scene.scene_number} of {len(ordered_scenes)} restored from checkpoint.")
+                            chapter_file.write(saved)
+                            chapter_file.flush()
+                            continue
+                        console.print(f"🎬 Creating Scene/Section {scene.scene_number} of {len(ordered_scenes)}...")
+                        scene_content = self.write_scene(chapter_file, scene_prompt, scene_title, scene.scene_number, scene_context)
+                        checkpoint.save(scene.scene_number, key, scene_content,
+                                        failed=self.placeholder(scene.scene_number) in scene_content)
+            checkpoint.finish()
+
             console.print(f"[green]✅ Chapter {chapter_number} completed with {len(ordered_scenes)} scenes![/green]")
             
         except Exception as e:
             self.logger.exception(f"Error writing chapter {chapter_number}: {e}")
-            console.print(f"[red]ERROR: Failed to write chapter {chapter_number}. See log for details.[/red]")
\ No newline at end of file
+            console.print(f"[red]ERROR: Failed to write chapter {chapter_number}. See log for details.[/red]")
+
+    def scene_title(self, scene: Scene) -> str:
+        """Generates a scene title from the scene summary."""
+        return f"Scene {scene.scene_number}: {scene.summary[:30]}..." if len(scene.summary) > 30 else f"Scene {scene.scene_number}: {scene.summary}"
+
+    def build_scene_context(self, previous_chapter_context: str) -> str:
+        """The story context shared by every scene prompt of a chapter."""
+        # ### 3. UPDATE: Inject the Context into the prompt ###
+        # We send the story so far (or the previous chapter text) so the AI knows what just happened.
+        return f"--- STORY CONTEXT (EARLIER CHAPTERS) ---\n{previous_chapter_context}\n----------------------------------------"
+
+    def load_codex(self, project_dir) -> Optional[MasterCodex]:
+        """The project's codex (codex.json), if it has one and codex context is enabled."""
+        codex_path = Path(project_dir) / "codex.json"
+        if self.llm_client.settings.codex_context_tokens <= 0 or not codex_path.exists():
+            return None
+        return MasterCodex.load_from_file(str(codex_path))
+
+    def load_retrieval_index(self, project_knowledge_base: ProjectKnowledgeBase) -> Optional[RetrievalIndex]:
+        """The project's BM25 index, brought up to date with the chapter files, codex and worldbuilding."""
+        settings = self.llm_client.settings
+        if settings.retrieval_top_k <= 0 or settings.retrieval_context_tokens <= 0:
+            return None
+        try:
+            index = RetrievalIndex(project_knowledge_base.project_dir)
+            index.refresh(project_knowledge_base)
+            return index
+        except Exception as e:
+            self.logger.warning(f"Retrieval index unavailable: {e}")
+            return None
+
+    def scene_outline_prompt(self, project_knowledge_base: ProjectKnowledgeBase, chapter: Chapter, scene: Scene,
+                             total_scenes: int) -> str:
+        """The scene prompt from the book and outline alone, before codex notes and retrieved passages."""
+        return prompts.SCENE_PROMPT.format(
+            chapter_number=chapter.chapter_number,
+            chapter_title=chapter.title,
+            book_title=project_knowledge_base.title,
+            genre=project_knowledge_base.genre,
+            category=project_knowledge_base.category,
+            language=project_knowledge_base.language,  # Add language parameter
+            chapter_summary=chapter.summary,
+            scene_number=scene.scene_number,
+            scene_summary=scene.summary,
+            characters=", ".join(scene.characters) if scene.characters else "None specified",
+            setting=scene.setting if scene.setting else "None specified",
+            goal=scene.goal if scene.goal else "None specified",
+            emotional_beat=scene.emotional_beat if scene.emotional_beat else "None specified",
+            total_scenes=total_scenes
+        )
+
+    def scene_key(self, project_knowledge_base: ProjectKnowledgeBase, chapter: Chapter, scene: Scene,
+                  total_scenes: int, scene_context: str) -> str:
+        """Checkpoint key of a scene: its outline prompt and the chapter's story context (see utils/scene_checkpoint.py)."""
+        return SceneCheckpoint.scene_key(self.scene_outline_prompt(project_knowledge_base, chapter, scene, total_scenes),
+                                         scene_context)
+
+    def build_scene_prompt(self, project_knowledge_base: ProjectKnowledgeBase, chapter: Chapter, scene: Scene,
+                           total_scenes: int, codex: Optional[MasterCodex] = None,
+                           index: Optional[RetrievalIndex] = None) -> str:
+        """
+        Creates the prompt for one specific scene (sent after the shared scene context).
+        With a codex, the most relevant codex entries for the scene are added within codex_context_tokens;
+        with an index, the best-matching passages of earlier chapters within retrieval_context_tokens.
+        """
+        scene_prompt = self.scene_outline_prompt(project_knowledge_base, chapter, scene, total_scenes)
+
+        if codex is not None:
+            codex_notes = assemble_scene_context(
+                codex, chapter.chapter_number, scene.scene_number, self.llm_client.settings.codex_context_tokens,
+                self.llm_client.count_tokens, characters=scene.characters, location=scene.setting, summary=scene.summary)
+            if codex_notes:
+                scene_prompt += f"\n\n{codex_notes}"
+
+        if index is not None:
+            # The previous chapter is already in the story context
+            settings = self.llm_client.settings
+            passages = index.search(scene_query(scene), settings.retrieval_top_k, before_chapter=chapter.chapter_number,
+                                    exclude_sources=(f"chapter:{chapter.chapter_number - 1}",))
+            retrieved = render_passages(passages, settings.retrieval_context_tokens, self.llm_client.count_tokens)
+            if retrieved:
+                scene_prompt += f"\n\n{retrieved}"
+
+        scene_prompt += f"\n\nIMPORTANT: Begin the scene with the title: **{self.scene_title(scene)}**"
+        return scene_prompt
+
+    def placeholder(self, scene_number: int) -> str:
+        """Stands in for a scene that could not be generated."""
+        return f"[Scene {scene_number} content unavailable]"
+
+    def finalize_scene(self, scene_content: str, scene_title: str, scene_number: int) -> str:
+        """Substitutes a placeholder for failed scenes and makes sure the scene title is included."""
+        if not scene_content:
+            console.print(f"[yellow]Warning: Failed to generate content for Scene {scene_number}. Using placeholder.[/yellow]")
+            scene_content = self.placeholder(scene_number)
+
+        if not scene_content.startswith(f"**{scene_title}**") and not scene_content.startswith(f"# {scene_title}"):
+            scene_content = f"**{scene_title}**\n\n{scene_content}"
+        return scene_content
+
+    async def awrite_scenes(self, chapter_file, scene_prompts: List[Tuple[Scene, str, str]], scene_context: str,
+                            width: int, checkpoint: Optional[SceneCheckpoint] = None) -> List[str]:
+        """
+        Generates the scenes, given as (scene, prompt, checkpoint key), with at most `width` calls in flight and appends them to the chapter
+        file in scene order, each as soon as every scene before it is done. Not streamed.
+        Scenes saved in `checkpoint` are reused, and new ones are saved there as they finish.
+        Failed scenes get placeholders; errors that make the provider unusable abort the chapter.
+        """
+        semaphore = asyncio.Semaphore(width)
+
+        async def generate(scene: Scene, scene_prompt: str, key: str) -> str:
+            saved = checkpoint.completed(scene.scene_number, key) if checkpoint else None
+            if saved is not None:
+                return saved
+            async with semaphore:
+                try:
+                    scene_content = await self.llm_client.agenerate_content(
+                        scene_prompt, max_tokens=2000, operation="scene_write", prefix=scene_context)
+                except LLMError as e:
+                    if e.fatal:
+                        raise
+                    console.print(f"[red]ERROR: Scene {scene.scene_number} failed ({e.kind}): {e}[/red]")
+                    scene_content = ""
+            finalized = self.finalize_scene(scene_content, self.scene_title(scene), scene.scene_number)
+            if checkpoint:
+                checkpoint.save(scene.scene_number, key, finalized, failed=not scene_content)
+            return finalized
+
+        tasks = [asyncio.ensure_future(generate(scene, scene_prompt, key)) for scene, scene_prompt, key in scene_prompts]
+        scene_contents = []
+        try:
+            for index, ((scene, _, _), task) in enumerate(zip(scene_prompts, tasks)):
+                scene_content = await task
+                if index > 0:
+                    chapter_file.write("\n\n")
+                chapter_file.write(scene_content)
+                chapter_file.flush()
+                console.print(f"   Scene {scene.scene_number} of {len(scene_prompts)} written.")
+                scene_contents.append(scene_content)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return scene_contents
+
+    def write_scene(self, chapter_file, scene_prompt: str, scene_title: str, scene_number: int, scene_context: str = "") -> str:
+        """
+        Generates one scene and appends it to the open chapter file, streaming when enabled.
+        A scene that fails for good gets a placeholder; errors that make the provider unusable abort the chapter.
+        """
+        try:
+            return self._generate_scene(chapter_file, scene_prompt, scene_title, scene_number, scene_context)
+        except LLMError as e:
+            if e.fatal:
+                raise
+            console.print(f"[red]ERROR: Scene {scene_number} failed ({e.kind}): {e}[/red]")
+            scene_content = self.finalize_scene("", scene_title, scene_number)
+            if self.llm_client.settings.llm_streaming:
+                chapter_file.write("\n\n")  # Keep the placeholder apart from any text streamed before the failure
+            chapter_file.write(scene_content)
+            chapter_file.flush()
+            return scene_content
+
+    def _generate_scene(self, chapter_file, scene_prompt: str, scene_title: str, scene_number: int, scene_context: str) -> str:
+        if not self.llm_client.settings.llm_streaming:
+            scene_content = self.finalize_scene(
+                self.llm_client.generate_content(scene_prompt, max_tokens=2000, operation="scene_write", prefix=scene_context),
+                scene_title,
+                scene_number,
+            )
+            chapter_file.write(scene_content)
+            chapter_file.flush()
+            return scene_content
+
+        chunks = ensure_prefix(
+            self.llm_client.generate_stream(scene_prompt, max_tokens=2000, operation="scene_write", prefix=scene_context),
+            scene_title,
+            f"**{scene_title}**\n\n",
+        )
+        scene_content = stream_to_file(chunks, chapter_file, f"Scene {scene_number}")
+        if not scene_content.strip():
+            scene_content = self.finalize_scene("", scene_title, scene_number)
+            chapter_file.write(scene_content)
+            chapter_file.flush()
+        return scene_content
\ No newline at end of file
@@ -8,7 +8,8 @@ from pathlib import Path
 from libriscribe.utils.llm_client import LLMClient
 from libriscribe.utils import prompts_context as prompts
 from libriscribe.agents.agent_base import Agent
-from libriscribe.utils.file_utils import write_json_file, extract_json_from_markdown
+from libriscribe.utils.file_utils import write_json_file
+from libriscribe.utils.structured_output import OutputSchema
 
 from libriscribe.knowledge_base import ProjectKnowledgeBase, Character
 from rich.console import Console
@@ -16,6 +17,8 @@ console = Console()
 
 logger = logging.getLogger(__name__)
 
+CHARACTERS_SCHEMA = OutputSchema.from_model(Character, "characters", many=True)
+
 class CharacterGeneratorAgent(Agent):
     """Generates character profiles."""
 
@@ -36,13 +39,9 @@ class CharacterGeneratorAgent(Agent):
             )
 
             # Lower temperature for more structured output
-            character_json_str = self.llm_client.generate_content_with_json_repair(prompt, max_tokens=4000, temperature=0.5)
-
-            if not character_json_str:
-                print("ERROR: Character generation failed. See Log")
-                return
+            characters = self.llm_client.generate_structured(prompt, CHARACTERS_SCHEMA, max_tokens=4000, temperature=0.5,
+                                                             operation="characters")
             try:
-                characters = extract_json_from_markdown(character_json_str)
                 if not characters or not isinstance(characters, list):
                     print("ERROR: Failed to parse character data")
                     return
@@ -9,10 +9,10 @@ from libriscribe.utils.llm_client import LLMClient
 from libriscribe.utils import prompts_context as prompts
 from libriscribe.agents.agent_base import Agent
 from libriscribe.utils.file_utils import (
-    extract_json_from_markdown,
     read_json_file,
     write_json_file,
 )
+from libriscribe.utils.structured_output import OutputSchema
 from libriscribe.knowledge_base import ProjectKnowledgeBase
 
 # No need to import track
@@ -21,10 +21,14 @@ from rich.console import Console  # NEW IMPORT
 console = Console()  # Create a console instance.
 logger = logging.getLogger(__name__)
 
+CONCEPT_SCHEMA = OutputSchema.from_model(ProjectKnowledgeBase, "book_concept", fields=["title", "logline", "description"])
+
 
 class ConceptGeneratorAgent(Agent):
     """Generates book concepts."""
 
+    use_llm_cache = False  # Re-running concept generation should offer fresh ideas
+
     def __init__(self, llm_client: LLMClient):
         super().__init__("ConceptGeneratorAgent", llm_client)
 
@@ -74,15 +78,9 @@ class ConceptGeneratorAgent(Agent):
                 ```"""
 
             console.print(f"🧠 [cyan]Generating initial concept...[/cyan]")
-            initial_concept_md = self.llm_client.generate_content_with_json_repair(
-                initial_prompt
+            initial_concept_json = self.llm_client.generate_structured(
+                initial_prompt, CONCEPT_SCHEMA, operation="concept"
             )
-
-            if not initial_concept_md:
-                logger.error("Initial concept generation failed.")
-                return None
-
-            initial_concept_json = extract_json_from_markdown(initial_concept_md)
             if not initial_concept_json:
                 logger.error("Initial concept parsing failed.")
                 return None
@@ -101,7 +99,7 @@ class ConceptGeneratorAgent(Agent):
             - **Description:** Is it well-written, engaging, and does it provide a clear sense of the story?  Are there any obvious weaknesses or areas for improvement? Be specific and constructive.
             """
             console.print(f"🔍 [cyan]Evaluating concept quality...[/cyan]")
-            critique = self.llm_client.generate_content(critique_prompt)
+            critique = self.llm_client.generate_content(critique_prompt, operation="concept_critique")
             if not critique:
                 logger.error("Critique generation failed.")
                 return None
@@ -128,14 +126,9 @@ class ConceptGeneratorAgent(Agent):
             ```
             """
             console.print(f"✨ [cyan]Refining concept...[/cyan]")
-            refined_concept_md = self.llm_client.generate_content_with_json_repair(
-                refine_prompt
+            refined_concept_json = self.llm_client.generate_structured(
+                refine_prompt, CONCEPT_SCHEMA, operation="concept_refine"
             )
-            if not refined_concept_md:
-                logger.error("Refined concept generation failed.")
-                return None
-
-            refined_concept_json = extract_json_from_markdown(refined_concept_md)
             if not refined_concept_json:
                 logger.error("Refined concept parsing failed")
                 return None
@@ -1,21 +1,24 @@
 # src/libriscribe/agents/content_reviewer.py
 import asyncio
 import logging
-from typing import Any, Dict
+from pathlib import Path
+from typing import Any, Dict, Optional
 
 from libriscribe.agents.agent_base import Agent
 from libriscribe.utils.llm_client import LLMClient
 from libriscribe.utils.file_utils import read_markdown_file
+from libriscribe.utils.review_store import ReviewStore, review_key
 from rich.console import Console
 console = Console()
 logger = logging.getLogger(__name__)
 
+REVIEW_PROMPT_VERSION = 1  # Bump when the review prompt changes, so stored reviews are redone
+
 class ContentReviewerAgent(Agent):
     """Reviews chapter content for consistency and clarity."""
 
     def __init__(self, llm_client: LLMClient):
         super().__init__("ContentReviewerAgent", llm_client)
-        self.llm_client = llm_client
 
     def execute(self, chapter_path: str) -> Dict[str, Any]:
         """Reviews a chapter for consistency, clarity, and plot holes.
@@ -26,19 +29,80 @@ class ContentReviewerAgent(Agent):
         Returns:
             A dictionary containing review findings (e.g., inconsistencies, suggestions).
             Returns an empty dictionary if the file doesn't exist or is empty.
+            A review of the same chapter text is reused from the project's reviews.json.
         """
+        prompt = self.build_prompt(chapter_path)
+        if prompt is None:
+            return {}
+        # Keyed before the call, so the stored review always matches the text that was reviewed
+        key = self.chapter_review_key(chapter_path)
+        stored = self.stored_review(chapter_path, key)
+        if stored is not None:
+            console.print(f"♻️ [cyan]Reusing the review of unchanged Chapter {chapter_path.split('_')[-1].split('.')[0]}.[/cyan]")
+            return {"review": stored}
+        console.print(f"🔍 [cyan]Reviewing Chapter {chapter_path.split('_')[-1].split('.')[0]}...[/cyan]")
+        try:
+            review_results = self.llm_client.generate_content(prompt, max_tokens=1500, operation="review")
+            self.store_review(chapter_path, key, review_results)
+            return {"review": review_results}
+        except Exception as e:
+            self.logger.exception(f"Error reviewing chapter {chapter_path}: {e}")
+            print(f"ERROR: Failed to review chapter {chapter_path}. See log for details.")
+            return {}
+
+    def chapter_review_key(self, chapter_path: str) -> Optional[str]:
+        """Hash of the chapter file's current text, the project language and the prompt version."""
+        chapter_content = read_markdown_file(chapter_path)
+        if not chapter_content:
+            return None
+        return review_key(chapter_content, self.project_language(chapter_path), REVIEW_PROMPT_VERSION)
+
+    def stored_review(self, chapter_path: str, key: Optional[str]) -> Optional[str]:
+        """The review stored for the chapter file under `key`, or None."""
+        return ReviewStore(Path(chapter_path).parent).get(Path(chapter_path).name, key) if key else None
+
+    def store_review(self, chapter_path: str, key: Optional[str], review: str) -> None:
+        """Remembers `review` of the chapter file's text with hash `key`."""
+        if key and review:
+            ReviewStore(Path(chapter_path).parent).put(Path(chapter_path).name, key, review)
+
+    def build_prompt(self, chapter_path: str) -> Optional[str]:
+        """Builds the review prompt for a chapter file, or returns None if the chapter is missing."""
         chapter_content = read_markdown_file(chapter_path)
         if not chapter_content:
             print(f"ERROR: Chapter file is empty or not found: {chapter_path}")
-            return {}
-        console.print(f"🔍 [cyan]Reviewing Chapter {chapter_path.split('_')[-1].split('.')[0]}...[/cyan]")
+            return None
+        language = self.project_language(chapter_path)
+        prompt = f"""
+        You are a meticulous content reviewer. Review the following chapter for:
+
+        Language: {language}
         
+        1.  **Internal Consistency:** Are character actions, dialogue, and motivations consistent with their established personalities and the overall plot?
+        2.  **Clarity:** Are there any confusing passages, ambiguous descriptions, or unclear plot points?
+        3.  **Plot Holes:** Are there any logical inconsistencies or unresolved questions within the chapter's narrative?
+        4. **Redundancy**: Are there any sentences that repeat too much, or don't contribute to the overall?
+        5. **Flow and Transitions:** Does the chapter flow smoothly from one scene or idea to the next? Are transitions between scenes clear?
+        6. **Engagement:** Does the chapter maintain reader interest? Are there any sections that drag or feel slow?
+
+        Provide specific examples of any issues found, referencing line numbers or sections where possible.  Output your review in Markdown format,
+        with clear headings for each section (Consistency, Clarity, Plot Holes, etc.).  If no issues are found in a category,
+        state "No issues found."
+
+        Chapter Content:
+        ---
+        {chapter_content}
+        ---
+        """
+        return prompt
+
+    def project_language(self, chapter_path: str) -> str:
+        """The language of the project the chapter file belongs to (English if unknown)."""
         # Get the project_knowledge_base from the ProjectManagerAgent
         # We need to get the language from the project knowledge base
         # Since we're passed only the chapter_path, we need to infer the project
         
         # Extract project directory from chapter path to find project data
-        from pathlib import Path
         from libriscribe.knowledge_base import ProjectKnowledgeBase
         
         chapter_file = Path(chapter_path)
@@ -57,32 +121,4 @@ class ContentReviewerAgent(Agent):
             except Exception as e:
                 self.logger.warning(f"Could not load project data for language detection: {e}")
                 # Continue with default language
-        
-        prompt = f"""
-        You are a meticulous content reviewer. Review the following chapter for:
-
-        Language: {language}
-        
-        1.  **Internal Consistency:** Are character actions, dialogue, and motivations consistent with their established personalities and the overall plot?
-        2.  **Clarity:** Are there any confusing passages, ambiguous descriptions, or unclear plot points?
-        3.  **Plot Holes:** Are there any logical inconsistencies or unresolved questions within the chapter's narrative?
-        4. **Redundancy**: Are there any sentences that repeat too much, or don't contribute to the overall?
-        5. **Flow and Transitions:** Does the chapter flow smoothly from one scene or idea to the next? Are transitions between scenes clear?
-        6. **Engagement:** Does the chapter maintain reader interest? Are there any sections that drag or feel slow?
-
-        Provide specific examples of any issues found, referencing line numbers or sections where possible.  Output your review in Markdown format,
-        with clear headings for each section (Consistency, Clarity, Plot Holes, etc.).  If no issues are found in a category,
-        state "No issues found."
-
-        Chapter Content:
-        ---
-        {chapter_content}
-        ---
-        """
-        try:
-            review_results = self.llm_client.generate_content(prompt, max_tokens=1500)
-            return {"review": review_results}
-        except Exception as e:
-            self.logger.exception(f"Error reviewing chapter {chapter_path}: {e}")
-            print(f"ERROR: Failed to review chapter {chapter_path}. See log for details.")
-            return {}
\ No newline at end of file
+        return language
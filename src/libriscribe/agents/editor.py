@@ -5,10 +5,13 @@ from pathlib import Path
 
 from libriscribe.agents.agent_base import Agent
 from libriscribe.utils import prompts_context as prompts
+from libriscribe.utils.chunking import split_text
+from libriscribe.utils.edit_ops import edit_with_ops
 from libriscribe.utils.file_utils import read_markdown_file, write_markdown_file, read_json_file, extract_json_from_markdown
 from libriscribe.knowledge_base import ProjectKnowledgeBase
 from libriscribe.utils.llm_client import LLMClient
 from libriscribe.agents.content_reviewer import ContentReviewerAgent
+from libriscribe.utils.streaming import stream_to_file
 # Add this import
 from rich.console import Console
 console = Console()
@@ -16,6 +19,15 @@ console = Console()
 
 logger = logging.getLogger(__name__)
 
+EDIT_MAX_TOKENS = 8000
+EDITED_OUTPUT_RATIO = 1.2  # Edits may lengthen the text a little
+# Appended when a chapter is too long for one call and is edited in parts
+EDIT_PART_NOTE = """
+This is part {part} of {parts} of the chapter. Edit and return only this part; it will be
+joined to the others, so do not add a chapter heading unless the part already starts with one,
+and do not summarize or comment on the rest of the chapter.
+"""
+
 class EditorAgent(Agent):
     """Edits and refines chapters."""
 
@@ -49,74 +61,110 @@ class EditorAgent(Agent):
             reviewer_agent = ContentReviewerAgent(self.llm_client)
             review_results = reviewer_agent.execute(chapter_path)
 
-            scene_titles = self.extract_scene_titles(chapter_content)
-            scene_titles_instruction = ""
-            if scene_titles:
-                scene_titles_str = "\n".join(f"- {title}" for title in scene_titles)
-                scene_titles_instruction = f"""
-                    IMPORTANT: This chapter contains scene titles that must be preserved in your edit.
-                    Make sure each scene begins with its title in bold format (using **Scene X: Title**).
-                    Here are the scene titles to preserve:
-
-                    {scene_titles_str}
-
-                    If any scene is missing a title in the format "**Scene X: Title**", please add an appropriate title.
-                    """
             prompt_data = {
                 "chapter_number": chapter_number,
                 "chapter_title": chapter_title,
                 "book_title": project_knowledge_base.title,
                 "genre": project_knowledge_base.genre,
                 "language": project_knowledge_base.language,
-                "chapter_content": chapter_content,
+                "chapter_content": "",
                 "review_feedback": review_results.get("review", "")
             }
-
+            # Long chapters are edited in parts that fit the model's context window and output limit
+            template = prompts.EDITOR_PROMPT.format(**prompt_data) + self.scene_titles_instruction(chapter_content) + EDIT_PART_NOTE
+            budget = min(self.llm_client.max_chunk_tokens(template, EDITED_OUTPUT_RATIO),
+                         int(EDIT_MAX_TOKENS / EDITED_OUTPUT_RATIO))
+            parts = split_text(chapter_content, budget, self.llm_client.count_tokens)
+
+            # Parts are sized for a full rewrite, so any part whose edit operations fail can still be rewritten
+            diff_mode = self.llm_client.settings.edit_mode == "diff"
             console.print(f"✏️ [cyan]Editing Chapter {chapter_number} based on feedback...[/cyan]")
-            prompt = prompts.EDITOR_PROMPT.format(**prompt_data) + scene_titles_instruction
-            edited_response = self.llm_client.generate_content(prompt, max_tokens=8000)
-            # --- KEY FIX: Use extract_json_from_markdown and check for None ---
-            if "```" in edited_response:
-                start = edited_response.find("```") + 3
-                end = edited_response.rfind("```")
-                
-                # Skip the language identifier if present (e.g., ```markdown)
-                next_newline = edited_response.find("\n", start)
-                if next_newline < end and next_newline != -1:
-                    start = next_newline + 1
-                
-                revised_chapter = edited_response[start:end].strip()
-            else:
-                # If no code blocks, try to extract the content after a leading explanation
-                lines = edited_response.split("\n")
-                content_start = 0
-                for i, line in enumerate(lines):
-                    if line.startswith("#") or line.startswith("Chapter"):
-                        content_start = i
-                        break
-                
-                if content_start > 0:
-                    revised_chapter = "\n".join(lines[content_start:])
+            if len(parts) > 1:
+                console.print(f"[yellow]Chapter {chapter_number} exceeds {self.llm_client.model}'s limits; editing it in {len(parts)} parts.[/yellow]")
+            revised_chapter_path = str(Path(project_knowledge_base.project_dir) / f"chapter_{chapter_number}_revised.md")
+            partial_path = revised_chapter_path + ".partial"
+            revised_parts = []
+            for number, part in enumerate(parts, 1):
+                part_note = EDIT_PART_NOTE.format(part=number, parts=len(parts)) if len(parts) > 1 else ""
+                if diff_mode:
+                    prompt = (prompts.EDITOR_INSTRUCTIONS.format(**{**prompt_data, "chapter_content": part})
+                              + self.scene_titles_instruction(part) + part_note)
+                    revised_part = edit_with_ops(self.llm_client, prompt, part, "edit", project_knowledge_base.language)
+                    if revised_part:
+                        revised_parts.append(revised_part)
+                        continue
+
+                prompt = prompts.EDITOR_PROMPT.format(**{**prompt_data, "chapter_content": part}) + self.scene_titles_instruction(part) + part_note
+                if self.llm_client.settings.llm_streaming:
+                    # Stream the raw response to a side file; the revised chapter is only replaced once complete
+                    with open(partial_path, "a" if number > 1 else "w", encoding="utf-8") as partial_file:
+                        edited_response = stream_to_file(
+                            self.llm_client.generate_stream(prompt, max_tokens=EDIT_MAX_TOKENS, operation="edit"),
+                            partial_file,
+                            f"Editing Chapter {chapter_number}" + (f" (part {number}/{len(parts)})" if len(parts) > 1 else ""),
+                        )
                 else:
-                    revised_chapter = edited_response
-                    
-                    
-            if revised_chapter:
-                 #--- FIX: Save as chapter_{chapter_number}_revised.md ---
-                revised_chapter_path = str(Path(project_knowledge_base.project_dir) / f"chapter_{chapter_number}_revised.md")
-                write_markdown_file(revised_chapter_path, revised_chapter)
-                console.print(f"[green]✅ Edited chapter saved![/green]")
-            else:
-                print("ERROR: Could not extract revised chapter from editor output.")
-                self.logger.error("Could not extract revised chapter content.")
-                # --- ADD THIS: Log the raw response for debugging ---
-                self.logger.error(f"Raw editor response: {edited_response}")
-
+                    edited_response = self.llm_client.generate_content(prompt, max_tokens=EDIT_MAX_TOKENS, operation="edit")
+                revised_part = self.extract_revised_text(edited_response)
+                if not revised_part:
+                    print("ERROR: Could not extract revised chapter from editor output.")
+                    self.logger.error("Could not extract revised chapter content.")
+                    # --- ADD THIS: Log the raw response for debugging ---
+                    self.logger.error(f"Raw editor response: {edited_response}")
+                    return
+                revised_parts.append(revised_part)
+
+            revised_chapter = "\n\n".join(revised_parts)
+            #--- FIX: Save as chapter_{chapter_number}_revised.md ---
+            write_markdown_file(revised_chapter_path, revised_chapter)
+            Path(partial_path).unlink(missing_ok=True)
+            console.print(f"[green]✅ Edited chapter saved![/green]")
 
         except Exception as e:
             self.logger.exception(f"Error editing chapter {chapter_path}: {e}")
             print(f"ERROR: Failed to edit chapter. See log.")
 
+    def scene_titles_instruction(self, content: str) -> str:
+        """Instruction asking the editor to keep the scene titles found in `content`."""
+        scene_titles = self.extract_scene_titles(content)
+        if not scene_titles:
+            return ""
+        scene_titles_str = "\n".join(f"- {title}" for title in scene_titles)
+        return f"""
+                    IMPORTANT: This chapter contains scene titles that must be preserved in your edit.
+                    Make sure each scene begins with its title in bold format (using **Scene X: Title**).
+                    Here are the scene titles to preserve:
+
+                    {scene_titles_str}
+
+                    If any scene is missing a title in the format "**Scene X: Title**", please add an appropriate title.
+                    """
+
+    def extract_revised_text(self, edited_response: str) -> str:
+        """The revised text from the editor's reply, without code fences or a leading explanation."""
+        # --- KEY FIX: Use extract_json_from_markdown and check for None ---
+        if "```" in edited_response:
+            start = edited_response.find("```") + 3
+            end = edited_response.rfind("```")
+
+            # Skip the language identifier if present (e.g., ```markdown)
+            next_newline = edited_response.find("\n", start)
+            if next_newline < end and next_newline != -1:
+                start = next_newline + 1
+
+            return edited_response[start:end].strip()
+        # If no code blocks, try to extract the content after a leading explanation
+        lines = edited_response.split("\n")
+        content_start = 0
+        for i, line in enumerate(lines):
+            if line.startswith("#") or line.startswith("Chapter"):
+                content_start = i
+                break
+
+        if content_start > 0:
+            return "\n".join(lines[content_start:])
+        return edited_response
+
     def extract_chapter_number(self, chapter_path: str) -> int:
         """Extracts chapter number."""
         try:
@@ -3,9 +3,13 @@ import asyncio
 import logging
 from typing import Any, Dict, List
 
+from pydantic import BaseModel, ValidationError
+
 from libriscribe.agents.agent_base import Agent
-from libriscribe.utils.llm_client import LLMClient
+from libriscribe.utils.llm_client import LLMClient, gather_with_concurrency, run_async
+from libriscribe.utils.llm_errors import LLMError
 from libriscribe.utils.file_utils import read_markdown_file, extract_json_from_markdown
+from libriscribe.utils.structured_output import OutputSchema
 # For web scraping
 import requests
 from bs4 import BeautifulSoup
@@ -14,12 +18,24 @@ console = Console()
 
 logger = logging.getLogger(__name__)
 
+CLAIM_CHECK_TOKENS = 300  # Output budget per claim in a batch
+
+
+class ClaimCheck(BaseModel):
+    index: int  # The claim's number in the batch prompt
+    result: str
+    explanation: str = ""
+    sources: List[str] = []
+
+
+CLAIM_CHECKS_SCHEMA = OutputSchema.from_model(ClaimCheck, "claim_checks", many=True)
+
+
 class FactCheckerAgent(Agent):
     """Checks factual claims in a chapter."""
 
     def __init__(self, llm_client: LLMClient):
         super().__init__("FactCheckerAgent", llm_client)
-        self.llm_client = llm_client
 
     def execute(self, chapter_path: str) -> List[Dict[str, Any]]:
         """Identifies and checks factual claims, handling Markdown-wrapped JSON."""
@@ -44,7 +60,7 @@ class FactCheckerAgent(Agent):
         """
 
         try:
-            claims_json_str = self.llm_client.generate_content(identify_claims_prompt, max_tokens=1000)
+            claims_json_str = self.llm_client.generate_content(identify_claims_prompt, max_tokens=1000, operation="claim_extraction")
             claims = extract_json_from_markdown(claims_json_str)
             if claims is None:
                 print("ERROR: Invalid claims data received.")
@@ -53,20 +69,74 @@ class FactCheckerAgent(Agent):
                 self.logger.warning("Claims JSON is not a list.")
                 claims = []
 
-            # 2. Check each claim
-            fact_check_results = []
-            for claim in claims:
-                check_result = self.check_claim(claim)
-                fact_check_results.append(check_result)
-
-            return fact_check_results
+            # 2. Check the claims, several per call and several calls at once
+            claims = [claim if isinstance(claim, str) else str(claim) for claim in claims]
+            return run_async(self.acheck_claims(claims))
 
         except Exception as e:
             self.logger.exception(f"Error during fact-checking process for {chapter_path}: {e}")
             print(f"ERROR: Failed to fact-check chapter {chapter_path}.  See log.")
             return []
+
+    async def acheck_claims(self, claims: List[str]) -> List[Dict[str, Any]]:
+        """
+        Checks the claims in micro-batches of fact_check_batch_size, with up to llm_max_concurrency
+        batches in flight. Results are matched to claims by index; claims a batch reply lost
+        (or all of them, if the batch failed) are checked one by one. Returns results in claim order.
+        """
+        size = max(1, self.llm_client.settings.fact_check_batch_size)
+        batches = [claims[start:start + size] for start in range(0, len(claims), size)]
+        checked = await gather_with_concurrency([self.acheck_batch(batch) for batch in batches],
+                                                self.llm_client.settings.llm_max_concurrency)
+        return [result for batch_results in checked for result in batch_results]
+
+    async def acheck_batch(self, claims: List[str]) -> List[Dict[str, Any]]:
+        """Checks a batch of claims in one call, retrying individually the claims the reply lost."""
+        if len(claims) == 1:
+            return [await self.acheck_claim(claims[0])]
+        numbered = "\n".join(f"        [{number}] {claim}" for number, claim in enumerate(claims, 1))
+        prompt = f"""
+        Fact-check each of the following claims:
+
+{numbered}
+
+        For each claim, provide a concise assessment of its accuracy (e.g., "True," "False," "Mostly True," "Unverifiable," "Out of Context").
+        Include a brief explanation and, if possible, provide URLs to reputable sources that support your assessment.
+        Output as JSON: {{"claim_checks": [{{"index": 1, "result": "...", "explanation": "...", "sources": ["url1", "url2"]}}, ...]}}
+        with exactly one entry per claim, using the claim's number in brackets as its "index".
+        """
+        by_index: Dict[int, Dict[str, Any]] = {}
+        try:
+            data = await self.llm_client.agenerate_structured(
+                prompt, CLAIM_CHECKS_SCHEMA, max_tokens=CLAIM_CHECK_TOKENS * len(claims), temperature=0.3,
+                operation="claim_check")
+            for item in data if isinstance(data, list) else []:
+                try:
+                    check = ClaimCheck.model_validate(item)
+                except ValidationError:
+                    continue
+                if 1 <= check.index <= len(claims):
+                    by_index.setdefault(check.index, {"claim": claims[check.index - 1], "result": check.result,
+                                                      "explanation": check.explanation, "sources": check.sources})
+        except LLMError as e:
+            if e.fatal:
+                raise
+            self.logger.warning(f"Batch fact-check of {len(claims)} claims failed ({e}); checking them one by one")
+
+        missing = [number for number in range(1, len(claims) + 1) if number not in by_index]
+        if missing and len(missing) < len(claims):
+            self.logger.info(f"Batch fact-check lost {len(missing)} of {len(claims)} claims; checking them one by one")
+        retried = await gather_with_concurrency([self.acheck_claim(claims[number - 1]) for number in missing],
+                                                self.llm_client.settings.llm_max_concurrency)
+        by_index.update(zip(missing, retried))
+        return [by_index[number] for number in range(1, len(claims) + 1)]
+
     def check_claim(self, claim: str) -> Dict[str, Any]:
         """Checks a single claim, handling Markdown-wrapped JSON."""
+        return run_async(self.acheck_claim(claim))
+
+    async def acheck_claim(self, claim: str) -> Dict[str, Any]:
+        """Async counterpart of check_claim."""
         prompt = f"""
         Fact-check the following claim:
 
@@ -78,7 +148,7 @@ class FactCheckerAgent(Agent):
         """
 
         try:
-            result_json_str = self.llm_client.generate_content(prompt, max_tokens=500)
+            result_json_str = await self.llm_client.agenerate_content(prompt, max_tokens=500, operation="claim_check")
             result = extract_json_from_markdown(result_json_str)
             if result is None:
                 return {"claim":claim, "result": "Error", "explanation": "Failed to parse LLM Response", "sources": []}
@@ -5,6 +5,7 @@ import logging
 from typing import Any, Dict, List, Optional
 from pathlib import Path
 
+from libriscribe.utils.chunking import pack_chunks
 from libriscribe.utils.llm_client import LLMClient
 from libriscribe.utils import prompts_context as prompts
 from libriscribe.agents.agent_base import Agent
@@ -17,6 +18,14 @@ from rich.console import Console
 console = Console()
 logger = logging.getLogger(__name__)
 
+FORMATTED_OUTPUT_RATIO = 1.1
+FORMATTING_OVERHEAD_TOKENS = 1000
+# Appended when the manuscript is too long for one call and is formatted in parts
+FORMATTING_PART_NOTE = """
+These chapters are part {part} of {parts} of the book. Format only these chapters, in order.
+Do not add a title page or table of contents, and do not comment on the missing chapters.
+"""
+
 class FormattingAgent(Agent):
     """Formats the book into a single Markdown or PDF file."""
 
@@ -32,9 +41,7 @@ class FormattingAgent(Agent):
                 print("ERROR: No chapter files found to format.")
                 return
 
-            all_chapters_content = ""
-            for chapter_file in chapter_files:
-                all_chapters_content += read_markdown_file(chapter_file) + "\n\n"
+            chapter_texts = [read_markdown_file(chapter_file) + "\n\n" for chapter_file in chapter_files]
 
 
             # Get project data (for title page)
@@ -47,8 +54,7 @@ class FormattingAgent(Agent):
 
             # Format with LLM
             console.print(f"📚 [cyan]Assembling final manuscript...[/cyan]")
-            prompt = prompts.FORMATTING_PROMPT.format(chapters=all_chapters_content,  language=project_knowledge_base.language)
-            formatted_markdown = self.llm_client.generate_content(prompt, max_tokens=120000) # May need large token limit
+            formatted_markdown = self.format_chapters(chapter_texts, project_knowledge_base.language)
 
             # Add title page (before LLM formatting, for simplicity)
             title_page = self.create_title_page(project_knowledge_base) 
@@ -70,6 +76,28 @@ class FormattingAgent(Agent):
             self.logger.exception(f"Error formatting book: {e}")
             print(f"ERROR: Failed to format the book. See log.")
 
+    def format_chapters(self, chapter_texts: List[str], language: str) -> str:
+        """
+        Formats the chapters with as few calls as the model's context window and output limit
+        allow: whole chapters are grouped into parts, and parts are formatted concurrently.
+        """
+        # The output restates the chapters, so size it to them (plus headings and a table of contents)
+        template = prompts.FORMATTING_PROMPT.format(chapters="", language=language) + FORMATTING_PART_NOTE
+        budget = self.llm_client.max_chunk_tokens(template, FORMATTED_OUTPUT_RATIO, FORMATTING_OVERHEAD_TOKENS)
+        parts = pack_chunks(chapter_texts, budget, self.llm_client.count_tokens)
+
+        requests = []
+        for number, part in enumerate(parts, 1):
+            prompt = prompts.FORMATTING_PROMPT.format(chapters=part, language=language)
+            if len(parts) > 1:
+                prompt += FORMATTING_PART_NOTE.format(part=number, parts=len(parts))
+            max_tokens = int(self.llm_client.count_tokens(part) * FORMATTED_OUTPUT_RATIO) + FORMATTING_OVERHEAD_TOKENS
+            requests.append({"prompt": prompt, "max_tokens": max_tokens, "operation": "formatting"})
+        if len(parts) > 1:
+            console.print(f"[yellow]Manuscript exceeds {self.llm_client.model}'s limits; formatting it in {len(parts)} parts.[/yellow]")
+            return "\n\n".join(part.strip() for part in self.llm_client.generate_many(requests))
+        return self.llm_client.generate_content(**requests[0])
+
     def create_title_page(self, project_knowledge_base:ProjectKnowledgeBase) -> str: # now accepts ProjectKnowledgeBase
         """Creates a Markdown title page."""
         title = project_knowledge_base.title
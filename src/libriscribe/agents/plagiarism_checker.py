@@ -16,7 +16,6 @@ class PlagiarismCheckerAgent(Agent):
 
     def __init__(self, llm_client: LLMClient):
         super().__init__("PlagiarismCheckerAgent", llm_client)
-        self.llm_client = llm_client
 
     def execute(self, chapter_path: str) -> List[Dict[str, Any]]:
         """Checks a chapter for potential plagiarism, handling Markdown-wrapped JSON."""
@@ -56,7 +55,7 @@ class PlagiarismCheckerAgent(Agent):
        ---
        """
         try:
-            response_json_str = self.llm_client.generate_content(prompt, max_tokens=500)
+            response_json_str = self.llm_client.generate_content(prompt, max_tokens=500, operation="plagiarism_check")
             results = extract_json_from_markdown(response_json_str)
             if results is None:
                 return []  # Return empty list on parsing failure
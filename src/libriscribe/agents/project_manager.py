@@ -1,7 +1,8 @@
 # src/libriscribe/agents/project_manager.py
 
 import logging
-from typing import Any, Dict, Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
 from libriscribe.agents.concept_generator import ConceptGeneratorAgent
@@ -19,13 +20,19 @@ from libriscribe.agents.fact_checker import FactCheckerAgent
 
 from libriscribe.settings import Settings
 from libriscribe.utils.file_utils import write_json_file, read_json_file, write_markdown_file, get_chapter_files, read_markdown_file
-from libriscribe.utils import prompts_context as prompts
 from libriscribe.knowledge_base import ProjectKnowledgeBase, Worldbuilding
 from libriscribe.utils.llm_client import LLMClient
+from libriscribe.utils.usage_ledger import usage_context
+from libriscribe.utils.batch_api import BatchClient, BatchRequest
+from libriscribe.utils.context_manager import get_previous_chapter_context
+from libriscribe.utils.pipeline import Pipeline, Stage, StageStats
+from libriscribe.utils.scene_checkpoint import SceneCheckpoint
+from libriscribe.utils.summary_store import SummaryStore
 # For PDF generation
 from fpdf import FPDF
 import typer  # Import typer
 from rich.console import Console
+from rich.table import Table
 console = Console()
 
 logger = logging.getLogger(__name__)
@@ -40,6 +47,8 @@ class ProjectManagerAgent:
         self.llm_client: Optional[LLMClient] = llm_client  # Add LLMClient instance
         self.agents = {} # Will be initialized after llm
         self.logger = logging.getLogger(self.__class__.__name__) # ADD THIS
+        # The chapter pipeline's stages run on their own threads; hold this to change or save the knowledge base
+        self._save_lock = threading.RLock()
 
     def initialize_llm_client(self, llm_provider: str):
         """Initializes the LLMClient and agents."""
@@ -58,6 +67,14 @@ class ProjectManagerAgent:
             "plagiarism_checker": PlagiarismCheckerAgent(self.llm_client),
             "fact_checker": FactCheckerAgent(self.llm_client),
         }
+        if self.project_dir:
+            self._attach_llm_client()
+
+    def _attach_llm_client(self):
+        """Points the LLM client's caches and logs at the project and applies its model routing."""
+        self.llm_client.set_project_dir(self.project_dir)
+        if self.project_knowledge_base:
+            self.llm_client.router.configure(self.project_knowledge_base.llm_tiers, self.project_knowledge_base.llm_routes)
 
     def initialize_project_with_data(self, project_data: ProjectKnowledgeBase):
         """Initializes a project using the ProjectKnowledgeBase object."""
@@ -65,6 +82,8 @@ class ProjectManagerAgent:
         self.project_dir.mkdir(parents=True, exist_ok=True)
         self.project_knowledge_base = project_data
         self.project_knowledge_base.project_dir = self.project_dir
+        if self.llm_client:
+            self._attach_llm_client()
         
         # Ensure worldbuilding is None if not needed
         if not self.project_knowledge_base.worldbuilding_needed:
@@ -75,6 +94,10 @@ class ProjectManagerAgent:
         console.print(f"✨ Project [green]'{project_data.project_name}'[/green] initialized successfully!")    
     def save_project_data(self):
         """Saves project data using the ProjectKnowledgeBase object."""
+        with self._save_lock:
+            self._save_project_data()
+
+    def _save_project_data(self):
         if self.project_knowledge_base and self.project_dir:
             try:
                 # Debug logs before save
@@ -158,6 +181,8 @@ class ProjectManagerAgent:
                 self.                project_knowledge_base = data
                 #CRITICAL: Set project_dir in project_knowledge_base
                 self.project_knowledge_base.project_dir = self.project_dir
+                if self.llm_client:
+                    self._attach_llm_client()
             else:
                 raise ValueError("Failed to load or validate project data.")
 
@@ -219,7 +244,8 @@ class ProjectManagerAgent:
 
     def write_chapter(self, chapter_number: int):
         """Writes a specific chapter."""
-        self.run_agent("chapter_writer",  chapter_number=chapter_number, output_path=str(self.project_dir / f"chapter_{chapter_number}.md"))
+        with usage_context(chapter=chapter_number):
+            self.run_agent("chapter_writer",  chapter_number=chapter_number, output_path=str(self.project_dir / f"chapter_{chapter_number}.md"))
         self.save_project_data()
 
 
@@ -243,9 +269,92 @@ class ProjectManagerAgent:
                 self.edit_style(chapter_number)
 
 
+    def write_and_review_chapters(self, chapter_numbers: List[int]):
+        """
+        Writes, reviews and edits several chapters in order. With AI review and the chapter pipeline
+        enabled, the stages overlap across chapters (see run_chapter_pipeline).
+        """
+        using_ai_review = self.project_knowledge_base and self.project_knowledge_base.review_preference == "AI"
+        if self.settings.chapter_pipeline_enabled and using_ai_review and len(chapter_numbers) > 1:
+            self.run_chapter_pipeline(chapter_numbers)
+            return
+        for chapter_number in chapter_numbers:
+            self.write_and_review_chapter(chapter_number)
+            self.checkpoint()
+
+    def run_chapter_pipeline(self, chapter_numbers: List[int]) -> List[StageStats]:
+        """
+        Runs write, review, edit and style as a pipeline: chapter N+1 is drafted while chapter N is
+        still in review, edit or style. What N+1 continues from is set by chapter_pipeline_context.
+        Prints and returns per-stage throughput metrics.
+        """
+        mode = self.settings.chapter_pipeline_context
+        if mode not in ("draft", "latest", "revised"):
+            console.print(f"[yellow]Unknown chapter_pipeline_context '{mode}'; using 'draft'.[/yellow]")
+            mode = "draft"
+        drafts: Dict[int, str] = {}
+        finished = {chapter_number: threading.Event() for chapter_number in chapter_numbers}
+
+        def wait_for_previous(chapter_number: int) -> None:
+            if mode == "revised" and chapter_number - 1 in finished:
+                finished[chapter_number - 1].wait()
+
+        def write(chapter_number: int) -> bool:
+            chapter_path = self.project_dir / f"chapter_{chapter_number}.md"
+            # The other stages save the knowledge base from their own threads, so add any missing outline here
+            with self._save_lock:
+                self.agents["chapter_writer"].ensure_chapter_outline(self.project_knowledge_base, chapter_number)
+            # The previous chapter's file may already hold its edits; in draft mode continue from the draft
+            previous_text = drafts.get(chapter_number - 1) if mode == "draft" else None
+            with usage_context(chapter=chapter_number):
+                self.run_agent("chapter_writer", chapter_number=chapter_number, output_path=str(chapter_path),
+                               previous_chapter_text=previous_text)
+            draft = read_markdown_file(str(chapter_path))
+            if not draft:
+                return False
+            drafts[chapter_number] = draft
+            self.save_project_data()
+            return True
+
+        def done(chapter_number: int, ok: bool) -> None:
+            finished[chapter_number].set()
+            self.checkpoint()
+            if ok:
+                console.print(f"[green]✅ Chapter {chapter_number} completed successfully[/green]")
+            else:
+                console.print(f"[red]ERROR: Chapter {chapter_number} did not make it through the pipeline. See log.[/red]")
+
+        console.print(f"\n[bold]Pipelining {len(chapter_numbers)} chapters (context: {mode})...[/bold]")
+        pipeline = Pipeline(
+            [
+                Stage("write", write, wait_for=wait_for_previous),
+                Stage("review", self.review_content),
+                Stage("edit", self.edit_chapter),
+                Stage("style", self.edit_style),
+            ],
+            queue_size=self.settings.chapter_pipeline_queue_size,
+            on_finish=done,
+        )
+        stats = pipeline.run(chapter_numbers)
+        self.print_pipeline_stats(stats, pipeline.wall_s)
+        return stats
+
+    def print_pipeline_stats(self, stats: List[StageStats], wall_s: float):
+        """Prints per-stage throughput; the stage with the highest utilization is the bottleneck."""
+        table = Table(title=f"Chapter pipeline ({wall_s:.1f}s)")
+        for column in ("Stage", "Chapters", "Failed", "Busy (s)", "Idle (s)", "Blocked (s)", "Utilization",
+                       "Chapters/min", "Max queue"):
+            table.add_column(column, justify="left" if column == "Stage" else "right")
+        for stage in stats:
+            table.add_row(stage.name, str(stage.processed), str(stage.failed), f"{stage.busy_s:.1f}",
+                          f"{stage.idle_s:.1f}", f"{stage.blocked_s:.1f}", f"{stage.utilization(wall_s):.0%}",
+                          f"{stage.per_minute(wall_s):.2f}", str(stage.max_queue_depth))
+        console.print(table)
+
     def edit_chapter(self, chapter_number: int):
         """Refines an existing chapter (Editor Agent)."""
-        self.run_agent("editor", chapter_number=chapter_number)
+        with usage_context(chapter=chapter_number):
+            self.run_agent("editor", chapter_number=chapter_number)
         self.save_project_data()
 
 
@@ -270,7 +379,7 @@ class ProjectManagerAgent:
             console.print(f"[bold]Formatting book with {total_chapters} chapters...[/bold]")
             
             # --- Original Version ---
-            original_content = ""
+            original_chapters = []
             missing_chapters = []
             
             # Iterate through expected chapters
@@ -278,7 +387,7 @@ class ProjectManagerAgent:
                 chapter_path = self.project_dir / f"chapter_{chapter_num}.md"
                 if chapter_path.exists():
                     chapter_content = read_markdown_file(str(chapter_path))
-                    original_content += chapter_content + "\n\n"
+                    original_chapters.append(chapter_content + "\n\n")
                     console.print(f"[green]✓ Added original Chapter {chapter_num}[/green]")
                 else:
                     missing_chapters.append(chapter_num)
@@ -286,17 +395,14 @@ class ProjectManagerAgent:
             
             if missing_chapters:
                 console.print(f"[yellow]Warning: Missing original chapters: {missing_chapters}[/yellow]")
-                if not original_content:
+                if not original_chapters:
                     console.print("[red]ERROR: No original chapters found to format.[/red]")
                     return
             
-            # Format with LLM to ensure proper structure and flow
-            console.print(f"{self.agents['formatting'].name} is: Formatting Original Chapters...")
-            # FIX: Pass the language to the prompt
-            prompt = prompts.FORMATTING_PROMPT.format(
-                chapters=original_content, 
-                language=self.project_knowledge_base.language)
-            formatted_original = self.llm_client.generate_content(prompt, max_tokens=4000)
+            # Format with LLM to ensure proper structure and flow (in parts if the book is too long for one call)
+            formatter = self.agents["formatting"]
+            console.print(f"{formatter.name} is: Formatting Original Chapters...")
+            formatted_original = formatter.format_chapters(original_chapters, self.project_knowledge_base.language)
             
             # Add title page
             title_page = self.create_title_page(self.project_knowledge_base)
@@ -317,7 +423,7 @@ class ProjectManagerAgent:
                 return
 
             # --- Revised Version ---
-            revised_content = ""
+            revised_chapters = []
             missing_revised_chapters = []
             has_revised_chapters = False
             
@@ -338,12 +444,12 @@ class ProjectManagerAgent:
                 
                 if revised_path.exists():
                     chapter_content = read_markdown_file(str(revised_path))
-                    revised_content += chapter_content + "\n\n"
+                    revised_chapters.append(chapter_content + "\n\n")
                     console.print(f"[green]✓ Added revised Chapter {chapter_num}[/green]")
                 elif original_path.exists():
                     # Fall back to original if revised doesn't exist
                     chapter_content = read_markdown_file(str(original_path))
-                    revised_content += chapter_content + "\n\n"
+                    revised_chapters.append(chapter_content + "\n\n")
                     console.print(f"[blue]→ Using original content for Chapter {chapter_num} (no revision found)[/blue]")
                     missing_revised_chapters.append(chapter_num)
                 else:
@@ -354,12 +460,8 @@ class ProjectManagerAgent:
                 console.print(f"[yellow]Info: {len(missing_revised_chapters)} chapters don't have revised versions[/yellow]")
             
             # Format with LLM
-            console.print(f"{self.agents['formatting'].name} is: Formatting Revised Chapters...")
-            # FIX: Pass the language here too
-            prompt_revised = prompts.FORMATTING_PROMPT.format(
-                chapters=revised_content, 
-                language=self.project_knowledge_base.language)
-            formatted_revised = self.llm_client.generate_content(prompt_revised, max_tokens=4000)
+            console.print(f"{formatter.name} is: Formatting Revised Chapters...")
+            formatted_revised = formatter.format_chapters(revised_chapters, self.project_knowledge_base.language)
             formatted_revised = title_page + formatted_revised
             
             # Save as Markdown or PDF (revised)
@@ -382,41 +484,152 @@ class ProjectManagerAgent:
 
     def edit_style(self, chapter_number: int):
         """Refines writing style."""
-        self.run_agent("style_editor", chapter_number=chapter_number)
+        with usage_context(chapter=chapter_number):
+            self.run_agent("style_editor", chapter_number=chapter_number)
         self.save_project_data()
 
     def check_plagiarism(self, chapter_number: int):
         """Checks for plagiarism."""
         chapter_path = str(self.project_dir / f"chapter_{chapter_number}.md")# type: ignore
-        results = self.agents["plagiarism_checker"].execute(chapter_path)  # type: ignore
+        with usage_context(chapter=chapter_number):
+            results = self.agents["plagiarism_checker"].execute(chapter_path)  # type: ignore
         print(f"Plagiarism check results for chapter {chapter_number}: {results}")
 
     def check_facts(self, chapter_number: int):
         """Checks factual claims."""
         chapter_path = str(self.project_dir / f"chapter_{chapter_number}.md")# type: ignore
-        results = self.agents["fact_checker"].execute(chapter_path)  # type: ignore
+        with usage_context(chapter=chapter_number):
+            results = self.agents["fact_checker"].execute(chapter_path)  # type: ignore
         print(f"Fact-check results for chapter {chapter_number}: {results}")
 
     def review_content(self, chapter_number: int):
             """Reviews chapter content."""
             chapter_path = str(self.project_dir / f"chapter_{chapter_number}.md")
-            results = self.agents["content_reviewer"].execute(chapter_path)
-            print(f"Content review results for chapter {chapter_number}:\n{results.get('review', 'No review available.')}")
-            
-            # --- THE MISSING LINK ---
-            # You need to manually save the review into the knowledge base!
-            if self.project_knowledge_base:
+            with usage_context(chapter=chapter_number):
+                results = self.agents["content_reviewer"].execute(chapter_path)
+            self.store_review(chapter_number, results.get('review', ''))
+
+    def store_review(self, chapter_number: int, review: str):
+        """Prints a chapter review and saves it into the knowledge base."""
+        print(f"Content review results for chapter {chapter_number}:\n{review or 'No review available.'}")
+
+        # --- THE MISSING LINK ---
+        # You need to manually save the review into the knowledge base!
+        if self.project_knowledge_base:
+            with self._save_lock:  # The chapter pipeline stores reviews while other stages save
                 chapter = self.project_knowledge_base.get_chapter(chapter_number)
                 if chapter:
                     # Store the review text in the chapter object
-                    chapter.review = results.get('review', '')
+                    chapter.review = review
                     self.save_project_data() # Save immediately
 
+    # --- Batch mode (OpenAI / Claude batch APIs) ---
+
+    def write_chapters_batch(self, chapter_numbers: List[int]):
+        """
+        Writes every scene of the given chapters in one provider batch job.
+        Chapters whose predecessor is not written yet get that chapter's outline summary as context.
+        """
+        writer = self.agents["chapter_writer"]
+        kb = self.project_knowledge_base
+        batch_requests: List[BatchRequest] = []
+        plan: Dict[int, List[Tuple[str, str, int]]] = {}  # chapter -> [(custom_id, scene title, scene number)]
+        codex = writer.load_codex(self.project_dir)
+        retrieval = writer.load_retrieval_index(kb)
+
+        for chapter_number in chapter_numbers:
+            chapter = kb.get_chapter(chapter_number)
+            if not chapter or not chapter.scenes:
+                console.print(f"[yellow]Skipping chapter {chapter_number} in batch: no outlined scenes.[/yellow]")
+                continue
+            ordered_scenes = sorted(chapter.scenes, key=lambda s: s.scene_number)
+            scene_context = writer.build_scene_context(self._batch_previous_context(chapter_number, chapter_numbers))
+            plan[chapter_number] = []
+            for scene in ordered_scenes:
+                custom_id = f"chapter-{chapter_number}-scene-{scene.scene_number}"
+                prompt = writer.build_scene_prompt(kb, chapter, scene, len(ordered_scenes), codex, retrieval)
+                batch_requests.append(BatchRequest(custom_id, prompt, max_tokens=2000, prefix=scene_context,
+                                                   labels={"chapter": chapter_number}))
+                plan[chapter_number].append((custom_id, writer.scene_title(scene), scene.scene_number))
+
+        results = BatchClient(writer.llm_client, self.project_dir).run(batch_requests, operation="scene_write")
+
+        for chapter_number, scenes in plan.items():
+            chapter = kb.get_chapter(chapter_number)
+            contents = [
+                writer.finalize_scene(results[custom_id].text if custom_id in results else "", title, number)
+                for custom_id, title, number in scenes
+            ]
+            write_markdown_file(
+                str(self.project_dir / f"chapter_{chapter_number}.md"),
+                f"## Chapter {chapter_number}: {chapter.title}\n\n" + "\n\n".join(contents),
+            )
+            console.print(f"[green]✅ Chapter {chapter_number} completed with {len(scenes)} scenes![/green]")
+        self.save_project_data()
+
+    def review_chapters_batch(self, chapter_numbers: List[int]):
+        """Reviews the given (already written) chapters in one provider batch job."""
+        reviewer = self.agents["content_reviewer"]
+        batch_requests: List[BatchRequest] = []
+        keys: Dict[int, Optional[str]] = {}
+        for chapter_number in chapter_numbers:
+            chapter_path = str(self.project_dir / f"chapter_{chapter_number}.md")
+            prompt = reviewer.build_prompt(chapter_path)
+            if prompt is None:
+                continue
+            keys[chapter_number] = reviewer.chapter_review_key(chapter_path)
+            stored = reviewer.stored_review(chapter_path, keys[chapter_number])
+            if stored is not None:  # Unchanged since its last review
+                self.store_review(chapter_number, stored)
+                continue
+            batch_requests.append(BatchRequest(f"review-{chapter_number}", prompt, max_tokens=1500,
+                                               labels={"chapter": chapter_number}))
+        if not batch_requests:
+            return
+
+        results = BatchClient(reviewer.llm_client, self.project_dir).run(batch_requests, operation="review")
+
+        for request in batch_requests:
+            chapter_number = request.labels["chapter"]
+            result = results.get(request.custom_id)
+            review = result.text if result else ""
+            reviewer.store_review(str(self.project_dir / f"chapter_{chapter_number}.md"), keys[chapter_number], review)
+            self.store_review(chapter_number, review)
+
+    def write_and_review_chapters_batch(self, chapter_numbers: List[int]):
+        """Batch counterpart of write_and_review_chapter: one batch per stage, then the usual AI edits."""
+        self.write_chapters_batch(chapter_numbers)
+        self.review_chapters_batch(chapter_numbers)
+        if self.project_knowledge_base and self.project_knowledge_base.review_preference == "AI":
+            for chapter_number in chapter_numbers:
+                self.edit_chapter(chapter_number)
+                self.edit_style(chapter_number)
+
+    def _batch_previous_context(self, chapter_number: int, batch_chapters: List[int]) -> str:
+        """Previous-chapter context for a batched scene prompt."""
+        previous = chapter_number - 1
+        if previous < 1 or previous not in batch_chapters:
+            if self.settings.story_summaries_enabled:
+                # Same digest as interactive writing (ChapterWriterAgent.execute)
+                return SummaryStore(self.project_dir, self.agents["chapter_writer"].llm_client).story_context(
+                    self.project_knowledge_base, chapter_number)
+            return get_previous_chapter_context(self.project_dir, chapter_number,
+                                                self.settings.previous_chapter_context_tokens,
+                                                self.llm_client.llm_provider, self.llm_client.model)
+        previous_chapter = self.project_knowledge_base.get_chapter(previous)
+        summary = previous_chapter.summary if previous_chapter else "Not available."
+        # The previous chapter is written in the same batch, so only its outline is known
+        return f"Summary of Chapter {previous} (written in parallel with this one):\n{summary}"
+
     def does_chapter_exist(self, chapter_number: int) -> bool:
         """Checks if a chapter file exists."""
         chapter_path = self.project_dir / f"chapter_{chapter_number}.md" # type: ignore
         return chapter_path.exists()
 
+    def is_chapter_complete(self, chapter_number: int) -> bool:
+        """True if the chapter file exists and no scene checkpoints are left to resume."""
+        return self.does_chapter_exist(chapter_number) and not SceneCheckpoint.pending(self.project_dir, chapter_number)
+
     def checkpoint(self):
         """Saves the current project state silently."""
         try:
@@ -1,25 +1,66 @@
 # src/libriscribe/agents/style_editor.py
 
 import logging
+import re
 from pathlib import Path
+from typing import List, Optional
 
 from libriscribe.agents.agent_base import Agent
-from libriscribe.utils.llm_client import LLMClient
+from libriscribe.utils.chunking import split_scenes, split_text
+from libriscribe.utils.llm_client import LLMClient, gather_with_concurrency, run_async
+from libriscribe.utils.llm_errors import LLMError
+from libriscribe.utils.edit_ops import aedit_with_ops
 from libriscribe.utils.file_utils import read_markdown_file, write_markdown_file, read_json_file, extract_json_from_markdown
 
 from libriscribe.knowledge_base import ProjectKnowledgeBase
 from rich.console import Console
 console = Console()
 logger = logging.getLogger(__name__)
+
+STYLE_MAX_TOKENS = 3000
+STYLED_OUTPUT_RATIO = 1.1  # Style edits keep the length roughly the same
+# Shared by every scene of a chapter
+STYLE_HEADER = """
+        You are a style editor. Refine the writing style of the following chapter excerpt...
+
+        Target Tone: {tone}
+        Target Audience: {target_audience}
+        Language: {language}
+"""
+STYLE_PART_NOTE = """
+        This excerpt is part {part} of {parts} of Chapter {chapter_number}; the other parts are edited separately
+        and joined back in order. Keep its scene title line exactly as it is, do not add a chapter heading,
+        and keep its opening and closing lines connecting to the parts before and after it.
+"""
+STYLE_REWRITE_OUTPUT = """
+        Make specific suggestions for changes, and then provide the REVISED text within a Markdown code block.
+
+        ```markdown
+        [The full revised chapter content]
+        ```
+"""
+STYLE_EXCERPT = """
+        Chapter Excerpt:
+        ---
+        {excerpt}
+        ---
+        """
+
+_HEADING_LINES = re.compile(r"\A(?:[ \t]*\n)*(?:#{1,2} [^\n]*\n?(?:[ \t]*\n)*)+")
+_TERMINAL = tuple('.!?"”’\')*_…')
+
+
 class StyleEditorAgent(Agent):
     """Refines the writing style of a chapter."""
 
     def __init__(self, llm_client: LLMClient):
         super().__init__("StyleEditorAgent", llm_client)
-        self.llm_client = llm_client
 
     def execute(self, project_knowledge_base: ProjectKnowledgeBase, chapter_number: int) -> None:
-        """Refines style based on project settings."""
+        """
+        Refines style based on project settings. The chapter is edited scene by scene, with up to
+        llm_max_concurrency scenes at once, and reassembled; the chapter heading is kept as is.
+        """
         chapter_path = str(Path(project_knowledge_base.project_dir) / f"chapter_{chapter_number}.md")
         chapter_content = read_markdown_file(chapter_path)
         if not chapter_content:
@@ -29,61 +70,116 @@ class StyleEditorAgent(Agent):
         # Get tone and target_audience with default values if not present
         tone = getattr(project_knowledge_base, 'tone', 'Informative')
         target_audience = getattr(project_knowledge_base, 'target_audience', 'General')
-        
-        console.print(f"🎨 [cyan]Polishing writing style for Chapter {chapter_number}...[/cyan]")
-        prompt = f"""
-        You are a style editor. Refine the writing style of the following chapter excerpt...
+        header = STYLE_HEADER.format(tone=tone, target_audience=target_audience, language=project_knowledge_base.language)
 
-        Target Tone: {tone}
-        Target Audience: {target_audience}
-        Language: {project_knowledge_base.language}
+        heading, parts = self.split_chapter(chapter_content, header)
+        width = min(self.llm_client.settings.llm_max_concurrency, len(parts)) or 1
+        console.print(f"🎨 [cyan]Polishing writing style for Chapter {chapter_number}"
+                      + (f" ({len(parts)} parts, {width} at a time)" if len(parts) > 1 else "") + "...[/cyan]")
+        try:
+            styled = run_async(gather_with_concurrency(
+                [self.astyle_part(header, part, number, len(parts), chapter_number, project_knowledge_base.language)
+                 for number, part in enumerate(parts, 1)],
+                width,
+            ))
+        except Exception as e:
+            self.logger.exception(f"Error during style editing for {chapter_path}: {e}")
+            print(f"ERROR: Failed to edit style for chapter {chapter_path}. See log.")
+            return
 
-        Make specific suggestions for changes, and then provide the REVISED text within a Markdown code block.
+        if not any(styled):
+            print(f"ERROR: Could not extract revised text for {chapter_path}.")
+            self.logger.error(f"Could not extract from StyleEditor responses for {chapter_path}.")
+            return
+        revised_parts = [self.smooth_boundary(part, revised, number) for number, (part, revised)
+                         in enumerate(zip(parts, styled), 1)]
+        revised_text = "\n\n".join(filter(None, [heading.strip()] + [part.strip() for part in revised_parts]))
+        write_markdown_file(chapter_path, revised_text + "\n")
+        console.print(f"[green]✅ Style improvements applied to Chapter {chapter_number}![/green]")
 
-        ```markdown
-        [The full revised chapter content]
-        ```
+    def split_chapter(self, chapter_content: str, header: str):
+        """
+        (chapter heading, parts): the chapter cut at its scene titles, with scenes too long for
+        one call cut further at paragraphs.
+        """
+        match = _HEADING_LINES.match(chapter_content)
+        heading = match.group(0) if match else ""
+        template = header + STYLE_PART_NOTE + STYLE_REWRITE_OUTPUT + STYLE_EXCERPT
+        budget = min(self.llm_client.max_chunk_tokens(template, STYLED_OUTPUT_RATIO),
+                     int(STYLE_MAX_TOKENS / STYLED_OUTPUT_RATIO))
+        parts: List[str] = []
+        for scene in split_scenes(chapter_content[len(heading):]):
+            if scene.strip():
+                parts.extend(split_text(scene, budget, self.llm_client.count_tokens))
+        return heading, parts
 
-        Chapter Excerpt:
-        ---
-        {chapter_content}
-        ---
-        """  # Added Markdown code block
+    async def astyle_part(self, header: str, part: str, number: int, parts: int, chapter_number: int,
+                          language: str) -> Optional[str]:
+        """The style-edited part: edit operations when edit_mode is "diff", else (or if they fail) a rewrite."""
+        note = STYLE_PART_NOTE.format(part=number, parts=parts, chapter_number=chapter_number) if parts > 1 else ""
+        excerpt = STYLE_EXCERPT.format(excerpt=part.strip())
         try:
-            response = self.llm_client.generate_content(prompt, max_tokens=3000)
-            
-            # Extract the revised content from the response
-            if "```" in response:
-                start = response.find("```") + 3
-                end = response.rfind("```")
-                
-                # Skip the language identifier if present (e.g., ```markdown)
-                next_newline = response.find("\n", start)
-                if next_newline < end and next_newline != -1:
-                    start = next_newline + 1
-                
-                revised_text = response[start:end].strip()
-            else:
-                # If no code blocks, try to extract the content after a leading explanation
-                lines = response.split("\n")
-                content_start = 0
-                for i, line in enumerate(lines):
-                    if line.startswith("#") or line.startswith("Chapter"):
-                        content_start = i
-                        break
-                
-                if content_start > 0:
-                    revised_text = "\n".join(lines[content_start:])
+            if self.llm_client.settings.edit_mode == "diff":
+                revised = await aedit_with_ops(self.llm_client, header + note + excerpt, part.strip(), "style_edit", language)
+                if revised:
+                    return revised
+            response = await self.llm_client.agenerate_content(
+                header + note + STYLE_REWRITE_OUTPUT + excerpt, max_tokens=STYLE_MAX_TOKENS, operation="style_edit")
+        except LLMError as e:
+            if e.fatal:
+                raise
+            console.print(f"[yellow]Warning: style edit of part {number} of Chapter {chapter_number} failed "
+                          f"({e.kind}); keeping it unchanged.[/yellow]")
+            return None
+        return self.extract_revised_text(response)
+
+    def extract_revised_text(self, response: str) -> str:
+        """The revised text from the reply, without code fences or a leading explanation."""
+        if "```" in response:
+            start = response.find("```") + 3
+            end = response.rfind("```")
+
+            # Skip the language identifier if present (e.g., ```markdown)
+            next_newline = response.find("\n", start)
+            if next_newline < end and next_newline != -1:
+                start = next_newline + 1
+
+            return response[start:end].strip()
+        # If no code blocks, try to extract the content after a leading explanation
+        lines = response.split("\n")
+        content_start = 0
+        for i, line in enumerate(lines):
+            if line.startswith("#") or line.startswith("Chapter"):
+                content_start = i
+                break
+
+        if content_start > 0:
+            return "\n".join(lines[content_start:])
+        return response
+
+    def smooth_boundary(self, original: str, revised: Optional[str], number: int) -> str:
+        """
+        Checks a styled part before it is joined to the others: drops a chapter heading the model
+        added, restores the scene title if it was lost or changed, and keeps the original part when
+        the reply is missing or looks truncated.
+        """
+        original = original.strip()
+        if not revised or not revised.strip():
+            return original
+        revised = _HEADING_LINES.sub("", revised.strip()).strip() if not _HEADING_LINES.match(original) else revised.strip()
+
+        title = original.split("\n", 1)[0].strip()
+        if re.match(r"(?:\*\*|#{3,}\s*)Scene\s+\d+", title, re.IGNORECASE):
+            first_line, _, rest = revised.partition("\n")
+            if first_line.strip() != title:
+                if re.match(r"(?:\*\*|#{3,}\s*)Scene\s+\d+", first_line.strip(), re.IGNORECASE):
+                    revised = f"{title}\n{rest}"
                 else:
-                    revised_text = response
-            
-            if revised_text:
-                write_markdown_file(chapter_path, revised_text)
-                console.print(f"[green]✅ Style improvements applied to Chapter {chapter_number}![/green]")
-            else:
-                print(f"ERROR: Could not extract revised text for {chapter_path}.")
-                self.logger.error(f"Could not extract from StyleEditor response for {chapter_path}.")
+                    revised = f"{title}\n\n{revised}"
 
-        except Exception as e:
-            self.logger.exception(f"Error during style editing for {chapter_path}: {e}")
-            print(f"ERROR: Failed to edit style for chapter {chapter_path}. See log.")
\ No newline at end of file
+        # A reply cut off by max_tokens ends mid-sentence or loses much of the text
+        truncated = original.endswith(_TERMINAL) and not revised.endswith(_TERMINAL)
+        if truncated or len(revised.split()) < 0.5 * len(original.split()):
+            self.logger.warning(f"Style edit of part {number} looks truncated; keeping the original")
+            return original
+        return revised
@@ -8,7 +8,8 @@ from pathlib import Path
 from libriscribe.utils.llm_client import LLMClient
 from libriscribe.utils import prompts_context as prompts
 from libriscribe.agents.agent_base import Agent
-from libriscribe.utils.file_utils import write_json_file, extract_json_from_markdown
+from libriscribe.utils.file_utils import write_json_file
+from libriscribe.utils.structured_output import OutputSchema
 from libriscribe.utils.prompts_context import get_worldbuilding_aspects #Import the correct function
 
 from libriscribe.knowledge_base import ProjectKnowledgeBase, Worldbuilding
@@ -46,17 +47,41 @@ class WorldbuildingAgent(Agent):
                 # ... other relevant fields
             )
 
-            worldbuilding_json_str = self.llm_client.generate_content_with_json_repair(prompt, max_tokens=4000, temperature=0.7)
-            if not worldbuilding_json_str:
-                print("ERROR: Worldbuilding generation failed.")
-                return
+            # Get the list of expected fields based on category.
+            if project_knowledge_base.category.lower() == "fiction":
+                expected_fields = [
+                    "geography", "culture_and_society", "history", "rules_and_laws",
+                    "technology_level", "magic_system", "key_locations",
+                    "important_organizations", "flora_and_fauna", "languages",
+                    "religions_and_beliefs", "economy", "conflicts"
+                ]
+            elif project_knowledge_base.category.lower() == "non-fiction":
+                expected_fields = [
+                    "setting_context", "key_figures", "major_events", "underlying_causes",
+                    "consequences", "relevant_data", "different_perspectives",
+                    "key_concepts"
+                ]
+            elif project_knowledge_base.category.lower() == "business":
+                expected_fields = [
+                    "industry_overview", "target_audience", "market_analysis",
+                    "business_model", "marketing_and_sales_strategy", "operations",
+                    "financial_projections", "management_team",
+                    "legal_and_regulatory_environment", "risks_and_challenges",
+                    "opportunities_for_growth"
+                ]
+            elif project_knowledge_base.category.lower() == "research paper":
+                expected_fields = [
+                    "introduction", "literature_review", "methodology", "results",
+                    "discussion", "conclusion", "references", "appendices"
+                ]
+            else:
+                expected_fields = []
+
+            schema = OutputSchema.from_model(Worldbuilding, "worldbuilding", fields=expected_fields or None)
+            worldbuilding_data = self.llm_client.generate_structured(prompt, schema, max_tokens=4000, temperature=0.7,
+                                                                     operation="worldbuilding")
 
             try:
-                worldbuilding_data = extract_json_from_markdown(worldbuilding_json_str)
-                if worldbuilding_data is None:
-                    print("ERROR: Invalid worldbuilding data received (could not extract JSON).")
-                    return
-
                 if not isinstance(worldbuilding_data, dict):
                     self.logger.warning("Worldbuilding data is not a dictionary.")
                     worldbuilding_data = {}
@@ -78,36 +103,6 @@ class WorldbuildingAgent(Agent):
                     else:
                         flattened_data[key] = json.dumps(value)  # Handle other types
 
-                # Get the list of expected fields based on category.
-                if project_knowledge_base.category.lower() == "fiction":
-                    expected_fields = [
-                        "geography", "culture_and_society", "history", "rules_and_laws",
-                        "technology_level", "magic_system", "key_locations",
-                        "important_organizations", "flora_and_fauna", "languages",
-                        "religions_and_beliefs", "economy", "conflicts"
-                    ]
-                elif project_knowledge_base.category.lower() == "non-fiction":
-                    expected_fields = [
-                        "setting_context", "key_figures", "major_events", "underlying_causes",
-                        "consequences", "relevant_data", "different_perspectives",
-                        "key_concepts"
-                    ]
-                elif project_knowledge_base.category.lower() == "business":
-                    expected_fields = [
-                        "industry_overview", "target_audience", "market_analysis",
-                        "business_model", "marketing_and_sales_strategy", "operations",
-                        "financial_projections", "management_team",
-                        "legal_and_regulatory_environment", "risks_and_challenges",
-                        "opportunities_for_growth"
-                    ]
-                elif project_knowledge_base.category.lower() == "research paper":
-                    expected_fields = [
-                        "introduction", "literature_review", "methodology", "results",
-                        "discussion", "conclusion", "references", "appendices"
-                    ]
-                else:
-                    expected_fields = []
-
                 # Create a new clean Worldbuilding object with only the expected fields
                 clean_worldbuilding = Worldbuilding()
                     
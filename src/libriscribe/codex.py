@@ -556,7 +556,8 @@ class MasterCodex(BaseModel):
     def get_scene_context(self, chapter: int, scene: int) -> Dict[str, Any]:
         """
         Assemble full context for a scene.
-        This is what gets passed to the chapter writer.
+        Everything up to the chapter; scene prompts use the ranked, token-budgeted
+        subset from utils.codex_context.assemble_scene_context() instead.
         """
         ch = self.get_chapter(chapter)
         if not ch:
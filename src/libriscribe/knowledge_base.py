@@ -101,6 +101,8 @@ class ProjectKnowledgeBase(BaseModel):
     num_chapters: Union[int, Tuple[int, int]] = 1  # Keep for chapter generation, advanced mode
     num_chapters_str: str = "" #Keep for advanced
     llm_provider: str = "openai"
+    llm_tiers: Dict[str, Dict[str, Any]] = {}  # Model tier overrides, see utils/model_router.py
+    llm_routes: Dict[str, str] = {}  # Operation -> tier overrides
     dynamic_questions: Dict[str, str] = {} #Keep for advanced
 
     characters: Dict[str, Character] = {}  # Character name -> Character object
@@ -54,6 +54,8 @@ def select_llm(project_knowledge_base: ProjectKnowledgeBase):
         available_llms.append("deepseek")
     if settings.mistral_api_key:
         available_llms.append("mistral")
+    if settings.mock_llm_enabled:
+        available_llms.append("mock")
 
     if not available_llms:
         console.print("[red]❌ No LLM API keys found in .env file. Please add at least one.[/red]")
@@ -156,7 +158,7 @@ def generate_questions_with_llm(category: str, genre: str) -> Dict[str, Any]:
         return {}
 
     try:
-        response = llm_client.generate_content(prompt, max_tokens=500)
+        response = llm_client.generate_content(prompt, max_tokens=500, operation="questions")
         
         # Clean the response - find JSON content
         response = response.strip()
@@ -311,6 +313,9 @@ def write_and_review_chapters(project_knowledge_base: ProjectKnowledgeBase):
     if using_ai_review and num_chapters > 1:
         if not typer.confirm(f"\nAI will automatically write and review all {num_chapters} chapters. Proceed?"):
             return
+
+    # With AI review the chapters can be pipelined: the next chapter is drafted while the last is edited
+    pipelined = using_ai_review and num_chapters > 1 and project_manager.settings.chapter_pipeline_enabled
     
     for i in range(1, num_chapters + 1):
         chapter = project_knowledge_base.get_chapter(i)
@@ -322,6 +327,8 @@ def write_and_review_chapters(project_knowledge_base: ProjectKnowledgeBase):
                 summary="To be written"
             )
             project_knowledge_base.add_chapter(chapter)  # Add to knowledge base!
+        if pipelined:
+            continue  # Written after the loop; the pipeline reports each chapter as it goes (AI review overwrites)
 
         console.print(f"\n[cyan]Writing Chapter {i}: {chapter.title}[/cyan]")
 
@@ -348,6 +355,9 @@ def write_and_review_chapters(project_knowledge_base: ProjectKnowledgeBase):
             if not typer.confirm("\nContinue to next chapter?"):
                 break
 
+    if pipelined:
+        project_manager.write_and_review_chapters(list(range(1, num_chapters + 1)))
+
     console.print("\n[green]Chapter writing process completed![/green]")
 
 def format_book(project_knowledge_base: ProjectKnowledgeBase): 
@@ -404,9 +414,7 @@ def simple_mode():
         if using_ai_review and num_chapters > 1:
             if typer.confirm(f"AI will automatically write and review all {num_chapters} chapters. Proceed?"):
                 # Write all chapters automatically
-                for chapter_num in range(1, num_chapters + 1):
-                    project_manager.write_and_review_chapter(chapter_num)
-                    project_manager.checkpoint()
+                project_manager.write_and_review_chapters(list(range(1, num_chapters + 1)))
         else:
             # User interaction for each chapter
             for chapter_num in range(1, num_chapters + 1):
@@ -861,7 +869,8 @@ def resume(project_name: str = typer.Option(..., prompt="Project name to resume"
                 num_chapters = num_chapters[1]
 
             for i in range(1, num_chapters + 1):  # Iterate in order
-                if (project_manager.project_dir / f"chapter_{i}.md").exists():
+                # A chapter with scene checkpoints left was interrupted (or has failed scenes); resume it
+                if project_manager.is_chapter_complete(i):
                     last_chapter = i
                 else:
                     break  # Stop at the first missing chapter
@@ -893,8 +902,7 @@ def resume(project_name: str = typer.Option(..., prompt="Project name to resume"
             # --- NEW LOGIC END ---
 
             # Check the project data and files to determine next steps
-            for i in range(last_chapter + 1, num_chapters + 1):
-                 project_manager.write_and_review_chapter(i)
+            project_manager.write_and_review_chapters(list(range(last_chapter + 1, num_chapters + 1)))
             if typer.confirm("Do you want to format now the book?"):
                 format()
 
@@ -914,6 +922,47 @@ def resume(project_name: str = typer.Option(..., prompt="Project name to resume"
         print(f"Error loading project data: {e}")
 
 
+@app.command()
+def batch(
+    project_name: str = typer.Option(..., "--project", "-p", prompt="Project name"),
+    stage: str = typer.Option("all", "--stage", "-s", help="write, review, or all (write, review, then AI edits)"),
+    chapters: str = typer.Option(None, "--chapters", "-c", help="Chapter range such as 1-10 (default: all chapters)"),
+):
+    """Runs a stage for many chapters as one discounted OpenAI/Claude batch job (results may take hours)."""
+    from libriscribe.utils.batch_api import BatchError
+
+    try:
+        project_manager.load_project_data(project_name)
+        llm_provider = project_manager.project_knowledge_base.get("llm_provider")
+        if not llm_provider:
+            llm_provider = select_llm(project_manager.project_knowledge_base)
+        project_manager.initialize_llm_client(llm_provider)
+
+        if chapters:
+            start, _, end = chapters.partition("-")
+            chapter_numbers = list(range(int(start), int(end or start) + 1))
+        else:
+            chapter_numbers = sorted(project_manager.project_knowledge_base.chapters.keys())
+
+        if stage == "write":
+            project_manager.write_chapters_batch(chapter_numbers)
+        elif stage == "review":
+            project_manager.review_chapters_batch(chapter_numbers)
+        elif stage == "all":
+            project_manager.write_and_review_chapters_batch(chapter_numbers)
+        else:
+            console.print(f"[red]Unknown stage '{stage}'. Use write, review or all.[/red]")
+            return
+        console.print(f"[green]✅ Batch {stage} finished for chapters {chapter_numbers}.[/green]")
+
+    except BatchError as e:
+        console.print(f"[red]Batch error: {e}[/red]")
+    except FileNotFoundError:
+        print(f"Project '{project_name}' not found.")
+    except ValueError as e:
+        print(f"Error: {e}")
+
+
 
 
 # =============================================================================
@@ -1035,10 +1084,12 @@ def codex_show(
 def codex_context(
     project_name: str = typer.Option(None, "--project", "-p", help="Project name"),
     chapter: int = typer.Option(..., "--chapter", "-c", help="Chapter number"),
-    scene: int = typer.Option(1, "--scene", "-s", help="Scene number")
+    scene: int = typer.Option(1, "--scene", "-s", help="Scene number"),
+    tokens: int = typer.Option(None, "--tokens", "-t", help="Token budget for the codex notes (default: CODEX_CONTEXT_TOKENS)"),
 ):
     """Get full context for writing a specific scene."""
     from libriscribe.codex import MasterCodex
+    from libriscribe.utils.codex_context import assemble_scene_context
     from pathlib import Path
 
     settings = Settings()
@@ -1075,6 +1126,10 @@ def codex_context(
 
     console.print(f"\n[bold]Themes:[/bold] {', '.join(context.get('global_themes', [])[:3])}")
 
+    # What the chapter writer adds to this scene's prompt
+    notes = assemble_scene_context(codex, chapter, scene, tokens or settings.codex_context_tokens)
+    console.print(f"\n[bold]Codex notes for the scene prompt:[/bold]\n{notes or 'None.'}")
+
 
 @app.command()
 def analyze(
@@ -1197,6 +1252,116 @@ def next_action(
         console.print(f"[red]Error: {e}[/red]")
 
 
+@app.command()
+def cache_stats(
+    project_name: str = typer.Option(None, "--project", "-p", help="Project name"),
+    clear: bool = typer.Option(False, "--clear", help="Delete all cached LLM responses"),
+):
+    """Show LLM response cache hits, misses and size for a project."""
+    from libriscribe.utils.llm_cache import LLMResponseCache, CACHE_DIR_NAME, CACHE_FILE_NAME
+    from pathlib import Path
+
+    settings = Settings()
+
+    if not project_name:
+        projects_dir = Path(settings.projects_dir)
+        if projects_dir.exists():
+            projects = [p.name for p in projects_dir.iterdir() if p.is_dir()]
+            if projects:
+                project_name = select_from_list("Select a project:", projects)
+            else:
+                console.print("[red]No projects found.[/red]")
+                return
+
+    project_path = Path(settings.projects_dir) / project_name
+    if not (project_path / CACHE_DIR_NAME / CACHE_FILE_NAME).exists():
+        console.print(f"[yellow]No LLM cache found for '{project_name}'.[/yellow]")
+        return
+
+    cache = LLMResponseCache(
+        max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+        max_age_days=settings.llm_cache_max_age_days,
+    )
+    cache.attach(project_path)
+
+    if clear:
+        cache.clear()
+        console.print("[green]LLM cache cleared.[/green]")
+        return
+
+    stats = cache.stats()
+    console.print(Panel(
+        f"Entries: {stats['entries']} ({stats['bytes'] / 1024:.1f} KB)\n"
+        f"Hits: {stats['total_hits']}\n"
+        f"Misses: {stats['total_misses']}\n"
+        f"Hit rate: {stats['hit_rate']:.0%}",
+        title="LLM Response Cache"
+    ))
+
+
+@app.command()
+def usage(
+    project_name: str = typer.Option(None, "--project", "-p", help="Project name"),
+    by: List[str] = typer.Option(
+        ["chapter", "agent", "provider", "tier"], "--by", "-b",
+        help="Group by chapter, agent, provider, model, tier or operation (repeatable)"
+    ),
+):
+    """Show LLM token usage, latency and estimated cost for a project."""
+    from libriscribe.utils.usage_ledger import load_usage, summarize_usage
+    from rich.table import Table
+    from pathlib import Path
+
+    settings = Settings()
+
+    if not project_name:
+        projects_dir = Path(settings.projects_dir)
+        if projects_dir.exists():
+            projects = [p.name for p in projects_dir.iterdir() if p.is_dir()]
+            if projects:
+                project_name = select_from_list("Select a project:", projects)
+            else:
+                console.print("[red]No projects found.[/red]")
+                return
+
+    records = load_usage(Path(settings.projects_dir) / project_name)
+    if not records:
+        console.print(f"[yellow]No usage recorded for '{project_name}'.[/yellow]")
+        return
+
+    for grouping in by:
+        summary = summarize_usage(records, grouping)
+        table = Table(title=f"Usage by {grouping}")
+        table.add_column(grouping.capitalize(), style="cyan")
+        for column in ("Calls", "Cached", "Failed", "Prompt tok", "Prefix-cached tok", "Output tok", "Latency (s)", "Avg latency (s)", "Retries", "Cost ($)"):
+            table.add_column(column, justify="right")
+
+        def sort_key(key: str):
+            return (0, int(key), "") if key.isdigit() else (1, 0, key)
+
+        for key in sorted(summary, key=sort_key):
+            row = summary[key]
+            uncached_calls = row["calls"] - row["cache_hits"]
+            table.add_row(
+                key,
+                str(int(row["calls"])),
+                str(int(row["cache_hits"])),
+                str(int(row["failures"])),
+                f"{int(row['prompt_tokens']):,}",
+                f"{int(row.get('cached_tokens', 0)):,}",
+                f"{int(row['completion_tokens']):,}",
+                f"{row['latency_s']:.1f}",
+                f"{row['latency_s'] / uncached_calls:.2f}" if uncached_calls else "-",
+                str(int(row["retries"])),
+                f"{row['cost_usd']:.4f}",
+            )
+        console.print(table)
+
+    total_cost = sum(r.get("cost_usd", 0.0) for r in records)
+    total_latency = sum(r.get("latency_s", 0.0) for r in records)
+    console.print(f"[bold]Total:[/bold] {len(records)} calls, {total_latency:.1f}s of LLM time, ${total_cost:.4f} estimated")
+
+
 if __name__ == "__main__":
     # Display environment info for debugging
     if "--debug" in sys.argv:
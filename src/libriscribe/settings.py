@@ -1,6 +1,7 @@
 # src/libriscribe/settings.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
+from typing import Any, Dict, List
 
 class Settings(BaseSettings):
     openai_api_key: str = ""  # Optional, can be empty
@@ -13,5 +14,79 @@ class Settings(BaseSettings):
     openrouter_model: str = "x-ai/grok-4"
     projects_dir: str = str(Path(__file__).parent.parent.parent / "projects")
     default_llm: str = "openai" # Set a default
+    llm_max_concurrency: int = 4  # Max in-flight requests for LLMClient.generate_many
+    llm_cache_enabled: bool = True  # Reuse responses to byte-identical prompts (stored per project)
+    llm_cache_max_mb: int = 256
+    llm_cache_max_age_days: int = 30
+    llm_streaming: bool = True  # Stream chapter and edit output to disk as tokens arrive
+    # "diff": the editor and style editor return anchored edit operations that are applied locally,
+    # with a full rewrite only when more than edit_ops_max_failure_ratio of them cannot be applied.
+    # "rewrite": they always return the whole revised text.
+    edit_mode: str = "diff"
+    edit_ops_max_failure_ratio: float = 0.25
+    scene_concurrency: int = 1  # Scenes of a chapter written at once; 1 writes (and streams) them one by one
+    # Chapter pipeline (AI review only): draft chapter N+1 while chapter N is reviewed, edited and style-edited.
+    # chapter_pipeline_context picks what chapter N+1 continues from: "draft" (N's first draft), "latest"
+    # (N's revision if it is ready, else its draft) or "revised" (wait for N's revision; no overlap in writing)
+    chapter_pipeline_enabled: bool = False
+    chapter_pipeline_context: str = "draft"
+    chapter_pipeline_queue_size: int = 2  # Chapters a stage may run ahead of the next
+    previous_chapter_context_tokens: int = 4000  # Ending of the previous chapter sent with each scene prompt
+    # Story-so-far digest from cached scene, chapter and arc summaries (see utils/summary_store.py);
+    # when enabled it replaces the long previous-chapter excerpt above
+    story_summaries_enabled: bool = True
+    story_summary_tokens: int = 1500  # Budget for the summaries
+    story_summary_tail_tokens: int = 600  # Ending of the previous chapter sent verbatim with them
+    story_arc_chapters: int = 5  # Chapters per arc rollup
+    retrieval_top_k: int = 4  # Passages of earlier chapters, codex and worldbuilding (BM25) per scene prompt; 0 disables
+    retrieval_context_tokens: int = 600  # Budget for those passages
+    fact_check_batch_size: int = 8  # Claims verified per call (batches run concurrently); 1 checks them one by one
+    codex_context_tokens: int = 800  # Budget for the most relevant codex.json entries in each scene prompt; 0 disables
+    # Rate limiting, shared by all agents. Per-provider or per-model overrides go in llm_rate_limits,
+    # e.g. LLM_RATE_LIMITS='{"claude": {"requests_per_minute": 50}, "openai:gpt-4o": {"tokens_per_minute": 30000}}'
+    llm_requests_per_minute: int = 60  # 0 disables the request budget
+    llm_tokens_per_minute: int = 200000  # 0 disables the token budget
+    llm_max_in_flight: int = 8
+    llm_rate_limits: Dict[str, Dict[str, int]] = {}
+    # Retries per error kind (rate_limited, transient, malformed_output, content_filtered, auth, invalid_request),
+    # merged over the defaults in utils/retry_policy.py, e.g. LLM_MAX_RETRIES='{"transient": 5}'
+    llm_max_retries: Dict[str, int] = {}
+    llm_retry_backoff_seconds: float = 1.0  # First transient-error back-off; doubles per retry
+    llm_retry_backoff_max_seconds: float = 30.0
+    llm_retry_budget_ratio: float = 0.2  # Retries earned per request, per operation
+    llm_retry_budget_reserve: int = 10  # Retries an operation may spend before it has earned any
+    llm_circuit_failure_threshold: int = 5  # Consecutive transient failures that open a provider's circuit
+    llm_circuit_cooldown_seconds: float = 30.0
+    llm_circuit_probe_timeout_seconds: float = 120.0  # A half-open probe silent for this long is replaced
+    # Hedged requests and failover. Providers are given as "provider" or "provider:model".
+    llm_hedge_enabled: bool = False  # Hedged calls are not streamed
+    llm_hedge_percentile: float = 95  # Send a duplicate once a call is slower than this percentile of its operation
+    llm_hedge_min_samples: int = 10  # Calls an operation must have made before it is hedged
+    llm_hedge_min_delay_seconds: float = 2.0  # Never hedge sooner than this
+    llm_hedge_target: str = ""  # Where duplicates go; empty means the selected provider and model
+    llm_fallbacks: List[str] = []  # Tried in order when the selected provider is down, e.g. LLM_FALLBACKS='["claude", "openai:gpt-4o-mini"]'
+    # Model tiers per operation (see utils/model_router.py); projects can override both in their project_data.json,
+    # e.g. LLM_TIERS='{"economy": {"provider": "openai", "model": "gpt-4o-mini", "max_tokens": 2000}}', LLM_ROUTES='{"review": "economy"}'
+    llm_routing_enabled: bool = False  # Opt-in; off sends every call to the selected model
+    llm_tiers: Dict[str, Dict[str, Any]] = {}
+    llm_routes: Dict[str, str] = {}
+    # Context window, max output and pricing overrides by model-name prefix (see utils/model_registry.py)
+    llm_model_specs: Dict[str, Dict[str, Any]] = {}
+    # Offline batch mode (OpenAI and Claude only). Point the base URLs at a local stub server for testing.
+    batch_openai_base_url: str = "https://api.openai.com/v1"
+    batch_claude_base_url: str = "https://api.anthropic.com/v1"
+    batch_poll_seconds: float = 30
+    batch_max_wait_hours: float = 24
+    # In-process mock provider for offline runs and benchmarks (provider "mock")
+    mock_llm_enabled: bool = False  # Offer "mock" in the provider menu
+    mock_seed: int = 0  # Change to get different (but still reproducible) outputs
+    mock_latency_ms: float = 300  # Median time to first token; 0 answers instantly
+    mock_latency_distribution: str = "lognormal"  # fixed, uniform, exponential or lognormal
+    mock_latency_sigma: float = 0.5  # Spread of the lognormal distribution
+    mock_tokens_per_second: float = 0  # Generation speed after the first token; 0 is instant
+    mock_failure_rate: float = 0.0  # Fraction of calls that fail with HTTP 500
+    mock_rate_limit_rate: float = 0.0  # Fraction of calls that fail with HTTP 429
+    mock_chapters: int = 3  # Chapters in a mocked outline
+    mock_scenes_per_chapter: int = 3
 
     model_config = SettingsConfigDict(env_file=".env", extra='ignore') # type: ignore
\ No newline at end of file
@@ -0,0 +1,334 @@
+# src/libriscribe/utils/batch_api.py
+"""
+Offline batch submission for the OpenAI and Anthropic batch endpoints.
+
+Batch jobs trade latency (results within 24h) for roughly half the price and a rate
+limit separate from interactive calls. A stage's prompts are submitted as one job,
+polled until the provider finishes, and returned by custom_id. Base URLs come from
+Settings, so the whole flow can be pointed at a local stub server.
+
+Submitted job ids are remembered in the project directory, so an interrupted run
+resumes polling the same job instead of paying for it twice.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from rich.console import Console
+
+from libriscribe.utils.llm_client import LLMClient, LLMResponse, extract_usage, join_prompt
+from libriscribe.utils.usage_ledger import UsageRecord, current_labels
+
+console = Console()
+logger = logging.getLogger(__name__)
+
+BATCH_PROVIDERS = ("openai", "claude")
+BATCH_DISCOUNT = 0.5  # Both providers bill batch tokens at half the interactive price
+JOBS_FILE_NAME = "batch_jobs.json"
+ANTHROPIC_VERSION = "2023-06-01"
+
+
+class BatchError(Exception):
+    """Raised when a batch job cannot be submitted or ends without results."""
+
+
+@dataclass
+class BatchRequest:
+    """
+    One prompt in a batch. `prefix` is shared context sent ahead of the prompt (cached like in
+    LLMClient.generate_content); `labels` are added to its usage record (e.g. chapter=3).
+    """
+    custom_id: str
+    prompt: str
+    max_tokens: int = 2000
+    temperature: float = 0.7
+    prefix: str = ""
+    labels: Dict[str, Any] = field(default_factory=dict)
+
+
+class BatchClient:
+    """Submits prompts as a provider batch job and collects the results."""
+
+    def __init__(self, llm_client: LLMClient, project_dir: Optional[Path] = None):
+        if llm_client.llm_provider not in BATCH_PROVIDERS:
+            raise BatchError(f"Batch mode is not available for provider '{llm_client.llm_provider}'.")
+        self.llm_client = llm_client
+        self.settings = llm_client.settings
+        # The client, provider and model of the current batch; run() points them at the operation's tier
+        self.client = llm_client
+        self.provider = llm_client.llm_provider
+        self.model = llm_client.model
+        self.jobs_path = Path(project_dir) / JOBS_FILE_NAME if project_dir else None
+
+    def run(self, batch_requests: List[BatchRequest], operation: str) -> Dict[str, LLMResponse]:
+        """
+        Submits the requests (or resumes a matching job), waits for it to finish and returns
+        the responses by custom_id. Requests the provider failed are missing from the result.
+        """
+        if not batch_requests:
+            return {}
+        batch_requests = self._route(operation, batch_requests)
+        started = time.perf_counter()
+        job_key = self._job_key(batch_requests)
+        batch_id = self._load_jobs().get(job_key)
+        if batch_id:
+            console.print(f"[cyan]Resuming batch {batch_id} ({len(batch_requests)} requests)...[/cyan]")
+        else:
+            batch_id = self._submit(batch_requests)
+            self._save_job(job_key, batch_id)
+            console.print(f"[cyan]Submitted batch {batch_id} with {len(batch_requests)} requests.[/cyan]")
+
+        try:
+            info = self._wait(batch_id)
+        except BatchError:
+            self._save_job(job_key, None)  # A failed job must be resubmitted, not resumed
+            raise
+        results = self._fetch_results(info)
+        self._save_job(job_key, None)
+
+        # Spread the batch's wall time over its requests so ledger totals add up to the real run time
+        latency = (time.perf_counter() - started) / len(batch_requests)
+        for request in batch_requests:
+            self._record_usage(operation, request, results.get(request.custom_id, LLMResponse()), latency, batch_id)
+
+        missing = len(batch_requests) - sum(1 for r in results.values() if r.text)
+        if missing:
+            console.print(f"[yellow]Batch {batch_id}: {missing} of {len(batch_requests)} requests returned no result.[/yellow]")
+        return results
+
+    def _route(self, operation: str, batch_requests: List[BatchRequest]) -> List[BatchRequest]:
+        """
+        Points the batch at the operation's model tier (see utils/model_router.py), as LLMClient
+        does for interactive calls, and returns the requests with max_tokens capped by the tier.
+        """
+        client = self.llm_client
+        if client.route_calls and client.router.enabled:
+            tier, provider, model = client.router.resolve(operation, client.llm_provider, client.model)
+            if (provider, model) != (client.llm_provider, client.model):
+                client = client._peer(f"{provider}:{model}" if model else provider) or client
+            if tier.max_tokens:
+                batch_requests = [replace(request, max_tokens=min(request.max_tokens, tier.max_tokens))
+                                  for request in batch_requests]
+        if client.llm_provider not in BATCH_PROVIDERS:
+            raise BatchError(f"The model tier for '{operation}' uses provider '{client.llm_provider}', "
+                             f"which has no batch mode.")
+        self.client, self.provider, self.model = client, client.llm_provider, client.model
+        return batch_requests
+
+    # --- Provider endpoints ---
+
+    def _base_url(self) -> str:
+        base = self.settings.batch_openai_base_url if self.provider == "openai" else self.settings.batch_claude_base_url
+        return base.rstrip("/")
+
+    def _headers(self) -> Dict[str, str]:
+        if self.provider == "openai":
+            return {"Authorization": f"Bearer {self.settings.openai_api_key}"}
+        return {
+            "x-api-key": self.settings.claude_api_key,
+            "anthropic-version": ANTHROPIC_VERSION,
+            "content-type": "application/json",
+        }
+
+    def _submit(self, batch_requests: List[BatchRequest]) -> str:
+        base, headers = self._base_url(), self._headers()
+        try:
+            if self.provider == "openai":
+                lines = [
+                    json.dumps({
+                        "custom_id": request.custom_id,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": {
+                            "model": self.model,
+                            "messages": [{"role": "user", "content": join_prompt(request.prompt, request.prefix)}],
+                            "max_tokens": request.max_tokens,
+                            "temperature": request.temperature,
+                        },
+                    }, ensure_ascii=False)
+                    for request in batch_requests
+                ]
+                upload = requests.post(
+                    f"{base}/files",
+                    headers=headers,
+                    data={"purpose": "batch"},
+                    files={"file": ("batch.jsonl", "\n".join(lines).encode("utf-8"), "application/jsonl")},
+                    timeout=120,
+                )
+                upload.raise_for_status()
+                response = requests.post(
+                    f"{base}/batches",
+                    headers=headers,
+                    json={
+                        "input_file_id": upload.json()["id"],
+                        "endpoint": "/v1/chat/completions",
+                        "completion_window": "24h",
+                    },
+                    timeout=120,
+                )
+            else:
+                response = requests.post(
+                    f"{base}/messages/batches",
+                    headers=headers,
+                    json={"requests": [
+                        {
+                            "custom_id": request.custom_id,
+                            "params": {
+                                "model": self.model,
+                                "max_tokens": request.max_tokens,
+                                "temperature": request.temperature,
+                                "messages": [{
+                                    "role": "user",
+                                    "content": self.client.user_content(request.prompt, request.prefix),
+                                }],
+                            },
+                        }
+                        for request in batch_requests
+                    ]},
+                    timeout=120,
+                )
+            response.raise_for_status()
+            return response.json()["id"]
+        except (requests.RequestException, KeyError, ValueError) as e:
+            raise BatchError(f"Could not submit {self.provider} batch: {e}") from e
+
+    def _status(self, batch_id: str) -> Tuple[bool, Dict[str, Any]]:
+        """Returns (finished, batch object)."""
+        url = f"{self._base_url()}/batches/{batch_id}" if self.provider == "openai" \
+            else f"{self._base_url()}/messages/batches/{batch_id}"
+        response = requests.get(url, headers=self._headers(), timeout=60)
+        response.raise_for_status()
+        info = response.json()
+        if self.provider == "openai":
+            if info.get("status") == "failed":
+                raise BatchError(f"Batch {batch_id} failed: {info.get('errors')}")
+            # Expired and cancelled jobs still return whatever finished
+            return info.get("status") in ("completed", "expired", "cancelled"), info
+        return info.get("processing_status") == "ended", info
+
+    def _wait(self, batch_id: str) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.settings.batch_max_wait_hours * 3600
+        last_status = None
+        while True:
+            try:
+                finished, info = self._status(batch_id)
+            except requests.RequestException as e:
+                logger.warning(f"Polling batch {batch_id} failed, will retry: {e}")
+                finished, info = False, {}
+            status = info.get("status") or info.get("processing_status")
+            if status and status != last_status:
+                console.print(f"[dim]   Batch {batch_id}: {status} {self._progress(info)}[/dim]")
+                last_status = status
+            if finished:
+                return info
+            if time.monotonic() > deadline:
+                raise BatchError(f"Batch {batch_id} did not finish within {self.settings.batch_max_wait_hours}h.")
+            time.sleep(self.settings.batch_poll_seconds)
+
+    def _progress(self, info: Dict[str, Any]) -> str:
+        counts = info.get("request_counts") or {}
+        if self.provider == "openai" and counts:
+            return f"({counts.get('completed', 0)}/{counts.get('total', 0)} done)"
+        if counts:
+            return f"({counts.get('succeeded', 0)} succeeded, {counts.get('processing', 0)} processing)"
+        return ""
+
+    def _fetch_results(self, info: Dict[str, Any]) -> Dict[str, LLMResponse]:
+        if self.provider == "openai":
+            if not info.get("output_file_id"):
+                return {}
+            url = f"{self._base_url()}/files/{info['output_file_id']}/content"
+        else:
+            url = info.get("results_url")
+            if not url:
+                return {}
+        try:
+            response = requests.get(url, headers=self._headers(), timeout=300)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise BatchError(f"Could not download batch results: {e}") from e
+
+        results: Dict[str, LLMResponse] = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                result = self._parse_result(item)
+            except (json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+                logger.warning(f"Skipping malformed batch result line: {e}")
+                continue
+            if result is not None:
+                results[item["custom_id"]] = result
+        return results
+
+    def _parse_result(self, item: Dict[str, Any]) -> Optional[LLMResponse]:
+        """Turns one result line into an LLMResponse, or None for a failed request."""
+        if self.provider == "openai":
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                logger.warning(f"Batch request {item.get('custom_id')} failed: {item.get('error')}")
+                return None
+            body = response["body"]
+            return LLMResponse(body["choices"][0]["message"]["content"].strip(), *extract_usage(body))
+
+        result = item.get("result") or {}
+        if result.get("type") != "succeeded":
+            logger.warning(f"Batch request {item.get('custom_id')} {result.get('type')}: {result.get('error')}")
+            return None
+        message = result["message"]
+        text = "".join(block.get("text", "") for block in message["content"] if block.get("type") == "text")
+        return LLMResponse(text.strip(), *extract_usage(message))
+
+    # --- Bookkeeping ---
+
+    def _record_usage(self, operation: str, request: BatchRequest, result: LLMResponse, latency: float, batch_id: str) -> None:
+        spec = self.client.capabilities()  # Includes the project's llm_model_specs overrides
+        cost = spec.cost(result.prompt_tokens, result.completion_tokens, result.cached_tokens) * BATCH_DISCOUNT
+        self.client.ledger.record(UsageRecord(
+            operation=operation,
+            agent=self.client.agent_name or "-",
+            provider=self.provider,
+            model=self.model,
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.completion_tokens,
+            cached_tokens=result.cached_tokens,
+            latency_s=round(latency, 3),
+            cost_usd=cost,
+            success=bool(result.text),
+            labels={**current_labels(), **request.labels, "batch": batch_id},
+        ))
+
+    def _job_key(self, batch_requests: List[BatchRequest]) -> str:
+        """Identifies a batch by its provider, model and exact prompts."""
+        digest = hashlib.sha256(f"{self.provider}:{self.model}".encode("utf-8"))
+        for request in batch_requests:
+            digest.update(f"\0{request.custom_id}\0{request.max_tokens}\0{request.temperature}\0{request.prefix}\0{request.prompt}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _load_jobs(self) -> Dict[str, str]:
+        if not self.jobs_path or not self.jobs_path.exists():
+            return {}
+        try:
+            return json.loads(self.jobs_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_job(self, job_key: str, batch_id: Optional[str]) -> None:
+        if not self.jobs_path:
+            return
+        jobs = self._load_jobs()
+        if batch_id:
+            jobs[job_key] = batch_id
+        else:
+            jobs.pop(job_key, None)
+        try:
+            self.jobs_path.write_text(json.dumps(jobs, indent=2), encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Could not save batch job state: {e}")
@@ -0,0 +1,75 @@
+# src/libriscribe/utils/chunking.py
+"""
+Splitting text that is too long for one LLM call into ordered chunks.
+
+Cuts fall on the coarsest boundary that works - chapter headings, then scene titles,
+then paragraphs, then sentences, and words only as a last resort - so each chunk can be
+processed on its own and the results joined back in order.
+"""
+
+import re
+from typing import Callable, List, Tuple
+
+# Tried in order; a cut goes at the end of each match
+_BOUNDARIES = [
+    re.compile(r"\n(?=#{1,2} )"),  # Chapter headings
+    re.compile(r"\n(?=(?:\*\*|#{3,}\s*)Scene\s+\d+)", re.IGNORECASE),  # Scene titles
+    re.compile(r"\n[ \t]*\n"),  # Paragraphs
+    re.compile(r"(?<=[.!?])[\"'”’)]?\s+"),  # Sentences
+]
+_WORDS = re.compile(r"\S+\s*")
+_SCENE_TITLE = re.compile(r"^(?:\*\*|#{3,}\s*)Scene\s+\d+", re.IGNORECASE | re.MULTILINE)
+
+
+def split_text(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """Splits `text` into ordered chunks of at most `max_tokens`, cutting at the coarsest boundaries possible."""
+    return pack_chunks([text], max_tokens, count_tokens)
+
+
+def split_scenes(text: str) -> List[str]:
+    """
+    `text` cut before each scene title line ("**Scene N: ...**" or "### Scene N"). The first
+    piece is whatever precedes the first title (e.g. the chapter heading) and may be empty.
+    """
+    cuts = [match.start() for match in _SCENE_TITLE.finditer(text) if match.start() > 0]
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def pack_chunks(units: List[str], max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """
+    Groups consecutive units (e.g. whole chapters) into as few chunks of at most `max_tokens`
+    as possible, splitting any unit that is too long on its own. Units keep their own
+    separators; chunks are stripped of surrounding whitespace.
+    """
+    max_tokens = max(1, max_tokens)
+    pieces: List[Tuple[str, int]] = []
+    for unit in units:
+        pieces.extend(_pieces(unit, max_tokens, count_tokens, 0))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece, tokens in pieces:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(current).strip())
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("".join(current).strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def _pieces(text: str, max_tokens: int, count_tokens: Callable[[str], int], level: int) -> List[Tuple[str, int]]:
+    """`text` cut at boundary `level` and finer until every piece fits, as (piece, tokens) pairs."""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return [(text, tokens)]
+    if level == len(_BOUNDARIES):
+        return [(word, count_tokens(word)) for word in _WORDS.findall(text)]
+    cuts = [match.end() for match in _BOUNDARIES[level].finditer(text)]
+    pieces: List[Tuple[str, int]] = []
+    for start, end in zip([0] + cuts, cuts + [len(text)]):
+        if end > start:
+            pieces.extend(_pieces(text[start:end], max_tokens, count_tokens, level + 1))
+    return pieces
@@ -0,0 +1,222 @@
+# src/libriscribe/utils/codex_context.py
+"""
+Relevance-ranked, token-budgeted codex context for scene prompts.
+
+MasterCodex.get_scene_context() returns everything established up to a chapter, which
+grows with the book. assemble_scene_context() instead breaks the codex into small items
+(a character's state, one relationship, one memory, one fact, one pending callback, ...),
+scores each for the scene at hand and keeps the best ones that fit the token budget, so
+the codex section of a scene prompt stays the same size however long the book gets.
+
+An item's score is its base weight (by kind, or by importance for callbacks) plus:
+    presence    it involves a character in the scene or the scene's location
+    overlap     it shares words with the scene's summary, goal and setting
+    recency     it was established recently (half-life RECENCY_HALF_LIFE chapters)
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
+
+from libriscribe.codex import MasterCodex
+from libriscribe.utils.token_counter import estimate_tokens
+
+# Base weight per kind of item
+BASE_WEIGHTS = {
+    "character": 3.0,  # Characters in the scene are almost always worth their line
+    "location": 2.0,
+    "relationship": 1.0,
+    "emotion": 0.8,
+    "memory": 0.6,
+    "callback": 0.0,  # Weighted by importance instead
+    "fact": 0.5,
+    "item": 0.4,
+    "themes": 0.5,
+}
+CALLBACK_IMPORTANCE = {"low": 0.3, "medium": 0.7, "high": 1.2, "critical": 2.0}
+PRESENCE_WEIGHT = 1.5
+OVERLAP_WEIGHT = 1.0
+RECENCY_WEIGHT = 1.0
+RECENCY_HALF_LIFE = 5.0  # Chapters
+
+# Rendering order of the sections
+SECTIONS = [
+    ("character", "Characters in this scene"),
+    ("relationship", "Relationships"),
+    ("emotion", "Recent emotional beats"),
+    ("memory", "Memories"),
+    ("location", "Location"),
+    ("callback", "Unresolved setups (pay off or keep alive when natural)"),
+    ("fact", "Established facts (stay consistent)"),
+    ("item", "Items"),
+    ("themes", "Themes and symbols"),
+]
+
+NOTES_HEADING = "Codex notes for this scene:"
+
+_WORD = re.compile(r"[^\W\d_]{4,}", re.UNICODE)
+
+
+@dataclass
+class ContextItem:
+    kind: str
+    text: str
+    score: float
+    order: float = 0.0  # Position within its section once selected (e.g. the chapter)
+
+
+def _terms(text: str) -> Set[str]:
+    return {word.lower() for word in _WORD.findall(text or "")}
+
+
+def _overlap(text: str, scene_terms: Set[str]) -> float:
+    """Share of the scene's vocabulary the item touches, damped for long items."""
+    terms = _terms(text)
+    if not terms or not scene_terms:
+        return 0.0
+    return min(1.0, len(terms & scene_terms) / math.sqrt(len(terms)))
+
+
+def _recency(chapter: int, established: int) -> float:
+    return 0.5 ** (max(0, chapter - established) / RECENCY_HALF_LIFE)
+
+
+def _mentions(text: str, names: List[str]) -> bool:
+    """Whole-word match, so "Bo" does not match "box"."""
+    return any(name and re.search(rf"\b{re.escape(name)}\b", text or "", re.IGNORECASE) for name in names)
+
+
+def _value(value) -> str:
+    """Enum members and plain strings alike."""
+    return getattr(value, "value", value) or ""
+
+
+def assemble_scene_context(codex: MasterCodex, chapter: int, scene: int, token_budget: int,
+                           count_tokens: Optional[Callable[[str], int]] = None,
+                           characters: Optional[List[str]] = None, location: str = "", summary: str = "") -> str:
+    """
+    Compact codex notes for one scene within `token_budget` tokens, or "" if nothing applies.
+    The scene's characters, location and summary come from the codex when it has the scene,
+    otherwise from the arguments (e.g. the outline's Scene).
+    """
+    count_tokens = count_tokens or estimate_tokens
+    codex_chapter = codex.get_chapter(chapter)
+    codex_scene = codex_chapter.get_scene(scene) if codex_chapter else None
+    if codex_scene:
+        characters = codex_scene.characters or characters
+        location = codex_scene.location or codex_scene.setting or location
+        summary = " ".join(filter(None, [codex_scene.summary or summary, codex_scene.goal, codex_scene.conflict]))
+    present = [name for name in (characters or []) if name]
+    scene_terms = _terms(" ".join([summary, location] + present))
+
+    items = _collect(codex, chapter, present, location, scene_terms)
+    return _render(_select(items, token_budget, count_tokens))
+
+
+def _collect(codex: MasterCodex, chapter: int, present: List[str], location: str,
+             scene_terms: Set[str]) -> List[ContextItem]:
+    items: List[ContextItem] = []
+
+    def add(kind: str, text: str, established: int = 0, involves_scene: bool = False, base: Optional[float] = None,
+            order: float = 0.0) -> None:
+        score = BASE_WEIGHTS[kind] if base is None else base
+        score += PRESENCE_WEIGHT * involves_scene + OVERLAP_WEIGHT * _overlap(text, scene_terms)
+        if established:
+            score += RECENCY_WEIGHT * _recency(chapter, established)
+        items.append(ContextItem(kind, text, score, order))
+
+    for index, name in enumerate(present):
+        character = codex.get_character(name)
+        if not character:
+            continue
+        alive = character.is_alive if chapter < (character.death_chapter or 10**6) else False
+        details = [_value(character.role), f"at {character.current_location}" if character.current_location else "",
+                   "" if alive else "DEAD", character.personality_traits[:120]]
+        add("character", f"{name}: " + "; ".join(filter(None, details)), involves_scene=True, order=index)
+
+        for target, relationship in character.relationships.items():
+            latest = relationship.evolution[-1] if relationship.evolution else None
+            text = f"{name} → {target}: {_value(relationship.relationship_type)}"
+            if latest and latest.chapter <= chapter:
+                text += f" (trust {latest.trust_level:.1f}, conflict {latest.conflict_level:.1f})"
+                if latest.description:
+                    text += f" - {latest.description}"
+            elif relationship.dynamics or relationship.description:
+                text += f" - {relationship.dynamics or relationship.description}"
+            add("relationship", text, latest.chapter if latest else 0, involves_scene=target in present, order=index)
+
+        for moment in character.emotional_journey:
+            if moment.chapter > chapter or not moment.emotions:
+                continue
+            feelings = ", ".join(f"{_value(state.emotion)} {state.intensity:.1f}" for state in moment.emotions[:3])
+            add("emotion", f"{name} (Ch{moment.chapter}): {feelings}" + (f" - {moment.context}" if moment.context else ""),
+                moment.chapter, order=moment.chapter)
+
+        for memory in character.get_relevant_memories(chapter):
+            add("memory", f"{name}: {memory.content}" + (" (trauma)" if memory.is_trauma else ""),
+                memory.chapter_introduced, involves_scene=_mentions(memory.content, present[:index] + present[index + 1:]),
+                order=memory.chapter_introduced)
+
+    if location:
+        for place, description in codex.location_registry.items():
+            if place.lower() in location.lower() or location.lower() in place.lower():
+                add("location", f"{place}: {description}", involves_scene=True)
+
+    for callback in codex.get_pending_callbacks():
+        if callback.setup_chapter >= chapter:
+            continue
+        importance = CALLBACK_IMPORTANCE.get(str(_value(callback.importance)).lower(), CALLBACK_IMPORTANCE["medium"])
+        text = f"[{str(_value(callback.importance)).upper()}] {callback.name} (Ch{callback.setup_chapter}): {callback.setup_description}"
+        # Old setups do not fade: the longer one waits, the more it needs attention, so no recency term
+        add("callback", text, involves_scene=_mentions(callback.setup_description, present), base=importance,
+            order=callback.setup_chapter)
+
+    for fact in codex.get_facts_before_chapter(chapter):
+        add("fact", f"(Ch{fact.chapter_established}) {fact.fact}", fact.chapter_established,
+            involves_scene=_mentions(fact.fact, present) or bool(location and location.lower() in fact.fact.lower()),
+            order=fact.chapter_established)
+
+    for item_name, description in codex.item_registry.items():
+        if _terms(item_name) & scene_terms or _overlap(description, scene_terms) > 0:
+            add("item", f"{item_name}: {description}")
+
+    themes = "; ".join(filter(None, [
+        ", ".join(codex.global_themes),
+        ", ".join(f"{symbol} = {meaning}" for symbol, meaning in codex.recurring_symbols.items()),
+    ]))
+    if themes:
+        add("themes", themes)
+    return items
+
+
+def _select(items: List[ContextItem], token_budget: int, count_tokens: Callable[[str], int]) -> List[ContextItem]:
+    """Highest-scoring items first, as long as they fit with their bullet and, for a new section, its heading."""
+    headings = dict(SECTIONS)
+    selected: List[ContextItem] = []
+    kinds: Set[str] = set()
+    used = count_tokens(NOTES_HEADING)
+    for item in sorted(items, key=lambda item: item.score, reverse=True):
+        cost = count_tokens(item.text) + 2
+        if item.kind not in kinds:
+            cost += count_tokens(headings[item.kind]) + 1
+        if used + cost > token_budget:
+            continue
+        selected.append(item)
+        kinds.add(item.kind)
+        used += cost
+    return selected
+
+
+def _render(items: List[ContextItem]) -> str:
+    if not items:
+        return ""
+    by_kind: Dict[str, List[ContextItem]] = {}
+    for item in items:
+        by_kind.setdefault(item.kind, []).append(item)
+    blocks = []
+    for kind, heading in SECTIONS:
+        if kind in by_kind:
+            lines = "\n".join(f"- {item.text}" for item in sorted(by_kind[kind], key=lambda item: item.order))
+            blocks.append(f"{heading}:\n{lines}")
+    return f"{NOTES_HEADING}\n" + "\n".join(blocks)
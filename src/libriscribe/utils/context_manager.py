@@ -1,45 +1,59 @@
 # src/libriscribe/utils/context_manager.py
 import logging
 from pathlib import Path
+from typing import Optional
+
+from libriscribe.utils.token_counter import count_tokens, truncate_to_tokens
 
 logger = logging.getLogger(__name__)
 
-def get_previous_chapter_context(project_dir: Path, current_chapter_num: int, token_limit: int = 3000) -> str:
+def get_previous_chapter_context(project_dir: Path, current_chapter_num: int, token_limit: int = 4000,
+                                 provider: str = "", model: str = "") -> str:
     """
     Retrieves the actual text of the previous chapter to maintain continuity.
-    If the text is too long, it retrieves the last 'token_limit' words.
+    If the text is too long, it retrieves its last 'token_limit' tokens, counted for the given provider and model.
     """
     if current_chapter_num <= 1:
         return "This is the first chapter. No previous context available."
 
     prev_chapter_num = current_chapter_num - 1
-    
-    # Check for revised version first, then original
-    revised_path = project_dir / f"chapter_{prev_chapter_num}_revised.md"
-    original_path = project_dir / f"chapter_{prev_chapter_num}.md"
-    
-    file_to_read = None
-    if revised_path.exists():
-        file_to_read = revised_path
-        logger.info(f"Context: Using revised content from Chapter {prev_chapter_num}")
-    elif original_path.exists():
-        file_to_read = original_path
-        logger.info(f"Context: Using original content from Chapter {prev_chapter_num}")
-    else:
+    file_to_read = chapter_file(Path(project_dir), prev_chapter_num)
+    if file_to_read is None:
         logger.warning(f"Context: Chapter {prev_chapter_num} file not found.")
         return "Previous chapter content not found."
+    logger.info(f"Context: Using {'revised' if file_to_read.name.endswith('_revised.md') else 'original'} content from Chapter {prev_chapter_num}")
 
     try:
         content = file_to_read.read_text(encoding='utf-8')
-        
-        # Simple word truncation to fit in context window (rough approximation of tokens)
-        words = content.split()
-        if len(words) > token_limit:
-            # Get the LAST 3000 words (the ending of the previous chapter)
-            truncated_content = " ".join(words[-token_limit:])
-            return f"...[Previous text truncated]...\n{truncated_content}"
-        
-        return content
+        return previous_chapter_context_from_text(content, token_limit, provider, model)
     except Exception as e:
         logger.error(f"Error reading previous chapter: {e}")
-        return "Error reading previous context."
\ No newline at end of file
+        return "Error reading previous context."
+
+
+def chapter_file(project_dir: Path, chapter_number: int) -> Optional[Path]:
+    """The chapter's revised file if there is one, else its original file, else None."""
+    # Check for revised version first, then original
+    for path in (project_dir / f"chapter_{chapter_number}_revised.md", project_dir / f"chapter_{chapter_number}.md"):
+        if path.exists():
+            return path
+    return None
+
+
+def read_chapter_text(project_dir: Path, chapter_number: int) -> str:
+    """Text of the chapter's latest version, or "" if it has not been written."""
+    path = chapter_file(Path(project_dir), chapter_number)
+    try:
+        return path.read_text(encoding="utf-8") if path else ""
+    except Exception as e:
+        logger.error(f"Error reading chapter {chapter_number}: {e}")
+        return ""
+
+
+def previous_chapter_context_from_text(content: str, token_limit: int = 4000, provider: str = "", model: str = "") -> str:
+    """Previous-chapter context from text already in hand (e.g. a draft the chapter pipeline kept)."""
+    if count_tokens(content, provider, model) > token_limit:
+        # Keep the ending of the previous chapter, which the next one continues from
+        truncated_content = truncate_to_tokens(content, token_limit, provider, model, keep="end")
+        return f"...[Previous text truncated]...\n{truncated_content}"
+    return content
\ No newline at end of file
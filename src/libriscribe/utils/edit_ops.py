@@ -0,0 +1,211 @@
+# src/libriscribe/utils/edit_ops.py
+"""
+Diff-style edits: instead of returning the whole revised chapter, the model returns a short
+list of anchored operations, which are applied to the text locally.
+
+    {"op": "replace",      "anchor": "<text copied from the chapter>", "text": "<new text>"}
+    {"op": "insert_after", "anchor": "<text copied from the chapter>", "text": "<text to add>"}
+    {"op": "delete",       "anchor": "<text copied from the chapter>", "text": ""}
+
+Models copy anchors imperfectly (straight vs curly quotes, re-wrapped lines, a changed
+word), so an anchor is looked up exactly first, then ignoring whitespace, case and quote
+style, and finally by fuzzy matching (difflib) against windows of the same number of words.
+Edits whose anchor cannot be found, or that overlap an earlier edit, are skipped; when too
+many are skipped the caller falls back to a full rewrite.
+"""
+
+import difflib
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from libriscribe.utils import prompts_context as prompts
+from libriscribe.utils.llm_client import LLMClient
+from libriscribe.utils.llm_errors import LLMError
+from libriscribe.utils.structured_output import OutputSchema
+
+logger = logging.getLogger(__name__)
+
+EDIT_OPS_MAX_TOKENS = 3000
+FUZZY_MIN_SIMILARITY = 0.8
+_CANDIDATE_MIN_OVERLAP = 0.5  # Share of the anchor's words a window needs before difflib looks at it
+
+_WORD = re.compile(r"\S+")
+_QUOTE_CLASSES = {
+    **{char: "[\"“”„]" for char in "\"“”„"},
+    **{char: "['‘’`]" for char in "'‘’`"},
+    **{char: "[-–—]" for char in "-–—"},
+}
+
+
+class EditOp(BaseModel):
+    op: Literal["replace", "insert_after", "delete"]
+    anchor: str  # Copied from the text: the span to replace or delete, or the one to insert after
+    text: str = ""  # Replacement or inserted text; empty for delete
+
+
+class EditOps(BaseModel):
+    edits: List[EditOp] = []
+
+
+EDIT_OPS_SCHEMA = OutputSchema.from_model(EditOps, "edit_ops")
+
+
+@dataclass
+class EditResult:
+    text: str
+    applied: int = 0
+    failed: List[EditOp] = field(default_factory=list)
+
+    @property
+    def failure_ratio(self) -> float:
+        total = self.applied + len(self.failed)
+        return len(self.failed) / total if total else 0.0
+
+
+def _normalize_word(word: str) -> str:
+    return word.lower().strip(".,;:!?\"'“”‘’()[]*_")
+
+
+def _pattern(anchor: str) -> Optional[re.Pattern]:
+    """Regex for `anchor` with any whitespace between words, any quote or dash style, and any case."""
+    words = anchor.split()
+    if not words:
+        return None
+    parts = ["".join(_QUOTE_CLASSES.get(char, re.escape(char)) for char in word) for word in words]
+    return re.compile(r"\s+".join(parts), re.IGNORECASE)
+
+
+def _fuzzy_locate(text: str, anchor: str, min_similarity: float) -> Optional[Tuple[int, int]]:
+    """Best window of as many words as the anchor, if it is similar enough."""
+    words = [(match.start(), match.end(), _normalize_word(match.group())) for match in _WORD.finditer(text)]
+    anchor_words = [_normalize_word(word) for word in anchor.split()]
+    size = len(anchor_words)
+    if not size or len(words) < size:
+        return None
+    wanted = Counter(anchor_words)
+    window = Counter(word for _, _, word in words[:size])
+    matcher = difflib.SequenceMatcher(None, autojunk=False)
+    matcher.set_seq2(anchor.lower())  # difflib caches details about seq2, so the anchor stays fixed
+    best, best_span = min_similarity, None
+    for first in range(len(words) - size + 1):
+        if first:
+            window[words[first - 1][2]] -= 1
+            window[words[first + size - 1][2]] += 1
+        if sum((window & wanted).values()) < _CANDIDATE_MIN_OVERLAP * size:
+            continue
+        start, end = words[first][0], words[first + size - 1][1]
+        matcher.set_seq1(text[start:end].lower())
+        if matcher.quick_ratio() < best:
+            continue
+        similarity = matcher.ratio()
+        if similarity >= best:
+            best, best_span = similarity, (start, end)
+    return best_span
+
+
+def locate(text: str, anchor: str, start: int = 0, min_similarity: float = FUZZY_MIN_SIMILARITY) -> Optional[Tuple[int, int]]:
+    """(start, end) of `anchor` in `text`, preferring a match at or after `start`; None if not found."""
+    anchor = anchor.strip()
+    if not anchor:
+        return None
+    for offset in (start, 0):
+        index = text.find(anchor, offset)
+        if index != -1:
+            return index, index + len(anchor)
+    pattern = _pattern(anchor)
+    match = pattern.search(text, start) or pattern.search(text)
+    if match:
+        return match.span()
+    return _fuzzy_locate(text, anchor, min_similarity)
+
+
+def apply_edits(text: str, edits: List[EditOp], min_similarity: float = FUZZY_MIN_SIMILARITY) -> EditResult:
+    """Applies the edits that can be located and do not overlap; the rest are reported in `failed`."""
+    located: List[Tuple[int, int, EditOp]] = []
+    failed: List[EditOp] = []
+    cursor = 0
+    for edit in edits:
+        span = locate(text, edit.anchor, cursor, min_similarity)
+        if span is None:
+            failed.append(edit)
+            continue
+        located.append((span[0], span[1], edit))
+        cursor = span[1]
+
+    accepted: List[Tuple[int, int, EditOp]] = []
+    for start, end, edit in sorted(located, key=lambda item: item[0]):
+        if accepted and start < accepted[-1][1]:
+            failed.append(edit)
+            continue
+        accepted.append((start, end, edit))
+
+    # Back to front, so earlier offsets stay valid
+    for start, end, edit in reversed(accepted):
+        if edit.op == "insert_after":
+            separator = "" if edit.text[:1].isspace() else " "
+            text = text[:end] + separator + edit.text + text[end:]
+        elif edit.op == "replace" and edit.text:
+            text = text[:start] + edit.text + text[end:]
+        else:
+            # Delete (or replace with nothing) without leaving a double space behind
+            if end < len(text) and text[end] == " " and (start == 0 or text[start - 1].isspace()):
+                end += 1
+            text = text[:start] + text[end:]
+    return EditResult(text, applied=len(accepted), failed=failed)
+
+
+def edit_with_ops(llm_client: LLMClient, prompt: str, text: str, operation: str, language: str = "English",
+                  max_failure_ratio: Optional[float] = None) -> Optional[str]:
+    """
+    Asks for edit operations on `text` (EDIT_OPS_OUTPUT is appended to `prompt`) and applies them.
+    Returns the edited text, or None when the reply is unusable or more than `max_failure_ratio`
+    of the edits could not be applied, in which case the caller should ask for a full rewrite.
+    """
+    try:
+        data = llm_client.generate_structured(prompt + prompts.EDIT_OPS_OUTPUT.format(language=language), EDIT_OPS_SCHEMA,
+                                              max_tokens=EDIT_OPS_MAX_TOKENS, temperature=0.5, operation=operation)
+    except LLMError as e:
+        if e.fatal:
+            raise
+        logger.warning(f"{operation}: no usable edit operations ({e}); falling back to a full rewrite")
+        return None
+    return _apply_reply(llm_client, data, text, operation, max_failure_ratio)
+
+
+async def aedit_with_ops(llm_client: LLMClient, prompt: str, text: str, operation: str, language: str = "English",
+                         max_failure_ratio: Optional[float] = None) -> Optional[str]:
+    """Async counterpart of edit_with_ops."""
+    try:
+        data = await llm_client.agenerate_structured(
+            prompt + prompts.EDIT_OPS_OUTPUT.format(language=language), EDIT_OPS_SCHEMA,
+            max_tokens=EDIT_OPS_MAX_TOKENS, temperature=0.5, operation=operation)
+    except LLMError as e:
+        if e.fatal:
+            raise
+        logger.warning(f"{operation}: no usable edit operations ({e}); falling back to a full rewrite")
+        return None
+    return _apply_reply(llm_client, data, text, operation, max_failure_ratio)
+
+
+def _apply_reply(llm_client: LLMClient, data, text: str, operation: str,
+                 max_failure_ratio: Optional[float]) -> Optional[str]:
+    if max_failure_ratio is None:
+        max_failure_ratio = llm_client.settings.edit_ops_max_failure_ratio
+    try:
+        edits = EditOps.model_validate(data).edits
+    except ValidationError as e:
+        logger.warning(f"{operation}: malformed edit operations ({e}); falling back to a full rewrite")
+        return None
+    result = apply_edits(text, edits)
+    if result.failure_ratio > max_failure_ratio:
+        logger.warning(f"{operation}: {len(result.failed)} of {len(edits)} edits could not be applied; "
+                       f"falling back to a full rewrite")
+        return None
+    if result.failed:
+        logger.info(f"{operation}: skipped {len(result.failed)} of {len(edits)} edits whose anchors were not found")
+    return result.text
@@ -95,25 +95,171 @@ def get_chapter_files(project_dir: str) -> list[str]:
     chapter_files.sort(key=lambda x: int(x.split("_")[1].split(".")[0]))
     return chapter_files
 
-def extract_json_from_markdown(markdown_text: str) -> Optional[Dict[str, Any]]:
-    """Extracts JSON from within Markdown code blocks, handling potential errors."""
+def extract_json_from_markdown(markdown_text: str) -> Optional[Union[Dict[str, Any], List[Any]]]:
+    """
+    Extracts JSON from an LLM reply: the ```json code block if it parses, otherwise the first
+    object or array that parse_json_lenient can recover from anywhere in the text. The result is
+    a dict or a list, depending on the reply; None if nothing could be parsed.
+    """
     try:
         # Find the start and end of the JSON code block
         start = markdown_text.find("```json")
-        if start == -1:
-            return None  # No JSON code block found
-
-        start += len("```json")
-        end = markdown_text.find("```", start)
-        if end == -1:
-            return None  # No closing code block found
-
-        json_str = markdown_text[start:end].strip()
-        return json.loads(json_str)
+        if start != -1:
+            start += len("```json")
+            end = markdown_text.find("```", start)
+            if end != -1:
+                try:
+                    return json.loads(markdown_text[start:end].strip())
+                except json.JSONDecodeError:
+                    pass
+        return parse_json_lenient(markdown_text)
 
-    except json.JSONDecodeError:
-        return None
     except Exception as e:
         logger.exception(f"Error extracting JSON from Markdown: {e}")
         print("Error extracting JSON.")
-        return None
\ No newline at end of file
+        return None
+
+
+# --- Tolerant JSON parsing ---
+
+_DOUBLE_QUOTES = '"\u201c\u201d\u201e'  # " and the typographic double quotes
+_SINGLE_QUOTES = "'\u2018\u2019"
+_STRING_END_FOLLOWERS = ',:}]"\n\r'  # A quote followed by one of these (or the end) closes a string
+_ESCAPABLE = '"\\/bfnrtu'
+_LITERALS = {"True": "true", "False": "false", "None": "null", "true": "true", "false": "false", "null": "null"}
+_MAX_LENIENT_STARTS = 50  # "{" / "[" positions tried per text before giving up
+
+
+def parse_json_lenient(text: str) -> Optional[Any]:
+    """
+    Parses JSON the way LLMs tend to write it, without another model call. Handles prose around
+    the JSON, a missing closing fence, trailing commas, smart quotes, single-quoted strings,
+    unescaped inner quotes and raw newlines in strings, Python literals, unquoted keys,
+    missing commas between items and // or /* */ comments. Returns the first object or array
+    that can be recovered, or None. Truncated JSON is not completed, since that would hide lost data.
+    """
+    if not text:
+        return None
+    text = text.lstrip("\ufeff")
+    candidates = [text]
+    fence = text.find("```")
+    if fence != -1:
+        body_start = text.find("\n", fence)
+        body_end = text.find("```", fence + 3)
+        if body_start != -1 and (body_end == -1 or body_end > body_start):
+            candidates.insert(0, text[body_start + 1:body_end if body_end != -1 else len(text)])
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+    for candidate in candidates:
+        starts = [i for i, char in enumerate(candidate) if char in "{["][:_MAX_LENIENT_STARTS]
+        for start in starts:
+            repaired = _repair_json_at(candidate, start)
+            if repaired is None:
+                continue
+            try:
+                return json.loads(repaired)
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+def _next_significant(text: str, index: int, skip: str = " \t") -> str:
+    while index < len(text) and text[index] in skip:
+        index += 1
+    return text[index] if index < len(text) else ""
+
+
+def _repair_json_at(text: str, start: int) -> Optional[str]:
+    """Rewrites the value starting at text[start] ("{" or "[") as strict JSON; None if it cannot."""
+    out: List[str] = []
+    stack: List[str] = []
+    prev = ""  # Last significant character emitted outside strings
+    i = start
+    while i < len(text):
+        char = text[i]
+        if char in " \t\r\n":
+            out.append(char)
+            i += 1
+        elif char in "{[":
+            if prev in ('"', "}", "]") or prev.isalnum():
+                out.append(",")  # Missing comma between items
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+            prev = char
+            i += 1
+        elif char in "}]":
+            if not stack or stack.pop() != char:
+                return None
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()  # Trailing comma
+            out.append(char)
+            prev = char
+            i += 1
+            if not stack:
+                return "".join(out)
+        elif char in ",:":
+            out.append(char)
+            prev = char
+            i += 1
+        elif char in _DOUBLE_QUOTES or char in _SINGLE_QUOTES:
+            if prev in ('"', "}", "]") or prev.isalnum():
+                out.append(",")
+            i = _read_string(text, i, out)
+            prev = '"'
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = len(text) if end == -1 else end
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = len(text) if end == -1 else end + 2
+        elif char.isalnum() or char in "-+._":
+            end = i
+            while end < len(text) and (text[end].isalnum() or text[end] in "-+._"):
+                end += 1
+            word = text[i:end]
+            if word in _LITERALS:
+                out.append(_LITERALS[word])
+            elif stack and stack[-1] == "}" and prev in "{," and _next_significant(text, end, " \t\r\n") == ":":
+                out.append(json.dumps(word))  # Unquoted key
+            else:
+                out.append(word)  # Numbers; anything else fails in json.loads
+            prev = word[-1]
+            i = end
+        else:
+            return None  # Prose inside the structure: not this candidate
+    return None  # Ran out of text with brackets still open
+
+
+def _read_string(text: str, start: int, out: List[str]) -> int:
+    """Appends the string opened at text[start] to `out` as a JSON string; returns the index after it."""
+    opener = text[start]
+    closers = '"' if opener == '"' else (_DOUBLE_QUOTES if opener in _DOUBLE_QUOTES else _SINGLE_QUOTES)
+    out.append('"')
+    i = start + 1
+    while i < len(text):
+        char = text[i]
+        if char == "\\" and i + 1 < len(text):
+            escaped = text[i + 1]
+            out.append("\\" + escaped if escaped in _ESCAPABLE else ("'" if escaped == "'" else "\\\\" + escaped))
+            i += 2
+            continue
+        if char in closers and _next_significant(text, i + 1) in _STRING_END_FOLLOWERS:  # "" at the end matches too
+            out.append('"')
+            return i + 1
+        if char == '"':
+            out.append('\\"')  # Inner quote the model forgot to escape
+        elif char == "\n":
+            out.append("\\n")
+        elif char == "\r":
+            out.append("\\r")
+        elif char == "\t":
+            out.append("\\t")
+        else:
+            out.append(char)
+        i += 1
+    return i
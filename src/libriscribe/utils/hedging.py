@@ -0,0 +1,73 @@
+# src/libriscribe/utils/hedging.py
+"""
+Hedged requests: latency tracking and the race between a call and its duplicate.
+
+LLMClient records how long each operation's successful calls take. Once a call has run
+longer than a high percentile of that history (p95 by default) a duplicate is sent -
+to the same model or to the configured hedge target - and whichever answers first wins.
+Only the slowest few percent of calls are duplicated, which cuts tail latency for a
+small, bounded extra cost; hedges are also paid from the operation's retry budget.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200  # Recent latencies kept per provider, model and operation
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies per (provider, model, operation)."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[Tuple[str, str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, provider: str, model: str, operation: Optional[str], seconds: float) -> None:
+        key = (provider, model, operation or "unlabeled")
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, provider: str, model: str, operation: Optional[str], percentile: float,
+                   min_samples: int = 1) -> Optional[float]:
+        """The given percentile of recent latencies, or None with fewer than `min_samples` observations."""
+        with self._lock:
+            samples = sorted(self._samples.get((provider, model, operation or "unlabeled"), ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        rank = max(0, math.ceil(percentile / 100 * len(samples)) - 1)  # Nearest-rank method
+        return samples[min(rank, len(samples) - 1)]
+
+
+async def race_with_hedge(primary: Awaitable[Any], start_hedge: Callable[[], Optional[Awaitable[Any]]],
+                          delay: float) -> Tuple[Any, bool]:
+    """
+    Awaits `primary`; if it is still running after `delay` seconds, starts the hedge from
+    `start_hedge()` (which may return None to decline) and returns whichever succeeds first.
+    Returns (result, hedge_won). The loser is cancelled. If both fail, raises the primary's error.
+    """
+    primary_task = asyncio.ensure_future(primary)
+    done, _ = await asyncio.wait({primary_task}, timeout=delay)
+    if done:
+        return primary_task.result(), False
+
+    hedge = start_hedge()
+    if hedge is None:
+        return await primary_task, False
+    hedge_task = asyncio.ensure_future(hedge)
+    pending = {primary_task, hedge_task}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                return task.result(), task is hedge_task
+            logger.warning(f"{'Hedge' if task is hedge_task else 'Primary'} call failed during hedging: {task.exception()}")
+    raise primary_task.exception()
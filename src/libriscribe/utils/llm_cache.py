@@ -0,0 +1,190 @@
+# src/libriscribe/utils/llm_cache.py
+"""
+Persistent, content-addressed cache of LLM responses.
+
+Responses are stored in a SQLite database under the project directory and keyed on
+everything that determines the output: provider, model, prompt, max_tokens and temperature.
+Entries are evicted least-recently-used first once the cache exceeds its size budget,
+and unconditionally once they are older than the age limit.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = ".llm_cache"
+CACHE_FILE_NAME = "responses.sqlite"
+
+
+class LLMResponseCache:
+    """SQLite-backed LLM response cache with size- and age-based LRU eviction."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_age_days: float = 30):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.path: Optional[Path] = None
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """The cache only works once it is attached to a project directory."""
+        return self._conn is not None
+
+    def attach(self, project_dir: Union[str, Path]) -> None:
+        """Opens (or creates) the cache database inside the given project directory."""
+        path = Path(project_dir) / CACHE_DIR_NAME / CACHE_FILE_NAME
+        if self.path == path and self._conn is not None:
+            return
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(path), check_same_thread=False)
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY, provider TEXT, model TEXT, response TEXT,"
+                    " size INTEGER, created REAL, last_access REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+                conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+                conn.commit()
+                self._conn = conn
+                self.path = path
+            except sqlite3.Error as e:
+                logger.error(f"Could not open LLM cache at {path}: {e}")
+                self._conn = None
+                self.path = None
+                return
+        self.evict()
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, max_tokens: int, temperature: float, **extra: Any) -> str:
+        """Returns the content address for a request."""
+        payload = {
+            "provider": provider,
+            "model": model,
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": round(float(temperature), 4),
+        }
+        payload.update(extra)
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None or now - row[1] > self.max_age_seconds:
+                    self.misses += 1
+                    self._bump("misses")
+                    self._conn.commit()
+                    return None
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                self._bump("hits")
+                self._conn.commit()
+                return row[0]
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache read failed: {e}")
+                return None
+
+    def put(self, key: str, response: str, provider: str = "", model: str = "") -> None:
+        """Stores a response and evicts old entries if the cache grew past its budget."""
+        if not self.enabled or not response:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, provider, model, response, size, created, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, provider, model, response, len(response.encode("utf-8")), now, now),
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed: {e}")
+                return
+        if self._total_bytes() > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drops expired entries, then least-recently-used ones until under the size budget."""
+        if not self.enabled:
+            return 0
+        removed = 0
+        with self._lock:
+            try:
+                cursor = self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age_seconds,))
+                removed += cursor.rowcount
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall():
+                        if total <= self.max_bytes:
+                            break
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        total -= size
+                        removed += 1
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache eviction failed: {e}")
+        if removed:
+            logger.info(f"LLM cache: evicted {removed} entries")
+        return removed
+
+    def clear(self) -> None:
+        """Removes every cached response and resets the counters."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("DELETE FROM counters")
+            self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this session and since the cache was created."""
+        stats: Dict[str, Any] = {
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+            "entries": 0,
+            "bytes": 0,
+            "total_hits": 0,
+            "total_misses": 0,
+            "hit_rate": 0.0,
+        }
+        if not self.enabled:
+            return stats
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        stats.update(entries=entries, bytes=size, total_hits=counters.get("hits", 0), total_misses=counters.get("misses", 0))
+        lookups = stats["total_hits"] + stats["total_misses"]
+        stats["hit_rate"] = stats["total_hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _bump(self, counter: str) -> None:
+        # Caller holds the lock
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (counter,),
+        )
@@ -1,16 +1,47 @@
 # src/libriscribe/utils/llm_client.py
-import openai
-from openai import OpenAI  # For OpenAI
+import asyncio
+import contextvars
+import copy
+import json
 import logging
-from tenacity import retry, stop_after_attempt, wait_random_exponential
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from collections import Counter
+import openai
+from openai import OpenAI, AsyncOpenAI  # For OpenAI
 from libriscribe.settings import Settings
 
 import anthropic  # For Claude
 import google.generativeai as genai  # For Google AI Studio
+import httpx  # Async transport for DeepSeek and Mistral
 import requests  # For DeepSeek and Mistral
 
 # ADDED THIS: Import the function
-from libriscribe.utils.file_utils import extract_json_from_markdown
+from libriscribe.utils.file_utils import extract_json_from_markdown, parse_json_lenient
+from libriscribe.utils.hedging import LatencyTracker, race_with_hedge
+from libriscribe.utils.llm_cache import LLMResponseCache
+from libriscribe.utils.llm_errors import (
+    CircuitHalfOpenError,
+    CircuitOpenError,
+    ContextLengthError,
+    LLMError,
+    MalformedOutputError,
+    RateLimitedError,
+    check_completion,
+    classify_error,
+)
+from libriscribe.utils.mock_llm import MockLLM
+from libriscribe.utils.model_registry import ModelSpec, is_registered, model_spec
+from libriscribe.utils.model_router import ModelRouter
+from libriscribe.utils.rate_limiter import ProviderLimiter, RateLimiter
+from libriscribe.utils.retry_policy import RetryBudget, RetryController
+from libriscribe.utils.structured_output import JSON_MODE_PROVIDERS, SCHEMA_PROVIDERS, OutputSchema
+from libriscribe.utils.token_counter import count_tokens, truncate_to_tokens
+from libriscribe.utils.usage_ledger import UsageLedger, UsageRecord, current_labels
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +49,103 @@ logger = logging.getLogger(__name__)
 httpx_logger = logging.getLogger("httpx")
 httpx_logger.setLevel(logging.WARNING)  # Or ERROR, to suppress even warnings
 
+# Errors that say the provider itself is unavailable, so another provider may still answer
+FAILOVER_ERROR_KINDS = {"circuit_open", "auth", "transient", "rate_limited"}
+
+# A prompt must leave at least this much room for the reply (or all of max_tokens, if smaller)
+MIN_OUTPUT_TOKENS = 256
+
+# OpenAI-compatible chat endpoints called over plain HTTP
+CHAT_COMPLETION_URLS = {
+    "deepseek": "https://api.deepseek.com/v1/chat/completions",
+    "mistral": "https://api.mistral.ai/v1/chat/completions",
+}
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_unregistered_warned: Set[str] = set()  # Models already warned about in _fit_request
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Returns a long-lived event loop running in a daemon thread."""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None or _background_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="libriscribe-async", daemon=True)
+            thread.start()
+            _background_loop = loop
+    return _background_loop
+
+
+async def _in_context(context: contextvars.Context, coro: Awaitable[Any]) -> Any:
+    """Re-applies the caller's context variables (e.g. usage labels) inside the background loop."""
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """
+    Runs a coroutine to completion from synchronous code.
+    All calls share one background loop, so async provider clients can be reused between calls.
+    """
+    context = contextvars.copy_context()
+    return asyncio.run_coroutine_threadsafe(_in_context(context, coro), _get_background_loop()).result()
+
+
+@dataclass
+class LLMResponse:
+    """Text of one provider call plus the token usage the provider reported."""
+    text: str = ""
+    prompt_tokens: int = 0  # All input tokens, including those served from the provider's prefix cache
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # Input tokens billed at the provider's cached rate
+    retries: int = 0
+
+
+def extract_usage(response: Any) -> Tuple[int, int, int]:
+    """
+    Extracts (prompt_tokens, completion_tokens, cached_tokens) from any provider's response
+    object or JSON body. prompt_tokens always includes the cached tokens.
+    """
+    if isinstance(response, dict):
+        usage = response.get("usage") or {}
+    else:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            metadata = getattr(response, "usage_metadata", None)  # Gemini
+            if metadata is None:
+                return 0, 0, 0
+            return (getattr(metadata, "prompt_token_count", 0) or 0,
+                    getattr(metadata, "candidates_token_count", 0) or 0,
+                    getattr(metadata, "cached_content_token_count", 0) or 0)
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+
+    if "input_tokens" in usage:  # Anthropic reports cache reads and writes separately from input_tokens
+        cache_read = usage.get("cache_read_input_tokens") or 0
+        cache_write = usage.get("cache_creation_input_tokens") or 0
+        return (usage.get("input_tokens") or 0) + cache_read + cache_write, usage.get("output_tokens") or 0, cache_read
+    details = usage.get("prompt_tokens_details") or {}  # OpenAI, OpenRouter
+    cached = details.get("cached_tokens") or usage.get("prompt_cache_hit_tokens") or 0  # DeepSeek
+    return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0, cached
+
+
+def join_prompt(prompt: str, prefix: str = "") -> str:
+    """The full prompt text for providers that take a single string: shared prefix first."""
+    return f"{prefix}\n\n{prompt}" if prefix else prompt
+
+
+async def gather_with_concurrency(coros: Iterable[Awaitable[Any]], limit: int = 4) -> List[Any]:
+    """Awaits the coroutines with at most `limit` running at once, preserving input order."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _bounded(coro: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(_bounded(coro) for coro in coros))
+
 
 class LLMClient:
     """Unified LLM client for multiple providers."""
@@ -27,6 +155,40 @@ class LLMClient:
         self.llm_provider = llm_provider
         self.client = self._get_client()  # Initialize the correct client
         self.model = self._get_default_model()
+        self._async_clients: Dict[asyncio.AbstractEventLoop, Any] = {}  # One async client per event loop
+        self.agent_name: Optional[str] = None
+        self.use_cache = self.settings.llm_cache_enabled
+        self.cache = LLMResponseCache(
+            max_bytes=self.settings.llm_cache_max_mb * 1024 * 1024,
+            max_age_days=self.settings.llm_cache_max_age_days,
+        )
+        self.rate_limiter = RateLimiter(self.settings)  # Shared by every agent's view of this client
+        self.ledger = UsageLedger()  # Likewise shared, so one ledger sees every agent's calls
+        self.retry = RetryController(self.settings)  # Retry budgets and circuit breakers, also shared
+        self.latency = LatencyTracker()  # Call latencies that set the hedging threshold, also shared
+        self._peers: Dict[str, Optional["LLMClient"]] = {}  # Tier, hedge and failover clients by "provider:model"
+        self.router = ModelRouter(self.settings)  # Operation -> model tier
+        self.route_calls = True  # False for the peer clients that serve a tier
+
+    def for_agent(self, agent_name: str, use_cache: bool = True) -> "LLMClient":
+        """
+        Returns a view of this client for a single agent.
+        The view shares provider clients and the response cache; use_cache=False opts the agent out of caching.
+        """
+        view = copy.copy(self)
+        view.agent_name = agent_name
+        view.use_cache = self.use_cache and use_cache
+        return view
+
+    def set_project_dir(self, project_dir) -> None:
+        """Points the response cache and usage ledger at the project directory."""
+        self.ledger.attach(project_dir)
+        if self.settings.llm_cache_enabled:
+            self.cache.attach(project_dir)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Returns the response cache hit/miss counters."""
+        return self.cache.stats()
 
     def _get_client(self):
         """Initializes the appropriate client based on the provider."""
@@ -56,9 +218,38 @@ class LLMClient:
              if not self.settings.mistral_api_key:
                 raise ValueError("Mistral API key is not set")
              return None
+        elif self.llm_provider == "mock":
+            return MockLLM(self.settings)  # Offline; serves both sync and async calls
+        else:
+            raise ValueError(f"Unsupported LLM provider: {self.llm_provider}")
+
+    def _get_async_client(self):
+        """Returns the async client for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        if loop in self._async_clients:
+            return self._async_clients[loop]
+
+        if self.llm_provider == "openrouter":
+            client = AsyncOpenAI(
+                api_key=self.settings.openrouter_api_key,
+                base_url=self.settings.openrouter_base_url
+            )
+        elif self.llm_provider == "openai":
+            client = AsyncOpenAI(api_key=self.settings.openai_api_key)
+        elif self.llm_provider == "claude":
+            client = anthropic.AsyncAnthropic(api_key=self.settings.claude_api_key)
+        elif self.llm_provider == "google_ai_studio":
+            client = genai  # generate_content_async lives on the GenerativeModel
+        elif self.llm_provider in CHAT_COMPLETION_URLS:
+            client = httpx.AsyncClient(timeout=120)
+        elif self.llm_provider == "mock":
+            client = self.client
         else:
             raise ValueError(f"Unsupported LLM provider: {self.llm_provider}")
 
+        self._async_clients[loop] = client
+        return client
+
     def _get_default_model(self):
         """Gets the default model name for the selected provider."""
         if self.llm_provider == "openrouter":
@@ -73,103 +264,817 @@ class LLMClient:
              return "deepseek-coder-6.7b-instruct"
         elif self.llm_provider == "mistral":
             return "mistral-medium-latest"
+        elif self.llm_provider == "mock":
+            return "mock-1"
         else:
             return "unknown"  # Should not happen, but good for safety
     def set_model(self, model_name: str):
       self.model = model_name
 
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
-    def generate_content(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7, language: str = "English") -> str:
+    def _prepare_prompt(self, prompt: str, language: str) -> str:
+        """Appends the language instruction to the prompt if not already included."""
+        if "IMPORTANT: The content should be written entirely in" not in prompt and language != "English":
+            prompt += f"\n\nIMPORTANT: Generate the response in {language}."
+        return prompt
+
+    def _chat_messages(self, prompt: str, prefix: str = "") -> List[Dict[str, Any]]:
+        """Builds the chat message list for OpenAI-compatible providers."""
+        if self.llm_provider == "openrouter":
+            prompt += "\n\nPlease format any JSON output in markdown code blocks with ```json```"
+        return [{"role": "user", "content": self.user_content(prompt, prefix)}]
+
+    def user_content(self, prompt: str, prefix: str = "") -> Union[str, List[Dict[str, Any]]]:
+        """
+        User message content with the stable prefix first, so providers can serve it from their prompt cache.
+        Anthropic models need an explicit cache_control breakpoint; OpenAI, DeepSeek and Gemini cache
+        identical leading tokens automatically.
+        """
+        if not prefix:
+            return prompt
+        if self.llm_provider == "claude" or (self.llm_provider == "openrouter" and self.model.startswith("anthropic/")):
+            return [
+                {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": prompt},
+            ]
+        return join_prompt(prompt, prefix)
+
+    def _postprocess(self, content: str) -> str:
+        """Post-processes OpenRouter responses to ensure markdown JSON format."""
+        content = content.strip()
+        if self.llm_provider == "openrouter" and "```json" not in content and "{" in content:
+            json_match = re.search(r'\{.*\}', content, re.DOTALL)
+            if json_match:
+                content = f"```json\n{json_match.group()}\n```"
+        return content
+
+    def _http_request(self, prompt: str, max_tokens: int, temperature: float, schema: Optional[OutputSchema] = None):
+        """Builds headers and payload for providers called over plain HTTP."""
+        api_key = self.settings.deepseek_api_key if self.llm_provider == "deepseek" else self.settings.mistral_api_key
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+        data = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if schema:
+            data["messages"][0]["content"] += schema.prompt_suffix()
+            data["response_format"] = {"type": "json_object"}
+        return CHAT_COMPLETION_URLS[self.llm_provider], headers, data
+
+    def _cache_key(self, prompt: str, max_tokens: int, temperature: float, use_cache: Optional[bool],
+                   prefix: str = "", schema: Optional[OutputSchema] = None) -> Optional[str]:
+        """Returns the cache key for a request, or None when caching is off for this call."""
+        if use_cache is False or not self.use_cache or not self.cache.enabled:
+            return None
+        extra = {"schema": schema.fingerprint()} if schema else {}
+        return LLMResponseCache.make_key(self.llm_provider, self.model, join_prompt(prompt, prefix), max_tokens, temperature,
+                                         **extra)
+
+    def _record_usage(self, operation: Optional[str], result: LLMResponse, started: float, cache_hit: bool = False,
+                      error: Optional[LLMError] = None) -> None:
+        """Appends one call (or cache hit, or failure) to the usage ledger."""
+        self.ledger.record(UsageRecord(
+            operation=operation or "unlabeled",
+            agent=self.agent_name or "-",
+            provider=self.llm_provider,
+            model=self.model,
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.completion_tokens,
+            cached_tokens=result.cached_tokens,
+            latency_s=round(time.perf_counter() - started, 3),
+            retries=result.retries,
+            cost_usd=0.0 if cache_hit else self.capabilities().cost(result.prompt_tokens, result.completion_tokens,
+                                                                     result.cached_tokens),
+            cache_hit=cache_hit,
+            success=bool(result.text),
+            error=error.kind if error else None,
+            labels={**current_labels(), "tier": self.router.tier_for(operation).name} if self.router.enabled else current_labels(),
+        ))
+
+    def usage_records(self) -> List[UsageRecord]:
+        """Usage records made by this client (and its agent views) during the session."""
+        return list(self.ledger.session_records)
+
+    def generate_content(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7, language: str = "English",
+                         use_cache: Optional[bool] = None, operation: Optional[str] = None, prefix: str = "",
+                         schema: Optional[OutputSchema] = None) -> str:
         """
         Generates text using the selected LLM provider.
         Now supports specifying the output language explicitly.
+        Pass use_cache=False for creative calls that should not reuse an earlier response.
+        `operation` labels the call in the usage ledger (e.g. "scene_write", "review").
+        `prefix` is long context shared by many calls (e.g. the previous chapter); it is sent ahead of
+        the prompt and marked for the provider's prompt cache, so repeats are billed at cached rates.
+        The call goes to the model tier its operation routes to (see utils/model_router.py).
+        max_tokens is clamped to what the model can return and to the room its context window
+        leaves; a prompt that leaves no room raises ContextLengthError without being sent.
+        `schema` asks the provider for JSON of that shape; prefer generate_structured, which also parses it.
+        Raises an LLMError subclass (see utils/llm_errors.py) once the call has failed for good.
         """
+        client, max_tokens = self._route(operation, max_tokens)
+        if client is not self:
+            return client.generate_content(prompt, max_tokens, temperature, language, use_cache, operation, prefix, schema)
+
+        prompt = self._prepare_prompt(prompt, language)
+        started = time.perf_counter()
+        max_tokens = self._fit_request(prompt, max_tokens, prefix, operation, started)
+        cache_key = self._cache_key(prompt, max_tokens, temperature, use_cache, prefix, schema)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._record_usage(operation, LLMResponse(cached), started, cache_hit=True)
+                return cached
+
+        try:
+            if self.settings.llm_hedge_enabled:
+                client, result = run_async(self._ahedged(prompt, max_tokens, temperature, prefix, operation, schema))
+            else:
+                client, result = self, self._generate(prompt, max_tokens, temperature, prefix, operation, schema=schema)
+        except LLMError as e:
+            self._record_usage(operation, LLMResponse(retries=e.retries), started, error=e)
+            client, result = self._failover(e, prompt, max_tokens, temperature, prefix, operation, started, schema)
+        client._record_usage(operation, result, started)
+        if cache_key:
+            self.cache.put(cache_key, result.text, self.llm_provider, self.model)
+        return result.text
+
+    def _route(self, operation: Optional[str], max_tokens: int) -> Tuple["LLMClient", int]:
+        """The client for this operation's model tier, and max_tokens capped by the tier."""
+        if not self.route_calls or not self.router.enabled:
+            return self, max_tokens
+        tier, provider, model = self.router.resolve(operation, self.llm_provider, self.model)
+        if tier.max_tokens:
+            max_tokens = min(max_tokens, tier.max_tokens)
+        if (provider, model) == (self.llm_provider, self.model):
+            return self, max_tokens
+        return self._peer(f"{provider}:{model}" if model else provider) or self, max_tokens
+
+    def capabilities(self) -> ModelSpec:
+        """Context window, output limit and prices of this client's model (see utils/model_registry.py)."""
+        return model_spec(self.model, self.settings.llm_model_specs)
+
+    def max_chunk_tokens(self, template: str, output_ratio: float = 1.0, output_overhead: int = 0) -> int:
+        """
+        The largest input chunk, in tokens, that fits one call when `template` is the prompt
+        without the chunk and the reply runs about `output_ratio` tokens per input token plus
+        `output_overhead`. Agents split longer inputs (see utils/chunking.py).
+        """
+        spec = self.capabilities()
+        room = spec.context_window - self.count_tokens(template) - output_overhead
+        by_window = room / (1 + output_ratio)
+        by_output = (spec.max_output_tokens - output_overhead) / output_ratio if output_ratio else by_window
+        return max(1, int(min(by_window, by_output)))
+
+    def _fit_request(self, prompt: str, max_tokens: int, prefix: str, operation: Optional[str], started: float) -> int:
+        """
+        max_tokens clamped to the model's limits; raises ContextLengthError if the prompt leaves too
+        little room. Models missing from the registry are sent as asked, since their limits are a guess.
+        """
+        if not is_registered(self.model, self.settings.llm_model_specs):
+            if self.model not in _unregistered_warned:
+                _unregistered_warned.add(self.model)
+                logger.warning(f"{self.model} is not in the model registry; not checking its context window or "
+                               f"output limit (set LLM_MODEL_SPECS to enable this)")
+            return max_tokens
+        spec = self.capabilities()
+        room = spec.context_window - self.count_tokens(join_prompt(prompt, prefix))
+        if room < min(max_tokens, MIN_OUTPUT_TOKENS):
+            error = ContextLengthError(
+                f"Prompt leaves {room} of {spec.context_window} tokens for output with {self.model}",
+                provider=self.llm_provider)
+            self._record_usage(operation, LLMResponse(), started, error=error)
+            raise error
+        fitted = min(max_tokens, spec.max_output_tokens, room)
+        if fitted < max_tokens:
+            logger.debug(f"max_tokens {max_tokens} clamped to {fitted} for {self.model}")
+        return fitted
+
+    def count_tokens(self, text: str) -> int:
+        """Tokens `text` takes up for this client's provider and model (see utils/token_counter.py)."""
+        return count_tokens(text, self.llm_provider, self.model)
+
+    def truncate_to_tokens(self, text: str, max_tokens: int, keep: str = "start") -> str:
+        """`text` cut at a word boundary to fit `max_tokens` of this client's model."""
+        return truncate_to_tokens(text, max_tokens, self.llm_provider, self.model, keep)
+
+    def _estimate_request_tokens(self, prompt: str, max_tokens: int, prefix: str = "") -> int:
+        """Upper-bound token cost of a request, charged against the tokens/min budget."""
+        return self.count_tokens(join_prompt(prompt, prefix)) + max_tokens
+
+    def _limiter(self) -> ProviderLimiter:
+        return self.rate_limiter.get(self.llm_provider, self.model)
+
+    def _generate(self, prompt: str, max_tokens: int, temperature: float, prefix: str = "",
+                  operation: Optional[str] = None, retries: Optional[Counter] = None,
+                  schema: Optional[OutputSchema] = None) -> LLMResponse:
+        """
+        Calls the provider once the prompt is final, retrying each error class as its policy allows
+        and within the operation's retry budget. Raises the classified error when giving up.
+        `retries` continues the count of a request that already failed (a stream that broke off).
+        """
+        breaker = self.retry.breaker(self.llm_provider)
+        budget = self.retry.budget(operation)
+        if retries is None:
+            budget.record_request()
+            retries = Counter()
+        while True:
+            attempt_started = time.perf_counter()
+            probe = False
+            try:
+                probe = breaker.before_call()
+                result = self._call_provider(prompt, max_tokens, temperature, prefix, schema)
+            except LLMError as e:
+                delay = self._retry_delay(e, retries, budget)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                if probe:  # No outcome to report; don't leave the circuit waiting for one
+                    breaker.release_probe()
+                raise
+            breaker.record_success()
+            self.latency.observe(self.llm_provider, self.model, operation, time.perf_counter() - attempt_started)
+            result.retries = sum(retries.values())
+            return result
+
+    def _retry_delay(self, error: LLMError, retries: Counter, budget: RetryBudget) -> Optional[float]:
+        """Books a failed attempt; returns how long to wait before the next one, or None to give up."""
+        error.retries = sum(retries.values())
+        if isinstance(error, CircuitHalfOpenError):
+            # Not attempted and not billed: wait for the probe's outcome. Bounded, because a probe
+            # that does not report back within llm_circuit_probe_timeout_seconds is replaced
+            return error.retry_after
+        if isinstance(error, CircuitOpenError):
+            return None  # Not attempted, so nothing to tell the breaker
+        self.retry.breaker(self.llm_provider).record_failure(error)
+        retries[error.kind] += 1
+        delay = self.retry.retry_delay(error, retries[error.kind], budget)
+        if delay is None:
+            logger.error(f"{self.llm_provider} {error.kind} error after {error.retries} retries: {error}")
+        else:
+            logger.warning(f"{self.llm_provider} {error.kind} error, retrying in {delay:.1f}s: {error}")
+        return delay
+
+    def _call_provider(self, prompt: str, max_tokens: int, temperature: float, prefix: str = "",
+                       schema: Optional[OutputSchema] = None) -> LLMResponse:
+        """One provider call, holding a rate-limiter slot."""
+        limiter = self._limiter()
+        limiter.acquire(self._estimate_request_tokens(prompt, max_tokens, prefix))
+        headers = None
+        success = False
         try:
-            # Append language instruction to prompt if not already included
-            if "IMPORTANT: The content should be written entirely in" not in prompt and language != "English":
-                prompt += f"\n\nIMPORTANT: Generate the response in {language}."
-                
             if self.llm_provider == "openai" or self.llm_provider == "openrouter":
-                response = self.client.chat.completions.create(
+                raw = self.client.chat.completions.with_raw_response.create(
                     model=self.model,
-                    messages=[{"role": "user", "content": prompt + "\n\nPlease format any JSON output in markdown code blocks with ```json```" if self.llm_provider == "openrouter" else prompt}],
+                    messages=self._chat_messages(prompt, prefix),
                     max_tokens=max_tokens,
                     temperature=temperature,
+                    **self._openai_kwargs(schema),
                 )
-                content = response.choices[0].message.content.strip()
-                # Post-process OpenRouter responses to ensure markdown JSON format
-                if self.llm_provider == "openrouter" and "```json" not in content and "{" in content:
-                    json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                    if json_match:
-                        content = f"```json\n{json_match.group()}\n```"
-                return content
+                headers = raw.headers
+                response = raw.parse()
+                choice = response.choices[0]
+                text = check_completion(choice.message.content, choice.finish_reason, self.llm_provider)
+                result = LLMResponse(self._postprocess(text), *extract_usage(response))
 
             elif self.llm_provider == "claude":
-                response = self.client.messages.create(
+                raw = self.client.messages.with_raw_response.create(
                     model=self.model,
                     max_tokens=max_tokens,
                     temperature=temperature,
-                    messages=[{"role": "user", "content": prompt}]
+                    messages=[{"role": "user", "content": self.user_content(prompt, prefix)}],
+                    **(schema.claude_tool_kwargs() if schema else {}),
                 )
-                return response.content[0].text.strip()
+                headers = raw.headers
+                response = raw.parse()
+                text = self._claude_text(response)
+                result = LLMResponse(check_completion(text, response.stop_reason, self.llm_provider).strip(),
+                                     *extract_usage(response))
 
             elif self.llm_provider == "google_ai_studio":
                 model = self.client.GenerativeModel(model_name=self.model)
-                response = model.generate_content(prompt) # No need for messages list with genai
-                return response.text.strip()
-
-            elif self.llm_provider == "deepseek":
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.settings.deepseek_api_key}"
-                }
-                data = {
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": max_tokens,
-                    "temperature": temperature
-                }
-                response = requests.post("https://api.deepseek.com/v1/chat/completions", headers=headers, json=data, timeout=120) # Timeout
+                response = model.generate_content(join_prompt(prompt, prefix), # No need for messages list with genai
+                                                  generation_config=schema.gemini_generation_config() if schema else None)
+                result = LLMResponse(check_completion(response.text, provider=self.llm_provider).strip(),
+                                     *extract_usage(response))
+
+            elif self.llm_provider in CHAT_COMPLETION_URLS:
+                url, request_headers, data = self._http_request(join_prompt(prompt, prefix), max_tokens, temperature, schema)
+                response = requests.post(url, headers=request_headers, json=data, timeout=120) # Timeout
+                headers = response.headers
                 response.raise_for_status() # Raise for HTTP errors
-                return response.json()["choices"][0]["message"]["content"].strip()
-            elif self.llm_provider == "mistral":
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.settings.mistral_api_key}"
-                }
-                data = {
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": max_tokens,
-                    "temperature": temperature
-                }
-
-                response = requests.post("https://api.mistral.ai/v1/chat/completions", headers=headers, json=data, timeout=120)
-                response.raise_for_status()
-                return response.json()['choices'][0]['message']['content'].strip()
+                body = response.json()
+                choice = body["choices"][0]
+                text = check_completion(choice["message"]["content"], choice.get("finish_reason"), self.llm_provider)
+                result = LLMResponse(text.strip(), *extract_usage(body))
+
+            elif self.llm_provider == "mock":
+                body = self.client.complete(self._mock_prompt(prompt, prefix, schema), max_tokens, json_mode=bool(schema))
+                result = LLMResponse(check_completion(body["text"], provider=self.llm_provider), *extract_usage(body))
 
             else:
-                return "" #  Should not happen, provider checked in init
+                raise ValueError(f"Unsupported LLM provider: {self.llm_provider}")  # Checked in __init__
+
+            if schema and self.enforces_schema():
+                self._check_structured(result.text)
+            success = True
+            return result
 
+        except LLMError:
+            raise
         except Exception as e:
-            logger.exception(f"Error during {self.llm_provider} API call: {e}")
-            print(f"ERROR: {self.llm_provider} API error: {e}")
-            return ""
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(3))
-    def generate_content_with_json_repair(self, original_prompt: str, max_tokens:int = 2000, temperature:float=0.7) -> str:
-        """Generates content and attempts to repair JSON errors."""
-        response_text = self.generate_content(original_prompt, max_tokens, temperature)
-        if response_text:
-            json_data = extract_json_from_markdown(response_text)
-            if json_data is not None:
-                return response_text # Return the original markdown
+            raise self._classify(e, limiter) from e
+        finally:
+            limiter.release(success, headers)
+
+    def enforces_schema(self) -> bool:
+        """Whether this provider constrains output to a schema (or at least to valid JSON)."""
+        return self.llm_provider in SCHEMA_PROVIDERS or self.llm_provider in JSON_MODE_PROVIDERS
+
+    def _openai_kwargs(self, schema: Optional[OutputSchema]) -> Dict[str, Any]:
+        """response_format for OpenAI; OpenRouter models differ too much in what they accept."""
+        return {"response_format": schema.openai_response_format()} if schema and self.llm_provider == "openai" else {}
+
+    def _mock_prompt(self, prompt: str, prefix: str, schema: Optional[OutputSchema]) -> str:
+        return join_prompt(prompt, prefix) + (schema.prompt_suffix() if schema else "")
+
+    @staticmethod
+    def _claude_text(response: Any) -> str:
+        """Text blocks of a Claude message, or the input of its (forced) tool call as JSON."""
+        for block in response.content:
+            if block.type == "tool_use":
+                return json.dumps(block.input)
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    def _check_structured(self, text: str) -> None:
+        """Raises MalformedOutputError for enforced JSON that does not parse, e.g. cut off at max_tokens."""
+        try:
+            json.loads(text)
+        except json.JSONDecodeError as e:
+            raise MalformedOutputError(f"Structured output is not valid JSON: {e}", provider=self.llm_provider) from e
+
+    def _classify(self, error: Exception, limiter: ProviderLimiter) -> LLMError:
+        """Classifies a provider failure, telling the limiter about 429s."""
+        classified = classify_error(error, self.llm_provider)
+        if isinstance(classified, RateLimitedError):
+            limiter.on_rate_limited(classified.retry_after)
+        return classified
+
+    async def agenerate_content(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7, language: str = "English",
+                                use_cache: Optional[bool] = None, operation: Optional[str] = None, prefix: str = "",
+                                schema: Optional[OutputSchema] = None) -> str:
+        """Async counterpart of generate_content, using each provider's async client."""
+        client, max_tokens = self._route(operation, max_tokens)
+        if client is not self:
+            return await client.agenerate_content(prompt, max_tokens, temperature, language, use_cache, operation, prefix,
+                                                  schema)
+
+        prompt = self._prepare_prompt(prompt, language)
+        started = time.perf_counter()
+        max_tokens = self._fit_request(prompt, max_tokens, prefix, operation, started)
+        cache_key = self._cache_key(prompt, max_tokens, temperature, use_cache, prefix, schema)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._record_usage(operation, LLMResponse(cached), started, cache_hit=True)
+                return cached
+
+        try:
+            if self.settings.llm_hedge_enabled:
+                client, result = await self._ahedged(prompt, max_tokens, temperature, prefix, operation, schema)
             else:
-                repair_prompt = f"You are a helpful AI that only returns valid JSON.  Fix the following broken JSON:\n\n```json\n{response_text}\n```"
-                repaired_response = self.generate_content(repair_prompt, max_tokens=max_tokens, temperature=0.2) #Low temp for corrections
-                if repaired_response:
-                    repaired_json = extract_json_from_markdown(repaired_response)
-                    if repaired_json is not None:
-                        # CRITICAL CHANGE:  Return the JSON *string*, not wrapped in Markdown.
-                        return repaired_response 
-        logger.error("JSON repair failed.")
-        return "" # Return empty
\ No newline at end of file
+                client, result = self, await self._agenerate(prompt, max_tokens, temperature, prefix, operation, schema=schema)
+        except LLMError as e:
+            self._record_usage(operation, LLMResponse(retries=e.retries), started, error=e)
+            client, result = await self._afailover(e, prompt, max_tokens, temperature, prefix, operation, started, schema)
+        client._record_usage(operation, result, started)
+        if cache_key:
+            self.cache.put(cache_key, result.text, self.llm_provider, self.model)
+        return result.text
+
+    async def _agenerate(self, prompt: str, max_tokens: int, temperature: float, prefix: str = "",
+                         operation: Optional[str] = None, retries: Optional[Counter] = None,
+                         schema: Optional[OutputSchema] = None) -> LLMResponse:
+        """Async counterpart of _generate."""
+        breaker = self.retry.breaker(self.llm_provider)
+        budget = self.retry.budget(operation)
+        if retries is None:
+            budget.record_request()
+            retries = Counter()
+        while True:
+            attempt_started = time.perf_counter()
+            probe = False
+            try:
+                probe = breaker.before_call()
+                result = await self._acall_provider(prompt, max_tokens, temperature, prefix, schema)
+            except LLMError as e:
+                delay = self._retry_delay(e, retries, budget)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled (e.g. a hedge won the race, or the chapter was aborted): no outcome to report
+                if probe:
+                    breaker.release_probe()
+                raise
+            breaker.record_success()
+            self.latency.observe(self.llm_provider, self.model, operation, time.perf_counter() - attempt_started)
+            result.retries = sum(retries.values())
+            return result
+
+    async def _ahedged(self, prompt: str, max_tokens: int, temperature: float, prefix: str,
+                       operation: Optional[str], schema: Optional[OutputSchema] = None) -> Tuple["LLMClient", LLMResponse]:
+        """
+        Runs the call, sending a duplicate to the hedge target once it has taken longer than the
+        operation's usual latency (llm_hedge_percentile). Returns the client that answered first.
+        """
+        threshold = self.latency.percentile(self.llm_provider, self.model, operation, self.settings.llm_hedge_percentile,
+                                            self.settings.llm_hedge_min_samples)
+        if threshold is None:
+            return self, await self._agenerate(prompt, max_tokens, temperature, prefix, operation, schema=schema)
+        delay = max(threshold, self.settings.llm_hedge_min_delay_seconds)
+        hedge_client = self._peer(self.settings.llm_hedge_target) if self.settings.llm_hedge_target else self
+
+        def start_hedge() -> Optional[Awaitable[LLMResponse]]:
+            if hedge_client is None or not self.retry.budget(operation).withdraw():
+                return None  # Hedges are paid from the same budget as retries
+            logger.info(f"{self.llm_provider} {operation or 'call'} slower than {delay:.1f}s; hedging with "
+                        f"{hedge_client.llm_provider}:{hedge_client.model}")
+            return hedge_client._agenerate(prompt, max_tokens, temperature, prefix, operation, Counter(), schema)
+
+        result, hedge_won = await race_with_hedge(
+            self._agenerate(prompt, max_tokens, temperature, prefix, operation, schema=schema), start_hedge, delay
+        )
+        return (hedge_client if hedge_won else self), result
+
+    def _peer(self, spec: str) -> Optional["LLMClient"]:
+        """
+        A client for "provider" or "provider:model", sharing this client's cache, limiter, ledger,
+        retry state and latency history. None if the provider cannot be set up (e.g. no API key).
+        """
+        if spec not in self._peers:
+            provider, _, model = spec.partition(":")
+            try:
+                peer = LLMClient(provider)
+            except ValueError as e:
+                logger.warning(f"Fallback '{spec}' unavailable: {e}")
+                self._peers[spec] = None
+                return None
+            if model:
+                peer.set_model(model)
+            peer.cache, peer.rate_limiter, peer.ledger = self.cache, self.rate_limiter, self.ledger
+            peer.retry, peer.latency, peer._peers = self.retry, self.latency, self._peers
+            peer.router, peer.route_calls = self.router, False
+            self._peers[spec] = peer
+        peer = self._peers[spec]
+        return peer.for_agent(self.agent_name, self.use_cache) if peer and self.agent_name else peer
+
+    def _fallback_clients(self) -> Iterator["LLMClient"]:
+        """Clients for settings.llm_fallbacks in order, skipping this client's own provider and model."""
+        for spec in self.settings.llm_fallbacks:
+            peer = self._peer(spec)
+            if peer is not None and (peer.llm_provider, peer.model) != (self.llm_provider, self.model):
+                yield peer
+
+    def _failover(self, error: LLMError, prompt: str, max_tokens: int, temperature: float, prefix: str,
+                  operation: Optional[str], started: float,
+                  schema: Optional[OutputSchema] = None) -> Tuple["LLMClient", LLMResponse]:
+        """Tries the fallback providers in order after the selected one failed; re-raises `error` if none answers."""
+        if error.kind not in FAILOVER_ERROR_KINDS:
+            raise error
+        for peer in self._fallback_clients():
+            try:
+                result = peer._generate(prompt, max_tokens, temperature, prefix, operation, schema=schema)
+            except LLMError as peer_error:
+                peer._record_usage(operation, LLMResponse(retries=peer_error.retries), started, error=peer_error)
+                continue
+            logger.warning(f"{self.llm_provider} unavailable ({error.kind}); answered by {peer.llm_provider}:{peer.model}")
+            return peer, result
+        raise error
+
+    async def _afailover(self, error: LLMError, prompt: str, max_tokens: int, temperature: float, prefix: str,
+                         operation: Optional[str], started: float,
+                         schema: Optional[OutputSchema] = None) -> Tuple["LLMClient", LLMResponse]:
+        """Async counterpart of _failover."""
+        if error.kind not in FAILOVER_ERROR_KINDS:
+            raise error
+        for peer in self._fallback_clients():
+            try:
+                result = await peer._agenerate(prompt, max_tokens, temperature, prefix, operation, schema=schema)
+            except LLMError as peer_error:
+                peer._record_usage(operation, LLMResponse(retries=peer_error.retries), started, error=peer_error)
+                continue
+            logger.warning(f"{self.llm_provider} unavailable ({error.kind}); answered by {peer.llm_provider}:{peer.model}")
+            return peer, result
+        raise error
+
+    async def _acall_provider(self, prompt: str, max_tokens: int, temperature: float, prefix: str = "",
+                              schema: Optional[OutputSchema] = None) -> LLMResponse:
+        """Async provider call once the prompt is final."""
+        limiter = self._limiter()
+        await limiter.aacquire(self._estimate_request_tokens(prompt, max_tokens, prefix))
+        headers = None
+        success = False
+        try:
+            client = self._get_async_client()
+
+            if self.llm_provider == "openai" or self.llm_provider == "openrouter":
+                raw = await client.chat.completions.with_raw_response.create(
+                    model=self.model,
+                    messages=self._chat_messages(prompt, prefix),
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    **self._openai_kwargs(schema),
+                )
+                headers = raw.headers
+                response = raw.parse()
+                choice = response.choices[0]
+                text = check_completion(choice.message.content, choice.finish_reason, self.llm_provider)
+                result = LLMResponse(self._postprocess(text), *extract_usage(response))
+
+            elif self.llm_provider == "claude":
+                raw = await client.messages.with_raw_response.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    messages=[{"role": "user", "content": self.user_content(prompt, prefix)}],
+                    **(schema.claude_tool_kwargs() if schema else {}),
+                )
+                headers = raw.headers
+                response = raw.parse()
+                text = self._claude_text(response)
+                result = LLMResponse(check_completion(text, response.stop_reason, self.llm_provider).strip(),
+                                     *extract_usage(response))
+
+            elif self.llm_provider == "google_ai_studio":
+                model = client.GenerativeModel(model_name=self.model)
+                response = await model.generate_content_async(
+                    join_prompt(prompt, prefix), generation_config=schema.gemini_generation_config() if schema else None
+                )
+                result = LLMResponse(check_completion(response.text, provider=self.llm_provider).strip(),
+                                     *extract_usage(response))
+
+            elif self.llm_provider in CHAT_COMPLETION_URLS:
+                url, request_headers, data = self._http_request(join_prompt(prompt, prefix), max_tokens, temperature, schema)
+                response = await client.post(url, headers=request_headers, json=data)
+                headers = response.headers
+                response.raise_for_status()
+                body = response.json()
+                choice = body["choices"][0]
+                text = check_completion(choice["message"]["content"], choice.get("finish_reason"), self.llm_provider)
+                result = LLMResponse(text.strip(), *extract_usage(body))
+
+            elif self.llm_provider == "mock":
+                body = await client.acomplete(self._mock_prompt(prompt, prefix, schema), max_tokens, json_mode=bool(schema))
+                result = LLMResponse(check_completion(body["text"], provider=self.llm_provider), *extract_usage(body))
+
+            else:
+                raise ValueError(f"Unsupported LLM provider: {self.llm_provider}")
+
+            if schema and self.enforces_schema():
+                self._check_structured(result.text)
+            success = True
+            return result
+
+        except LLMError:
+            raise
+        except Exception as e:
+            raise self._classify(e, limiter) from e
+        finally:
+            limiter.release(success, headers)
+
+    def generate_stream(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7, language: str = "English",
+                        use_cache: Optional[bool] = None, operation: Optional[str] = None, prefix: str = "") -> Iterator[str]:
+        """
+        Yields the response text in chunks as the provider streams it.
+        A cached response is yielded in one piece. If the stream fails before any text
+        arrives and the error is retryable, falls back to a regular (retried) call; a failure
+        mid-stream raises, since the text already yielded cannot be taken back.
+        With hedging enabled the call goes through generate_content and arrives in one piece,
+        since a stream cannot be raced against a duplicate.
+        """
+        client, max_tokens = self._route(operation, max_tokens)
+        if client is not self:
+            yield from client.generate_stream(prompt, max_tokens, temperature, language, use_cache, operation, prefix)
+            return
+        if self.settings.llm_hedge_enabled:
+            yield self.generate_content(prompt, max_tokens, temperature, language, use_cache, operation, prefix)
+            return
+
+        prompt = self._prepare_prompt(prompt, language)
+        started = time.perf_counter()
+        max_tokens = self._fit_request(prompt, max_tokens, prefix, operation, started)
+        cache_key = self._cache_key(prompt, max_tokens, temperature, use_cache, prefix)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._record_usage(operation, LLMResponse(cached), started, cache_hit=True)
+                yield cached
+                return
+
+        breaker = self.retry.breaker(self.llm_provider)
+        budget = self.retry.budget(operation)
+        budget.record_request()
+        client = self
+        result = LLMResponse()
+        parts: List[str] = []
+        probe = False
+        try:
+            probe = breaker.before_call()
+            for chunk in self._stream(prompt, max_tokens, temperature, result, prefix):
+                if chunk:
+                    parts.append(chunk)
+                    yield chunk
+            if not "".join(parts).strip():
+                raise MalformedOutputError("Empty streamed completion", provider=self.llm_provider)
+        except LLMError as e:
+            if parts:
+                breaker.record_failure(e)
+                self._record_usage(operation, LLMResponse(retries=e.retries), started, error=e)
+                raise
+            retries: Counter = Counter()
+            delay = self._retry_delay(e, retries, budget)
+            try:
+                if delay is None:
+                    raise e
+                time.sleep(delay)
+                result = self._generate(prompt, max_tokens, temperature, prefix, operation, retries)
+            except LLMError as final_error:
+                self._record_usage(operation, LLMResponse(retries=final_error.retries), started, error=final_error)
+                client, result = self._failover(final_error, prompt, max_tokens, temperature, prefix, operation, started)
+            parts.append(result.text)
+            yield result.text
+        except BaseException:
+            if probe:  # The consumer stopped reading (or the call was interrupted) before an outcome
+                breaker.release_probe()
+            raise
+        else:
+            breaker.record_success()
+
+        result.text = "".join(parts).strip()
+        client._record_usage(operation, result, started)
+        if cache_key:
+            self.cache.put(cache_key, result.text, self.llm_provider, self.model)
+
+    def _stream(self, prompt: str, max_tokens: int, temperature: float, result: LLMResponse,
+                prefix: str = "") -> Iterator[str]:
+        """Streaming call, holding a rate-limiter slot for the whole stream."""
+        limiter = self._limiter()
+        limiter.acquire(self._estimate_request_tokens(prompt, max_tokens, prefix))
+        success = False
+        try:
+            yield from self._provider_stream(prompt, max_tokens, temperature, result, prefix)
+            success = True
+        except LLMError:
+            raise
+        except Exception as e:
+            raise self._classify(e, limiter) from e
+        finally:
+            limiter.release(success)
+
+    def _provider_stream(self, prompt: str, max_tokens: int, temperature: float, result: LLMResponse,
+                         prefix: str = "") -> Iterator[str]:
+        """Provider-specific streaming call. Token usage, when reported, is stored on `result`."""
+        if self.llm_provider == "openai" or self.llm_provider == "openrouter":
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._chat_messages(prompt, prefix),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    result.prompt_tokens, result.completion_tokens, result.cached_tokens = extract_usage(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+        elif self.llm_provider == "claude":
+            with self.client.messages.stream(
+                model=self.model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                messages=[{"role": "user", "content": self.user_content(prompt, prefix)}]
+            ) as stream:
+                for text in stream.text_stream:
+                    yield text
+                result.prompt_tokens, result.completion_tokens, result.cached_tokens = extract_usage(stream.get_final_message())
+
+        elif self.llm_provider == "google_ai_studio":
+            model = self.client.GenerativeModel(model_name=self.model)
+            for chunk in model.generate_content(join_prompt(prompt, prefix), stream=True):
+                if getattr(chunk, "usage_metadata", None):
+                    result.prompt_tokens, result.completion_tokens, result.cached_tokens = extract_usage(chunk)
+                yield chunk.text
+
+        elif self.llm_provider in CHAT_COMPLETION_URLS:
+            url, headers, data = self._http_request(join_prompt(prompt, prefix), max_tokens, temperature)
+            data["stream"] = True
+            with requests.post(url, headers=headers, json=data, timeout=120, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+                    if not line or not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    event = json.loads(payload)
+                    if event.get("usage"):
+                        result.prompt_tokens, result.completion_tokens, result.cached_tokens = extract_usage(event)
+                    choices = event.get("choices") or [{}]
+                    delta = choices[0].get("delta", {})
+                    if delta.get("content"):
+                        yield delta["content"]
+
+        elif self.llm_provider == "mock":
+            yield from self.client.stream(join_prompt(prompt, prefix), max_tokens, result)
+
+    def generate_content_with_json_repair(self, original_prompt: str, max_tokens:int = 2000, temperature:float=0.7,
+                                          use_cache: Optional[bool] = None, operation: Optional[str] = None) -> str:
+        """
+        Generates content that must contain JSON. A response that not even the local lenient parser
+        (file_utils.parse_json_lenient) can read gets one low-temperature repair call; if that fails
+        too, raises MalformedOutputError.
+        Provider errors are retried inside generate_content, so at most two calls are billed per attempt.
+        """
+        response_text = self.generate_content(original_prompt, max_tokens, temperature, use_cache=use_cache, operation=operation)
+        if extract_json_from_markdown(response_text) is not None:
+            return response_text # Return the original markdown
+        repaired_response = self.generate_content(self._json_repair_prompt(response_text), max_tokens=max_tokens,
+                                                  temperature=0.2, operation="json_repair") #Low temp for corrections
+        if extract_json_from_markdown(repaired_response) is not None:
+            return repaired_response
+        raise MalformedOutputError("Response is not valid JSON, even after repair", provider=self.llm_provider)
+
+    async def agenerate_content_with_json_repair(self, original_prompt: str, max_tokens: int = 2000, temperature: float = 0.7,
+                                                 use_cache: Optional[bool] = None, operation: Optional[str] = None) -> str:
+        """Async counterpart of generate_content_with_json_repair."""
+        response_text = await self.agenerate_content(original_prompt, max_tokens, temperature, use_cache=use_cache,
+                                                     operation=operation)
+        if extract_json_from_markdown(response_text) is not None:
+            return response_text
+        repaired_response = await self.agenerate_content(self._json_repair_prompt(response_text), max_tokens=max_tokens,
+                                                         temperature=0.2, operation="json_repair")
+        if extract_json_from_markdown(repaired_response) is not None:
+            return repaired_response
+        raise MalformedOutputError("Response is not valid JSON, even after repair", provider=self.llm_provider)
+
+    def generate_structured(self, prompt: str, schema: OutputSchema, max_tokens: int = 2000, temperature: float = 0.7,
+                            language: str = "English", use_cache: Optional[bool] = None,
+                            operation: Optional[str] = None) -> Any:
+        """
+        Generates JSON of the shape `schema` describes (see utils/structured_output.py) and returns it parsed.
+        Providers that enforce schemas answer in that shape; other replies are parsed leniently
+        (file_utils.parse_json_lenient) and repaired with one extra call only if that fails.
+        Raises MalformedOutputError when no JSON can be recovered.
+        """
+        text = self.generate_content(prompt, max_tokens, temperature, language, use_cache, operation, schema=schema)
+        data = parse_json_lenient(text)
+        if data is None:
+            repaired = self.generate_content(self._json_repair_prompt(text), max_tokens=max_tokens, temperature=0.2,
+                                             operation="json_repair")
+            data = parse_json_lenient(repaired)
+        if data is None:
+            raise MalformedOutputError(f"Response is not valid {schema.name} JSON, even after repair",
+                                       provider=self.llm_provider)
+        return schema.unwrap(data)
+
+    async def agenerate_structured(self, prompt: str, schema: OutputSchema, max_tokens: int = 2000,
+                                   temperature: float = 0.7, language: str = "English",
+                                   use_cache: Optional[bool] = None, operation: Optional[str] = None) -> Any:
+        """Async counterpart of generate_structured."""
+        text = await self.agenerate_content(prompt, max_tokens, temperature, language, use_cache, operation, schema=schema)
+        data = parse_json_lenient(text)
+        if data is None:
+            repaired = await self.agenerate_content(self._json_repair_prompt(text), max_tokens=max_tokens,
+                                                    temperature=0.2, operation="json_repair")
+            data = parse_json_lenient(repaired)
+        if data is None:
+            raise MalformedOutputError(f"Response is not valid {schema.name} JSON, even after repair",
+                                       provider=self.llm_provider)
+        return schema.unwrap(data)
+
+    def _json_repair_prompt(self, response_text: str) -> str:
+        return f"You are a helpful AI that only returns valid JSON.  Fix the following broken JSON:\n\n```json\n{response_text}\n```"
+
+    def generate_many(self, prompts: List[Union[str, Dict[str, Any]]], max_concurrency: Optional[int] = None) -> List[str]:
+        """
+        Generates several independent prompts concurrently and returns the results in input order.
+
+        Each request is either a prompt string or a dict of keyword arguments for agenerate_content.
+        At most `max_concurrency` requests (default: settings.llm_max_concurrency) are in flight at once.
+        """
+        limit = max_concurrency or self.settings.llm_max_concurrency
+        coros = [
+            self.agenerate_content(request) if isinstance(request, str) else self.agenerate_content(**request)
+            for request in prompts
+        ]
+        return run_async(gather_with_concurrency(coros, limit))
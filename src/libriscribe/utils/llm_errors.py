@@ -0,0 +1,158 @@
+# src/libriscribe/utils/llm_errors.py
+"""
+Error taxonomy for LLM calls.
+
+Every provider failure is turned into one LLMError subclass by classify_error(), so
+retry policy, retry budgets and the circuit breaker can reason about *why* a call
+failed instead of every SDK's own exception types:
+
+    rate_limited      HTTP 429                          retried after the limiter's back-off
+    transient         5xx, overloaded, timeouts, resets  retried with jittered exponential back-off
+    malformed_output  empty, truncated or unparsable     retried once
+    content_filtered  refused by a safety filter         not retried
+    auth              bad key, no access, no quota       not retried; opens the provider's circuit
+    invalid_request   any other 4xx                      not retried
+    context_length    prompt longer than the model's window  not retried; split the input instead
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+import anthropic
+import httpx
+import openai
+import requests
+
+from libriscribe.utils.rate_limiter import parse_retry_after, response_headers
+
+# Finish/stop reasons meaning the provider withheld the completion
+FILTERED_FINISH_REASONS = {"content_filter", "refusal", "safety", "blocklist", "prohibited_content"}
+_FILTER_MARKERS = ("content_filter", "content filter", "content policy", "content management policy", "safety", "blocked")
+_CONTEXT_MARKERS = ("context_length_exceeded", "maximum context length", "prompt is too long", "context window",
+                    "too many tokens", "exceeds the maximum number of tokens")
+_QUOTA_MARKERS = ("insufficient_quota", "exceeded your current quota", "credit balance is too low")
+
+
+class LLMError(Exception):
+    """Base class for classified LLM call failures."""
+
+    kind = "unknown"
+    fatal = False  # The provider is unusable; stop the run instead of skipping this request
+    trips_breaker = False  # Counts towards opening the provider's circuit
+
+    def __init__(self, message: str, provider: Optional[str] = None, status_code: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retries = 0  # Retries spent before giving up, set by LLMClient
+
+
+class RateLimitedError(LLMError):
+    """HTTP 429; carries the server's requested wait, if any."""
+    kind = "rate_limited"
+
+
+class TransientError(LLMError):
+    """Server errors, overload, timeouts and dropped connections."""
+    kind = "transient"
+    trips_breaker = True
+
+
+class MalformedOutputError(LLMError):
+    """The provider answered, but with nothing usable (empty, cut off or not the requested format)."""
+    kind = "malformed_output"
+
+
+class ContentFilteredError(LLMError):
+    """The prompt or completion was blocked by the provider's safety filter."""
+    kind = "content_filtered"
+
+
+class AuthError(LLMError):
+    """Missing or invalid API key, no access to the model, or exhausted quota."""
+    kind = "auth"
+    fatal = True
+    trips_breaker = True
+
+
+class InvalidRequestError(LLMError):
+    """Any other client error (bad parameters, context too long, unknown model)."""
+    kind = "invalid_request"
+
+
+class ContextLengthError(InvalidRequestError):
+    """The prompt does not fit the model's context window; raised before sending when the registry says so."""
+    kind = "context_length"
+
+
+class CircuitOpenError(LLMError):
+    """The provider's circuit breaker is open; the call was not attempted."""
+    kind = "circuit_open"
+    fatal = True
+
+
+class CircuitHalfOpenError(LLMError):
+    """Another call is probing the provider's half-open circuit; wait `retry_after` and try again."""
+    kind = "circuit_half_open"
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status code of an SDK or HTTP exception, if it has one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)  # google.api_core exceptions
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error: BaseException, provider: Optional[str] = None) -> LLMError:
+    """Maps any exception raised while calling a provider onto the taxonomy."""
+    if isinstance(error, LLMError):
+        return error
+    status = error_status(error)
+    text = str(error).lower()
+    details = dict(provider=provider, status_code=status, retry_after=parse_retry_after(response_headers(error)))
+    message = f"{type(error).__name__}: {error}"
+
+    if any(marker in text for marker in _QUOTA_MARKERS):
+        return AuthError(message, **details)  # Out of credit is a 429/400 that no retry will fix
+    if status == 429:
+        return RateLimitedError(message, **details)
+    if status in (401, 403):
+        return AuthError(message, **details)
+    if any(marker in text for marker in _FILTER_MARKERS) and (status is None or 400 <= status < 500):
+        return ContentFilteredError(message, **details)
+    if status is not None and (status >= 500 or status in (408, 409)):  # 529 is Anthropic's "overloaded"
+        return TransientError(message, **details)
+    if status is not None and 400 <= status < 500:
+        if any(marker in text for marker in _CONTEXT_MARKERS):
+            return ContextLengthError(message, **details)
+        return InvalidRequestError(message, **details)
+    if isinstance(error, (
+        openai.APIConnectionError,  # Includes APITimeoutError
+        anthropic.APIConnectionError,
+        requests.ConnectionError,
+        requests.Timeout,
+        httpx.TransportError,
+        ConnectionError,
+        TimeoutError,
+        asyncio.TimeoutError,
+    )):
+        return TransientError(message, **details)
+    if isinstance(error, (json.JSONDecodeError, KeyError, IndexError, ValueError)):
+        # Response bodies without the expected fields, or Gemini's .text on an empty candidate
+        return MalformedOutputError(message, **details)
+    return LLMError(message, **details)
+
+
+def check_completion(text: Optional[str], finish_reason: Optional[str] = None, provider: Optional[str] = None) -> str:
+    """Raises ContentFilteredError or MalformedOutputError unless the completion is usable."""
+    if finish_reason and str(finish_reason).lower() in FILTERED_FINISH_REASONS:
+        raise ContentFilteredError(f"Completion withheld by the provider (finish reason: {finish_reason})", provider=provider)
+    if not text or not text.strip():
+        raise MalformedOutputError(f"Empty completion (finish reason: {finish_reason})", provider=provider)
+    return text
@@ -0,0 +1,298 @@
+# src/libriscribe/utils/mock_llm.py
+"""
+Deterministic in-process LLM provider for offline runs and benchmarks.
+
+Select it with provider "mock" (MOCK_LLM_ENABLED=true adds it to the provider menu).
+It recognises each agent's prompt and answers in the shape that agent parses: fenced
+JSON for concepts, characters, worldbuilding and fact checks (bare JSON in JSON mode); Markdown for outlines,
+scene outlines, scenes, reviews and edits. The same prompt always gets the same answer.
+
+Latency (time to first token, drawn from a configurable distribution), generation
+speed and injected failures (HTTP 429 or 500) come from the mock_* Settings, so the
+orchestration around the model can be profiled without API keys.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+from libriscribe.knowledge_base import Worldbuilding
+
+_WORDS = (
+    "the light fell across the river and she waited while the city hummed below old stone towers "
+    "a door opened somewhere in the dark he remembered the promise they had made years ago "
+    "rain gathered on the glass and the lantern flickered as footsteps crossed the empty square "
+    "nobody spoke for a long moment then the wind turned and carried the smell of smoke"
+).split()
+_NAMES = ["Mara Quill", "Tobias Renn", "Ilse Varga", "Oren Hale", "Juno Ashby", "Felix Marrow", "Sade Okoro", "Wren Calder"]
+_CHUNK_WORDS = 8  # Words per streamed chunk
+
+
+class MockProviderError(Exception):
+    """Injected provider failure; looks like an SDK HTTP error to the rest of LLMClient."""
+
+    def __init__(self, status_code: int, retry_after: float = 0.0):
+        super().__init__(f"Mock provider error {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers={"retry-after": str(retry_after)})
+
+
+@dataclass
+class MockReply:
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+    first_token_s: float
+    generation_s: float
+    failure: Optional[int] = None  # HTTP status to raise instead of answering
+
+
+class MockLLM:
+    """Answers prompts with deterministic, well-formed text after simulated latency."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # --- Provider surface used by LLMClient ---
+
+    def complete(self, prompt: str, max_tokens: int, json_mode: bool = False) -> Dict[str, Any]:
+        """
+        Blocking call; returns an OpenAI-style body: {"text": ..., "usage": {...}}.
+        json_mode=True answers JSON prompts with bare JSON instead of a markdown fence.
+        """
+        reply = self._plan(prompt, max_tokens, json_mode)
+        time.sleep(reply.first_token_s)
+        self._raise_injected(reply)
+        time.sleep(reply.generation_s)
+        return self._result(reply)
+
+    async def acomplete(self, prompt: str, max_tokens: int, json_mode: bool = False) -> Dict[str, Any]:
+        reply = self._plan(prompt, max_tokens, json_mode)
+        await asyncio.sleep(reply.first_token_s)
+        self._raise_injected(reply)
+        await asyncio.sleep(reply.generation_s)
+        return self._result(reply)
+
+    def stream(self, prompt: str, max_tokens: int, result: Any) -> Iterator[str]:
+        """Yields the reply a few words at a time at the configured token rate; sets token counts on `result`."""
+        reply = self._plan(prompt, max_tokens)
+        time.sleep(reply.first_token_s)
+        self._raise_injected(reply)
+        words = reply.text.split(" ")
+        chunks = [" ".join(words[i:i + _CHUNK_WORDS]) for i in range(0, len(words), _CHUNK_WORDS)]
+        delay = reply.generation_s / max(len(chunks), 1)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(delay)
+            yield chunk if index == len(chunks) - 1 else chunk + " "
+        result.prompt_tokens, result.completion_tokens = reply.prompt_tokens, reply.completion_tokens
+
+    # --- Simulation ---
+
+    def _plan(self, prompt: str, max_tokens: int, json_mode: bool = False) -> MockReply:
+        digest = hashlib.sha256(f"{self.settings.mock_seed}:{prompt}".encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+        # Content depends only on the prompt; timing and failures also on the attempt, so retries can succeed
+        text = self._respond(prompt, max_tokens, random.Random(digest))
+        if json_mode and text.startswith("```json"):
+            text = _between(text, "```json\n", "\n```")
+        rng = random.Random(f"{digest}:{attempt}")
+
+        failure = None
+        roll = rng.random()
+        if roll < self.settings.mock_rate_limit_rate:
+            failure = 429
+        elif roll < self.settings.mock_rate_limit_rate + self.settings.mock_failure_rate:
+            failure = 500
+
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = min(max_tokens, max(1, len(text) // 4))
+        rate = self.settings.mock_tokens_per_second
+        return MockReply(
+            text=text,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            first_token_s=self._latency(rng),
+            generation_s=completion_tokens / rate if rate > 0 else 0.0,
+            failure=failure,
+        )
+
+    def _latency(self, rng: random.Random) -> float:
+        """Time to first token in seconds, drawn from the configured distribution around mock_latency_ms."""
+        median = self.settings.mock_latency_ms / 1000
+        distribution = self.settings.mock_latency_distribution
+        if median <= 0 or distribution == "fixed":
+            return max(0.0, median)
+        if distribution == "uniform":
+            return rng.uniform(0, 2 * median)
+        if distribution == "exponential":
+            return rng.expovariate(math.log(2) / median)
+        return rng.lognormvariate(math.log(median), self.settings.mock_latency_sigma)  # lognormal (default)
+
+    def _raise_injected(self, reply: MockReply) -> None:
+        if reply.failure:
+            raise MockProviderError(reply.failure, retry_after=self.settings.mock_latency_ms / 1000)
+
+    def _result(self, reply: MockReply) -> Dict[str, Any]:
+        return {"text": reply.text, "usage": {"prompt_tokens": reply.prompt_tokens, "completion_tokens": reply.completion_tokens}}
+
+    # --- Canned responses, one per agent prompt ---
+
+    def _respond(self, prompt: str, max_tokens: int, rng: random.Random) -> str:
+        if prompt.lstrip().startswith("Summarize Chapters"):
+            return _paragraph(rng, 4)
+        if prompt.lstrip().startswith("Summarize Chapter"):
+            scenes = max(1, _between(prompt, "Chapter text:\n---\n", "\n---").count("**Scene"))
+            return _fenced({"scenes": [_sentence(rng, 16) for _ in range(scenes)], "summary": _paragraph(rng, 3)})
+        if "Output the claims as a JSON array" in prompt:
+            return _fenced([_sentence(rng, 10) for _ in range(3)])
+        if "Fact-check each of the following claims" in prompt:
+            numbers = re.findall(r"^\s*\[(\d+)\]", prompt, re.MULTILINE)
+            return _fenced({"claim_checks": [{"index": int(number), "result": "Unverifiable",
+                                              "explanation": _sentence(rng, 16), "sources": []} for number in numbers]})
+        if "Fact-check the following claim" in prompt:
+            return _fenced({"result": "Unverifiable", "explanation": _sentence(rng, 16), "sources": []})
+        if "plagiarism detection expert" in prompt:
+            return _fenced([])
+        if "Fix the following broken JSON" in prompt:
+            return _fenced({})
+        if "KEY questions" in prompt:
+            return _fenced({f"q{i}": _sentence(rng, 8).rstrip(".") + "?" for i in range(1, 6)})
+        if "Critique the following book concept" in prompt:
+            return "**Title:** Evocative.\n\n**Logline:** Clear.\n\n**Description:** " + _paragraph(rng, 3)
+        if "book concept" in prompt:
+            return _fenced({"title": _title(rng), "logline": _sentence(rng, 18), "description": _paragraph(rng, 6)})
+        if "character profiles" in prompt:
+            return _fenced(self._characters(prompt, rng))
+        if "worldbuilding information" in prompt:
+            return _fenced({field: _paragraph(rng, 3) for field in Worldbuilding.model_fields})
+        if "Create a structured outline" in prompt:
+            return self._outline(prompt, rng)
+        if "outline for the scenes" in prompt:
+            return self._scene_outline(rng)
+        if "Write Scene" in prompt:
+            return self._scene(prompt, max_tokens, rng)
+        if "Return only your changes" in prompt:
+            return _fenced({"edits": self._edits(prompt, rng)})
+        if "expert editor" in prompt:
+            chapter = _between(prompt, "Here is the chapter content:\n", "\n\nA content reviewer")
+            return "Revised chapter:\n\n```markdown\n" + chapter.strip() + "\n```"
+        if "You are a style editor" in prompt:
+            chapter = _between(prompt, "Chapter Excerpt:\n        ---\n", "\n        ---")
+            return "Tightened the prose.\n\n```markdown\n" + chapter.strip() + "\n```"
+        if "content reviewer" in prompt:
+            return "\n\n".join(f"## {heading}\n{_sentence(rng, 14)}" for heading in
+                               ("Consistency", "Clarity", "Plot Holes", "Redundancy", "Flow and Transitions", "Engagement"))
+        if "Combine the provided chapters" in prompt:
+            return _between(prompt, "Chapters:\n", "\n\nInstructions:").strip()
+        return _paragraph(rng, max(1, min(max_tokens // 60, 8)))
+
+    def _edits(self, prompt: str, rng: random.Random) -> List[Dict[str, str]]:
+        """A couple of anchored edits on sentences of the text being edited."""
+        text = (_between(prompt, "Here is the chapter content:\n", "\n\nA content reviewer")
+                or _between(prompt, "Chapter Excerpt:\n        ---\n", "\n        ---"))
+        sentences = re.findall(r"[A-Z][^.!?\n*]{20,}[.!?]", text)
+        edits = []
+        for sentence in sorted(rng.sample(sentences, min(2, len(sentences))), key=text.find):
+            edits.append({"op": "replace", "anchor": sentence, "text": sentence.rstrip(".!?") + ", at last."})
+        if sentences:
+            edits.append({"op": "insert_after", "anchor": sentences[-1], "text": _sentence(rng, 8)})
+        return edits
+
+    def _characters(self, prompt: str, rng: random.Random) -> List[Dict[str, str]]:
+        match = re.search(r"number of main characters: (\d+)", prompt)
+        count = min(int(match.group(1)) if match else 3, len(_NAMES))
+        names = rng.sample(_NAMES, count)
+        return [
+            {
+                "name": name,
+                "age": str(rng.randint(18, 70)),
+                "physical description": _sentence(rng, 14),
+                "personality_traits": "Resourceful, Cautious, Determined",
+                "background": _sentence(rng, 20),
+                "motivations": _sentence(rng, 12),
+                "relationships": {other: _sentence(rng, 6) for other in names if other != name},
+                "role": "Protagonist" if index == 0 else "Supporting character",
+                "internal conflicts": _sentence(rng, 10),
+                "external conflicts": _sentence(rng, 10),
+                "character arc": _sentence(rng, 12),
+            }
+            for index, name in enumerate(names)
+        ]
+
+    def _outline(self, prompt: str, rng: random.Random) -> str:
+        limit = re.search(r"(?:EXACTLY|at most) (\d+) chapters", prompt)
+        count = min(self.settings.mock_chapters, int(limit.group(1))) if limit else self.settings.mock_chapters
+        lines = ["# Book Summary", _paragraph(rng, 4), "", "# Chapter List", f"{count} chapters", "", "# Chapter Details", ""]
+        for number in range(1, count + 1):
+            lines += [
+                f"## Chapter {number}: {_title(rng)}",
+                "### Summary",
+                _paragraph(rng, 3),
+                "",
+                "### Key Events",
+                *[f"- {_sentence(rng, 8)}" for _ in range(3)],
+                "",
+            ]
+        return "\n".join(lines)
+
+    def _scene_outline(self, rng: random.Random) -> str:
+        scenes = []
+        for number in range(1, self.settings.mock_scenes_per_chapter + 1):
+            scenes.append(
+                f"Scene {number}:\n"
+                f"    * Summary: {_sentence(rng, 12)}\n"
+                f"    * Characters: {', '.join(rng.sample(_NAMES, 2))}\n"
+                f"    * Setting: {_sentence(rng, 5).rstrip('.')}\n"
+                f"    * Goal: {_sentence(rng, 8)}\n"
+                f"    * Emotional Beat: {rng.choice(['Tension', 'Hope', 'Dread', 'Relief', 'Wonder'])}"
+            )
+        return "\n\n".join(scenes)
+
+    def _scene(self, prompt: str, max_tokens: int, rng: random.Random) -> str:
+        title = re.search(r"Begin the scene with the title: \*\*(.+?)\*\*", prompt)
+        # Roughly three quarters of the token budget, at about 0.75 words per token
+        words = int(max_tokens * 0.75 * 0.75)
+        paragraphs = []
+        while sum(len(p.split()) for p in paragraphs) < words:
+            paragraphs.append(_paragraph(rng, 5))
+        body = "\n\n".join(paragraphs)
+        return f"**{title.group(1)}**\n\n{body}" if title else body
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    words = [rng.choice(_WORDS) for _ in range(length)]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng, rng.randint(8, 18)) for _ in range(sentences))
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS).capitalize() for _ in range(3))
+
+
+def _fenced(data) -> str:
+    return f"```json\n{json.dumps(data, indent=2)}\n```"
+
+
+def _between(text: str, start: str, end: str) -> str:
+    begin = text.find(start)
+    if begin == -1:
+        return ""
+    begin += len(start)
+    finish = text.find(end, begin)
+    return text[begin:finish if finish != -1 else len(text)]
@@ -0,0 +1,81 @@
+# src/libriscribe/utils/model_registry.py
+"""
+Model capability registry: context window, maximum output and pricing per model.
+
+LLMClient consults it to clamp max_tokens to what a model can return, to refuse prompts
+that cannot fit before they cost a 400 and a retry, and to price calls for the usage
+ledger. Models without an entry get a conservative guess for sizing work, but their
+requests are sent as asked; only the provider knows their real limits. Agents size their work with it (LLMClient.max_chunk_tokens) and split whatever
+does not fit into ordered chunks (see utils/chunking.py).
+
+Entries match by longest model-name prefix. LLM_MODEL_SPECS adds or overrides entries,
+e.g. LLM_MODEL_SPECS='{"my-finetune": {"context_window": 16000, "max_output_tokens": 4000}}'.
+"""
+
+import logging
+from dataclasses import dataclass, fields, replace
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    context_window: int  # Input plus output tokens
+    max_output_tokens: int
+    input_price: float = 0.0  # USD per million tokens
+    output_price: float = 0.0
+    cached_input_multiplier: float = 1.0  # Price factor for input served from the provider's prompt cache
+
+    def cost(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        """Estimated USD cost of a call. `cached_tokens` are part of `prompt_tokens`."""
+        cached_tokens = min(cached_tokens, prompt_tokens)
+        input_cost = (prompt_tokens - cached_tokens + cached_tokens * self.cached_input_multiplier) * self.input_price
+        return (input_cost + completion_tokens * self.output_price) / 1_000_000
+
+
+MODEL_SPECS: Dict[str, ModelSpec] = {
+    "gpt-4o-mini": ModelSpec(128_000, 16_384, 0.15, 0.60, 0.50),
+    "gpt-4o": ModelSpec(128_000, 16_384, 2.50, 10.00, 0.50),
+    "gpt-4.1-mini": ModelSpec(1_047_576, 32_768, 0.40, 1.60, 0.50),
+    "gpt-4.1": ModelSpec(1_047_576, 32_768, 2.00, 8.00, 0.50),
+    "claude-3-opus": ModelSpec(200_000, 4_096, 15.00, 75.00, 0.10),
+    "claude-3-5-sonnet": ModelSpec(200_000, 8_192, 3.00, 15.00, 0.10),
+    "claude-3-5-haiku": ModelSpec(200_000, 8_192, 0.80, 4.00, 0.10),
+    "claude-3-haiku": ModelSpec(200_000, 4_096, 0.25, 1.25, 0.10),
+    "gemini-1.5-pro": ModelSpec(2_097_152, 8_192, 1.25, 5.00, 0.25),
+    "gemini-1.5-flash": ModelSpec(1_048_576, 8_192, 0.075, 0.30, 0.25),
+    "deepseek": ModelSpec(64_000, 8_192, 0.27, 1.10, 0.10),
+    "mistral-medium": ModelSpec(128_000, 8_192, 0.40, 2.00),
+    "mistral-small": ModelSpec(32_000, 8_192, 0.10, 0.30),
+    "mistral-large": ModelSpec(128_000, 8_192, 2.00, 6.00),
+    "mock": ModelSpec(128_000, 16_384),
+}
+
+# Unknown models: small enough to be safe for anything current, and unpriced
+DEFAULT_MODEL_SPEC = ModelSpec(32_000, 4_096)
+
+
+def _base_name(model: str) -> str:
+    return model.split("/")[-1]  # OpenRouter names look like "anthropic/claude-3-haiku"
+
+
+def is_registered(model: str, overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> bool:
+    """Whether `model` has a registry entry or an LLM_MODEL_SPECS override, rather than DEFAULT_MODEL_SPEC's guess."""
+    name = _base_name(model)
+    return any(name.startswith(prefix) for prefix in [*MODEL_SPECS, *(overrides or {})])
+
+
+def model_spec(model: str, overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> ModelSpec:
+    """Capabilities of `model`, with any matching LLM_MODEL_SPECS overrides applied (longest prefix last)."""
+    name = _base_name(model)
+    matches = [prefix for prefix in MODEL_SPECS if name.startswith(prefix)]
+    spec = MODEL_SPECS[max(matches, key=len)] if matches else DEFAULT_MODEL_SPEC
+    allowed = {f.name for f in fields(ModelSpec)}
+    for prefix in sorted((p for p in (overrides or {}) if name.startswith(p)), key=len):
+        override = overrides[prefix]
+        unknown = set(override) - allowed
+        if unknown:
+            logger.warning(f"Ignoring unknown keys {sorted(unknown)} in model spec '{prefix}'")
+        spec = replace(spec, **{key: value for key, value in override.items() if key in allowed})
+    return spec
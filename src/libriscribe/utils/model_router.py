@@ -0,0 +1,118 @@
+# src/libriscribe/utils/model_router.py
+"""
+Tiered model routing by operation label.
+
+Each LLM call is labelled with an operation ("scene_write", "claim_check", ...). Operations
+map to tiers, and each tier names a provider, model and max_tokens cap:
+
+    premium   the project's selected model         prose: scenes, edits, concepts
+    standard  a mid-priced model of that provider  structure: outlines, reviews, characters
+    economy   the provider's cheapest model        extraction and checks: claims, plagiarism, JSON repair, summaries
+
+Tiers and routes come from these defaults, then Settings (LLM_TIERS, LLM_ROUTES), then the
+project's own llm_tiers / llm_routes. Unlisted operations use the premium tier.
+
+Routing is off unless LLM_ROUTING_ENABLED is set, since it sends calls to models (and
+prices) the user did not choose; until then every call goes to the selected model.
+"""
+
+import logging
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelTier:
+    name: str
+    provider: str = ""  # Empty: the project's selected provider
+    model: str = ""  # Empty: TIER_MODELS for that provider, else the selected model
+    max_tokens: Optional[int] = None  # Caps the max_tokens of calls routed to this tier
+
+
+DEFAULT_TIERS: Dict[str, ModelTier] = {
+    "premium": ModelTier("premium"),
+    "standard": ModelTier("standard"),
+    "economy": ModelTier("economy"),
+}
+
+# Model used for a tier when the tier names no model, by provider
+TIER_MODELS: Dict[str, Dict[str, str]] = {
+    "standard": {
+        "claude": "claude-3-5-sonnet-latest",
+        "mistral": "mistral-medium-latest",
+    },
+    "economy": {
+        "openai": "gpt-4o-mini",
+        "claude": "claude-3-5-haiku-latest",
+        "google_ai_studio": "gemini-1.5-flash-002",
+        "mistral": "mistral-small-latest",
+    },
+}
+
+DEFAULT_ROUTES: Dict[str, str] = {
+    "scene_write": "premium",
+    "edit": "premium",
+    "style_edit": "premium",
+    "concept": "premium",
+    "concept_refine": "premium",
+    "outline": "standard",
+    "scene_outline": "standard",
+    "characters": "standard",
+    "worldbuilding": "standard",
+    "review": "standard",
+    "concept_critique": "standard",
+    "research": "standard",
+    "formatting": "standard",
+    "claim_extraction": "economy",
+    "claim_check": "economy",
+    "plagiarism_check": "economy",
+    "questions": "economy",
+    "json_repair": "economy",
+    "chapter_summary": "economy",
+    "arc_summary": "economy",
+}
+
+
+def _merge_tiers(tiers: Dict[str, ModelTier], overrides: Dict[str, Dict[str, Any]]) -> Dict[str, ModelTier]:
+    allowed = {f.name for f in fields(ModelTier)} - {"name"}
+    merged = dict(tiers)
+    for name, override in overrides.items():
+        unknown = set(override) - allowed
+        if unknown:
+            logger.warning(f"Ignoring unknown keys {sorted(unknown)} in model tier '{name}'")
+        base = asdict(merged.get(name, ModelTier(name)))
+        base.update({key: value for key, value in override.items() if key in allowed})
+        merged[name] = ModelTier(**base)
+    return merged
+
+
+class ModelRouter:
+    """Resolves an operation label to its tier's provider, model and max_tokens cap."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.enabled = settings.llm_routing_enabled
+        self.configure()
+
+    def configure(self, tiers: Optional[Dict[str, Dict[str, Any]]] = None, routes: Optional[Dict[str, str]] = None) -> None:
+        """Applies project-level tier and route overrides on top of the defaults and Settings."""
+        self.tiers = _merge_tiers(_merge_tiers(DEFAULT_TIERS, self.settings.llm_tiers), tiers or {})
+        self.routes = {**DEFAULT_ROUTES, **self.settings.llm_routes, **(routes or {})}
+
+    def tier_for(self, operation: Optional[str]) -> ModelTier:
+        name = self.routes.get(operation or "", "premium")
+        if name not in self.tiers:
+            logger.warning(f"Operation '{operation}' routes to unknown tier '{name}'; using premium")
+            name = "premium"
+        return self.tiers[name]
+
+    def resolve(self, operation: Optional[str], provider: str, model: str) -> Tuple[ModelTier, str, str]:
+        """(tier, provider, model) for an operation, given the project's selected provider and model."""
+        tier = self.tier_for(operation)
+        tier_provider = tier.provider or provider
+        if tier.model:
+            return tier, tier_provider, tier.model
+        fallback = model if tier_provider == provider else ""  # "" means that provider's default model
+        return tier, tier_provider, TIER_MODELS.get(tier.name, {}).get(tier_provider, fallback)
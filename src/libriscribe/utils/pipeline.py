@@ -0,0 +1,127 @@
+# src/libriscribe/utils/pipeline.py
+"""
+A small thread pipeline: items flow through a chain of stages, one worker thread per stage.
+
+Stages are joined by bounded queues, so a fast stage can run at most `queue_size` items
+ahead of the stage after it instead of piling up work. The ProjectManagerAgent uses it to
+draft chapter N+1 while chapter N is still being reviewed, edited and style-edited.
+
+Each stage records how long it was busy, idle (waiting for input) and blocked (waiting
+for room downstream), which shows where the bottleneck is.
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # Sentinel that shuts a stage down once everything before it has passed
+
+
+@dataclass
+class StageStats:
+    """Throughput metrics for one stage."""
+    name: str
+    processed: int = 0
+    failed: int = 0
+    busy_s: float = 0.0
+    idle_s: float = 0.0  # Waiting for the previous stage
+    blocked_s: float = 0.0  # Waiting for room in the next stage's queue
+    max_queue_depth: int = 0
+
+    def utilization(self, wall_s: float) -> float:
+        return self.busy_s / wall_s if wall_s > 0 else 0.0
+
+    def per_minute(self, wall_s: float) -> float:
+        return self.processed / wall_s * 60 if wall_s > 0 else 0.0
+
+
+@dataclass
+class Stage:
+    """
+    One step of the pipeline. `run(item)` returning False (or raising) drops the item.
+    `wait_for(item)`, if given, blocks until the item's outside dependencies are met; that
+    time counts as idle rather than busy.
+    """
+    name: str
+    run: Callable[[Any], Optional[bool]]
+    wait_for: Optional[Callable[[Any], None]] = None
+
+
+class Pipeline:
+    """Runs items through the stages in order, with the stages working on different items at once."""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 2,
+                 on_finish: Optional[Callable[[Any, bool], None]] = None):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.on_finish = on_finish  # Called once per item when it leaves the pipeline, with success
+        self.stats = [StageStats(stage.name) for stage in stages]
+        self.wall_s = 0.0
+
+    def run(self, items: Iterable[Any]) -> List[StageStats]:
+        """Processes every item and returns the per-stage metrics once the last stage is done."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        workers = [
+            threading.Thread(target=self._work, args=(index, queues), name=f"pipeline-{stage.name}", daemon=True)
+            for index, stage in enumerate(self.stages)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for item in items:
+            queues[0].put(item)
+        queues[0].put(_DONE)
+        for worker in workers:
+            worker.join()
+        self.wall_s = time.perf_counter() - started
+        return self.stats
+
+    def _work(self, index: int, queues: List[queue.Queue]) -> None:
+        stage, stats = self.stages[index], self.stats[index]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(queues) else None
+        while True:
+            waiting = time.perf_counter()
+            item = inbox.get()
+            stats.idle_s += time.perf_counter() - waiting
+            if item is _DONE:
+                if outbox is not None:
+                    outbox.put(_DONE)
+                return
+            stats.max_queue_depth = max(stats.max_queue_depth, inbox.qsize() + 1)
+            if stage.wait_for:
+                waiting = time.perf_counter()
+                stage.wait_for(item)
+                stats.idle_s += time.perf_counter() - waiting
+
+            busy = time.perf_counter()
+            try:
+                ok = stage.run(item) is not False
+            except Exception as e:
+                logger.exception(f"Pipeline stage {stage.name} failed for {item!r}: {e}")
+                ok = False
+            stats.busy_s += time.perf_counter() - busy
+            if not ok:
+                stats.failed += 1
+                self._finish(item, False)
+                continue
+            stats.processed += 1
+
+            if outbox is None:
+                self._finish(item, True)
+                continue
+            blocked = time.perf_counter()
+            outbox.put(item)
+            stats.blocked_s += time.perf_counter() - blocked
+
+    def _finish(self, item: Any, ok: bool) -> None:
+        if self.on_finish:
+            try:
+                self.on_finish(item, ok)
+            except Exception as e:
+                logger.exception(f"Pipeline on_finish failed for {item!r}: {e}")
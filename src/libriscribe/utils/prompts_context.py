@@ -290,7 +290,8 @@ IMPORTANT: The content should be written entirely in {language}.
 """
 
 
-EDITOR_PROMPT = """
+# What to fix; EDITOR_PROMPT asks for the whole revised chapter, EDITOR_INSTRUCTIONS + EDIT_OPS_OUTPUT for edits only
+EDITOR_INSTRUCTIONS = """
 You are an expert editor tasked with refining and improving a chapter of a {genre} book titled "{book_title}".
 The book is written in {language}.
 
@@ -331,7 +332,9 @@ Ensure their actions, dialogue, and thoughts are consistent with their establish
 Grammar and Mechanics:
 
 Correct any grammatical errors, spelling mistakes, punctuation issues, and typos.
+"""
 
+EDITOR_PROMPT = EDITOR_INSTRUCTIONS + """
 Output:
 
 Provide the complete, revised chapter with all improvements incorporated. Use Markdown formatting.
@@ -342,6 +345,27 @@ Wrap the ENTIRE revised chapter in a Markdown code block, like this:
 IMPORTANT: The content should be written entirely in {language}.
 """
 
+# Appended to an editing prompt to get anchored edit operations (utils/edit_ops.py) instead of a full rewrite
+EDIT_OPS_OUTPUT = """
+Output:
+
+Do NOT return the whole text. Return only your changes, as JSON of this form:
+
+{{"edits": [
+  {{"op": "replace", "anchor": "exact text to change", "text": "its replacement"}},
+  {{"op": "insert_after", "anchor": "exact text to insert after", "text": "text to add"}},
+  {{"op": "delete", "anchor": "exact text to remove", "text": ""}}
+]}}
+
+- "anchor" must be copied EXACTLY from the text, character for character. Keep it short (a sentence
+  or a clause) but long enough to be unique.
+- To start a new paragraph with "insert_after", begin "text" with a blank line.
+- List the edits in the order they appear in the text, and do not let anchors overlap.
+- Leave out everything that does not need to change, and keep scene titles as they are.
+
+IMPORTANT: New text should be written entirely in {language}.
+"""
+
 
 RESEARCH_PROMPT = """
 Research the following topic and provide a comprehensive summary of your findings in {language}:
@@ -439,6 +463,31 @@ Important: Focus on showing rather than telling. Create an immersive experience
 IMPORTANT: The content should be written entirely in {language}.
 """
 
+CHAPTER_SUMMARY_PROMPT = """
+Summarize Chapter {chapter_number} of the {genre} book "{book_title}" for a writer continuing the story.
+The book is written in {language}; write the summaries in {language}.
+
+Return JSON with:
+- "scenes": one or two sentences per scene, in order, covering what happens, who is involved and what changes.
+- "summary": one paragraph for the whole chapter: the main events, decisions, revelations and where each major character ends up.
+
+Keep names, places and objects exactly as the text has them. Do not add interpretation.
+
+Chapter text:
+---
+{chapter_text}
+---
+"""
+
+ARC_SUMMARY_PROMPT = """
+Summarize Chapters {first_chapter}-{last_chapter} of the {genre} book "{book_title}" in one paragraph for a writer continuing the story.
+The book is written in {language}; write the summary in {language}.
+Keep the events that later chapters depend on: turning points, unresolved threads, and each major character's situation at the end.
+
+Chapter summaries:
+{chapter_summaries}
+"""
+
 def clean_worldbuilding_for_category(project_knowledge_base: ProjectKnowledgeBase):
     """
     Clean the worldbuilding object to only keep fields relevant to the project category.
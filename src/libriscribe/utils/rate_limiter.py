@@ -0,0 +1,208 @@
+# src/libriscribe/utils/rate_limiter.py
+"""
+Provider-aware rate limiting for LLM calls.
+
+Each provider/model pair gets a request bucket and a token bucket (requests/min and
+tokens/min), plus an in-flight window that grows additively on success and halves on
+a 429 (AIMD). Server hints - Retry-After and the x-ratelimit / anthropic-ratelimit
+headers - pause the limiter for exactly as long as the provider asks.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKOFF_SECONDS = 5.0
+_POLL_INTERVAL = 0.05
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parses reset durations such as "1s", "20ms", "6m0s" or "0.5" into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def _parse_reset(value: str) -> Optional[float]:
+    """Parses a reset header that is either a duration or an absolute timestamp."""
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            reset_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Returns how long the provider asked us to wait, from Retry-After or rate-limit reset headers."""
+    if not headers:
+        return None
+    lowered = {k.lower(): v for k, v in headers.items()}
+    if "retry-after-ms" in lowered:
+        try:
+            return float(lowered["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if "retry-after" in lowered:
+        seconds = _parse_reset(lowered["retry-after"])
+        if seconds is not None:
+            return seconds
+    for remaining_key, reset_key in (
+        ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+        ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+        ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+        ("anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-reset"),
+    ):
+        if lowered.get(remaining_key) == "0" and reset_key in lowered:
+            seconds = _parse_reset(lowered[reset_key])
+            if seconds is not None:
+                return seconds
+    return None
+
+
+def response_headers(error: BaseException) -> Optional[Mapping[str, str]]:
+    """Digs the HTTP response headers out of an SDK or HTTP exception, if it has any."""
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None)
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` units and returns how long the caller must wait for them to be covered."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        amount = min(amount, self.capacity)  # A single oversized request must still be admitted
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class ProviderLimiter:
+    """Request/token budgets and an AIMD concurrency window for one provider and model."""
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, max_in_flight: int = 8):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_in_flight = max(1, max_in_flight)
+        self.window = float(self.max_in_flight)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _try_enter(self) -> bool:
+        with self._lock:
+            if self.in_flight < max(1, int(self.window)) and time.monotonic() >= self.blocked_until:
+                self.in_flight += 1
+                return True
+            return False
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        with self._lock:
+            delay = 0.0
+            if self.request_bucket:
+                delay = max(delay, self.request_bucket.reserve(1))
+            if self.token_bucket:
+                delay = max(delay, self.token_bucket.reserve(estimated_tokens))
+            return delay
+
+    def acquire(self, estimated_tokens: int = 0) -> None:
+        """Blocks until a slot in the window and enough budget are available."""
+        while not self._try_enter():
+            time.sleep(_POLL_INTERVAL)
+        delay = self._reserve(estimated_tokens)
+        if delay > 0:
+            logger.debug(f"Rate limiter: waiting {delay:.1f}s for budget")
+            time.sleep(delay)
+
+    async def aacquire(self, estimated_tokens: int = 0) -> None:
+        """Async counterpart of acquire."""
+        while not self._try_enter():
+            await asyncio.sleep(_POLL_INTERVAL)
+        delay = self._reserve(estimated_tokens)
+        if delay > 0:
+            logger.debug(f"Rate limiter: waiting {delay:.1f}s for budget")
+            await asyncio.sleep(delay)
+
+    def release(self, success: bool = True, headers: Optional[Mapping[str, str]] = None) -> None:
+        """Frees the slot; successes widen the window by about one request per round trip."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if success:
+                self.window = min(float(self.max_in_flight), self.window + 1.0 / max(self.window, 1.0))
+            wait = parse_retry_after(headers)
+            if wait:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Halves the window and pauses new requests for the server-requested time."""
+        with self._lock:
+            self.window = max(1.0, self.window / 2)
+            wait = retry_after if retry_after is not None else DEFAULT_BACKOFF_SECONDS
+            self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+        logger.warning(f"Rate limited: window reduced to {self.window:.1f}, pausing {wait:.1f}s")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "window": round(self.window, 2),
+                "in_flight": self.in_flight,
+                "blocked_for": max(0.0, round(self.blocked_until - time.monotonic(), 2)),
+            }
+
+
+class RateLimiter:
+    """Registry of per-provider/model limiters configured from Settings."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _limits_for(self, provider: str, model: str) -> Dict[str, int]:
+        limits = {
+            "requests_per_minute": self.settings.llm_requests_per_minute,
+            "tokens_per_minute": self.settings.llm_tokens_per_minute,
+            "max_in_flight": self.settings.llm_max_in_flight,
+        }
+        overrides = self.settings.llm_rate_limits or {}
+        limits.update(overrides.get(provider, {}))
+        limits.update(overrides.get(f"{provider}:{model}", {}))
+        return limits
+
+    def get(self, provider: str, model: str) -> ProviderLimiter:
+        key = f"{provider}:{model}"
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = ProviderLimiter(**self._limits_for(provider, model))
+            return self._limiters[key]
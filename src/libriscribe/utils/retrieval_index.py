@@ -0,0 +1,246 @@
+# src/libriscribe/utils/retrieval_index.py
+"""
+A local BM25 index over the manuscript and the codex, for pulling early-book details into
+late chapters without sending whole chapters.
+
+Passages are scene-sized pieces of the written chapters (the revised file when there is
+one), the codex's facts and memories, and the worldbuilding fields. The index lives in the
+project's retrieval_index.json, grouped by source (one chapter, the codex, the
+worldbuilding) with a hash of each source's content, so refresh() only re-tokenizes the
+sources that changed. The inverted index itself is rebuilt in memory from the stored term
+counts, which is cheap.
+
+Scoring is Okapi BM25:
+    score(q, p) = sum over query terms t of
+                  idf(t) * tf(t, p) * (K1 + 1) / (tf(t, p) + K1 * (1 - B + B * len(p) / avg_len))
+    idf(t)      = ln(1 + (N - df(t) + 0.5) / (df(t) + 0.5))
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from libriscribe.codex import MasterCodex
+from libriscribe.knowledge_base import ProjectKnowledgeBase, Scene
+from libriscribe.utils.chunking import split_text
+from libriscribe.utils.context_manager import chapter_file
+from libriscribe.utils.file_utils import read_json_file, write_json_file
+from libriscribe.utils.token_counter import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE_NAME = "retrieval_index.json"
+INDEX_VERSION = 1
+PASSAGE_TOKENS = 250  # Scenes longer than this are split at paragraphs
+K1 = 1.5
+B = 0.75
+RETRIEVAL_HEADING = "--- RELEVANT EARLIER PASSAGES (keep consistent with them) ---"
+
+_CHAPTER_FILE = re.compile(r"^chapter_(\d+)(?:_revised)?\.md$")
+_SCENE_BREAK = re.compile(r"\n(?=(?:\*\*|#{3,}\s*)Scene\s+\d+)", re.IGNORECASE)
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from had has have he her hers him his i in into is it its
+me my no not of on or our she so than that the their them then there these they this to
+was we were what when where which while who will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words, minus stopwords and single characters."""
+    return [word for word in (match.lower() for match in _TOKEN.findall(text or ""))
+            if len(word) > 1 and word not in _STOPWORDS]
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Passage:
+    source: str  # "chapter:N", "codex" or "worldbuilding"
+    label: str  # Where it comes from, for the prompt (e.g. "Chapter 3, Scene 2")
+    chapter: int  # Chapter it belongs to or was established in; 0 for timeless entries
+    text: str
+    score: float = 0.0
+
+
+class RetrievalIndex:
+    """BM25 index over one project's passages, persisted and refreshed incrementally."""
+
+    def __init__(self, project_dir: Path):
+        self.project_dir = Path(project_dir)
+        self.path = self.project_dir / INDEX_FILE_NAME
+        self._lock = threading.Lock()
+        data = read_json_file(str(self.path)) if self.path.exists() else None
+        if not data or data.get("version") != INDEX_VERSION:
+            data = {"version": INDEX_VERSION, "sources": {}}
+        self._sources: Dict[str, Dict[str, Any]] = data["sources"]
+        self._build()
+
+    def refresh(self, kb: Optional[ProjectKnowledgeBase] = None) -> int:
+        """Re-indexes the sources whose content changed and drops vanished ones. Returns the number re-indexed."""
+        current = self._current_sources(kb)
+        changed = 0
+        with self._lock:
+            for source, (digest, make_passages) in current.items():
+                entry = self._sources.get(source)
+                if entry and entry.get("hash") == digest:
+                    continue
+                self._sources[source] = {"hash": digest, "passages": [self._entry(passage) for passage in make_passages()]}
+                changed += 1
+            for source in [source for source in self._sources if source not in current]:
+                del self._sources[source]
+                changed += 1
+            if changed:
+                self._build()
+                write_json_file(str(self.path), {"version": INDEX_VERSION, "sources": self._sources})
+        if changed:
+            logger.info(f"Retrieval index: {changed} source(s) re-indexed, {len(self._passages)} passages")
+        return changed
+
+    def search(self, query: str, k: int = 5, before_chapter: Optional[int] = None,
+               exclude_sources: Tuple[str, ...] = ()) -> List[Passage]:
+        """
+        The `k` best passages for `query`, best first. With `before_chapter`, only passages
+        from (or established in) earlier chapters, plus timeless ones, are considered.
+        """
+        query_terms = Counter(tokenize(query))
+        if not query_terms or not self._passages:
+            return []
+        count = len(self._passages)
+        scores: Dict[int, float] = {}
+        for term, query_count in query_terms.items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, tf in postings:
+                norm = K1 * (1 - B + B * self._lengths[index] / self._avg_length)
+                scores[index] = scores.get(index, 0.0) + query_count * idf * tf * (K1 + 1) / (tf + norm)
+
+        results: List[Passage] = []
+        for index, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            source, entry = self._passages[index]
+            if source in exclude_sources:
+                continue
+            if before_chapter is not None and entry["chapter"] >= before_chapter:
+                continue
+            results.append(Passage(source, entry["label"], entry["chapter"], entry["text"], score))
+            if len(results) >= k:
+                break
+        return results
+
+    # ---- building ----
+
+    def _build(self) -> None:
+        """Inverted index (term -> [(passage, tf)]) and passage lengths from the stored term counts."""
+        self._passages: List[Tuple[str, Dict[str, Any]]] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        for source, data in self._sources.items():
+            for entry in data["passages"]:
+                index = len(self._passages)
+                self._passages.append((source, entry))
+                self._lengths.append(entry["length"])
+                for term, tf in entry["terms"].items():
+                    self._postings.setdefault(term, []).append((index, tf))
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 1.0
+
+    @staticmethod
+    def _entry(passage: Passage) -> Dict[str, Any]:
+        terms = tokenize(passage.text)
+        return {"label": passage.label, "chapter": passage.chapter, "text": passage.text,
+                "terms": dict(Counter(terms)), "length": len(terms)}
+
+    def _current_sources(self, kb: Optional[ProjectKnowledgeBase]) -> Dict[str, Tuple[str, Callable[[], List[Passage]]]]:
+        """source -> (content hash, function producing its passages), for everything indexable right now."""
+        sources: Dict[str, Tuple[str, Callable[[], List[Passage]]]] = {}
+        numbers = sorted({int(match.group(1)) for match in
+                          (_CHAPTER_FILE.match(path.name) for path in self.project_dir.glob("chapter_*.md")) if match})
+        for number in numbers:
+            path = chapter_file(self.project_dir, number)
+            try:
+                text = path.read_text(encoding="utf-8") if path else ""
+            except Exception as e:
+                logger.warning(f"Not indexing chapter {number}: {e}")
+                continue
+            if text.strip():
+                sources[f"chapter:{number}"] = (_hash(text), lambda number=number, text=text: _chapter_passages(number, text))
+
+        codex_path = self.project_dir / "codex.json"
+        if codex_path.exists():
+            text = codex_path.read_text(encoding="utf-8")
+            sources["codex"] = (_hash(text), lambda text=text: _codex_passages(text))
+
+        worldbuilding = kb.worldbuilding if kb is not None else None
+        if worldbuilding is not None:
+            fields = {name: value for name, value in worldbuilding.model_dump().items() if isinstance(value, str) and value.strip()}
+            if fields:
+                sources["worldbuilding"] = (_hash(repr(sorted(fields.items()))),
+                                            lambda fields=fields: _worldbuilding_passages(fields))
+        return sources
+
+
+def _chapter_passages(number: int, text: str) -> List[Passage]:
+    """One passage per scene, or several for scenes longer than PASSAGE_TOKENS."""
+    passages = []
+    for scene_index, scene in enumerate(_SCENE_BREAK.split(text)):
+        label = f"Chapter {number}" + (f", Scene {scene_index}" if scene_index else "")
+        for piece in split_text(scene, PASSAGE_TOKENS, estimate_tokens):
+            passages.append(Passage(f"chapter:{number}", label, number, piece))
+    return passages
+
+
+def _codex_passages(codex_json: str) -> List[Passage]:
+    try:
+        codex = MasterCodex.from_json(codex_json)
+    except Exception as e:
+        logger.warning(f"Not indexing the codex: {e}")
+        return []
+    passages = [Passage("codex", f"Fact (Chapter {fact.chapter_established})", fact.chapter_established, fact.fact)
+                for fact in codex.facts.values()]
+    memories = {memory.id or memory.content: memory for memory in codex.memories.values()}
+    for character in codex.characters.values():
+        memories.update({memory.id or memory.content: memory for memory in character.memories})
+    passages.extend(Passage("codex", f"Memory of {memory.owner} (Chapter {memory.chapter_introduced})",
+                            memory.chapter_introduced, memory.content) for memory in memories.values())
+    return passages
+
+
+def _worldbuilding_passages(fields: Dict[str, str]) -> List[Passage]:
+    passages = []
+    for name, value in fields.items():
+        label = f"Worldbuilding: {name.replace('_', ' ')}"
+        passages.extend(Passage("worldbuilding", label, 0, piece) for piece in split_text(value, PASSAGE_TOKENS, estimate_tokens))
+    return passages
+
+
+def scene_query(scene: Scene) -> str:
+    """Search terms for a scene; the characters and setting count double, being what earlier details attach to."""
+    anchors = " ".join(scene.characters + [scene.setting])
+    return " ".join([anchors, anchors, scene.summary, scene.goal])
+
+
+def render_passages(passages: List[Passage], token_budget: int, count_tokens: Optional[Callable[[str], int]] = None) -> str:
+    """The passages as a prompt section within `token_budget` tokens, or "" if none fit."""
+    count_tokens = count_tokens or estimate_tokens
+    remaining = token_budget - count_tokens(RETRIEVAL_HEADING)
+    blocks = []
+    for passage in passages:
+        block = f"[{passage.label}]\n{passage.text}"
+        tokens = count_tokens(block)
+        if tokens > remaining:
+            if remaining < 50 or blocks:
+                break
+            block = truncate_to_tokens(block, remaining)
+            tokens = remaining
+        blocks.append(block)
+        remaining -= tokens
+    return f"{RETRIEVAL_HEADING}\n" + "\n\n".join(blocks) if blocks else ""
@@ -0,0 +1,177 @@
+# src/libriscribe/utils/retry_policy.py
+"""
+Retry policy, retry budgets and circuit breakers for LLM calls.
+
+- Each error class (see llm_errors) has its own retry limit; classes without one fail at once.
+- Each operation ("scene_write", "review", ...) has a retry budget: retries are paid from
+  a balance that starts at a fixed reserve and earns `ratio` per request, so a failing
+  provider can never multiply an operation's calls by more than about 1 + ratio.
+- Each provider has a circuit breaker: after repeated transient failures (or one auth
+  failure) further calls fail immediately until a cool-down has passed, then a single
+  probe call decides whether to close the circuit again. A probe that never reports back
+  (e.g. a cancelled call) is given up after a timeout, so it cannot wedge the provider.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from libriscribe.utils.llm_errors import CircuitHalfOpenError, CircuitOpenError, LLMError
+
+logger = logging.getLogger(__name__)
+
+# Retries per error kind; kinds not listed are never retried. Override with LLM_MAX_RETRIES.
+DEFAULT_MAX_RETRIES: Dict[str, int] = {
+    "rate_limited": 5,
+    "transient": 3,
+    "malformed_output": 1,
+}
+# How often calls held back by a half-open circuit check whether its probe has finished
+HALF_OPEN_POLL_SECONDS = 1.0
+
+
+class RetryBudget:
+    """Caps the retries of one operation relative to the requests it makes."""
+
+    def __init__(self, ratio: float, reserve: int):
+        self.ratio = ratio
+        self.reserve = float(reserve)
+        self.balance = float(reserve)
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.balance = min(self.reserve, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Takes one retry from the budget; False when it is spent."""
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open probe after a cool-down -> closed."""
+
+    def __init__(self, provider: str, failure_threshold: int, cooldown_seconds: float,
+                 probe_timeout_seconds: float = 120.0):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """
+        Raises CircuitOpenError unless a call may go ahead now. Returns True if the call is the
+        half-open probe; the caller must then report its outcome, or release_probe() if it has none.
+        """
+        with self._lock:
+            if self.state == "open":
+                remaining = self.opened_at + self.cooldown_seconds - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f"Circuit for {self.provider} is open after repeated failures; retry in {remaining:.0f}s",
+                        provider=self.provider,
+                        retry_after=remaining,
+                    )
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    if time.monotonic() - self._probe_started < self.probe_timeout_seconds:
+                        raise CircuitHalfOpenError(f"Circuit for {self.provider} is half-open; waiting for the probe call",
+                                                   provider=self.provider,
+                                                   retry_after=HALF_OPEN_POLL_SECONDS * random.uniform(0.5, 1.5))
+                    logger.warning(f"Probe call for {self.provider} did not report back; sending a new one")
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+                return True
+            return False
+
+    def release_probe(self) -> None:
+        """The probe call ended without an outcome (e.g. it was cancelled); the next call probes instead."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Circuit for {self.provider} closed again")
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: LLMError) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            if not error.trips_breaker:
+                return  # Request-specific failures say nothing about the provider's health
+            self.failures += 1
+            if self.state == "half_open" or error.fatal or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit for {self.provider} opened after {self.failures} failure(s): {error}")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"state": self.state, "failures": self.failures}
+
+
+class RetryController:
+    """Shared retry state for an LLMClient and all its agent views."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.max_retries = {**DEFAULT_MAX_RETRIES, **settings.llm_max_retries}
+        self._budgets: Dict[str, RetryBudget] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def budget(self, operation: Optional[str]) -> RetryBudget:
+        key = operation or "unlabeled"
+        with self._lock:
+            if key not in self._budgets:
+                self._budgets[key] = RetryBudget(self.settings.llm_retry_budget_ratio, self.settings.llm_retry_budget_reserve)
+            return self._budgets[key]
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(
+                    provider,
+                    self.settings.llm_circuit_failure_threshold,
+                    self.settings.llm_circuit_cooldown_seconds,
+                    self.settings.llm_circuit_probe_timeout_seconds,
+                )
+            return self._breakers[provider]
+
+    def allows_retry(self, kind: str) -> bool:
+        return self.max_retries.get(kind, 0) > 0
+
+    def retry_delay(self, error: LLMError, attempt: int, budget: RetryBudget) -> Optional[float]:
+        """
+        Seconds to wait before retry number `attempt` of this error kind, or None to give up.
+        Rate-limit retries are not charged to the budget: the limiter already paces them and 429s are not billed.
+        """
+        if attempt > self.max_retries.get(error.kind, 0):
+            return None
+        if error.kind != "rate_limited" and not budget.withdraw():
+            logger.warning(f"Retry budget exhausted; not retrying {error.kind} error: {error}")
+            return None
+        if error.kind != "transient":
+            return 0.0  # 429s wait inside the limiter; malformed output is simply asked for again
+        backoff = min(self.settings.llm_retry_backoff_max_seconds,
+                      self.settings.llm_retry_backoff_seconds * 2 ** (attempt - 1))
+        return max(random.uniform(0, backoff), error.retry_after or 0.0)  # Full jitter, but honour Retry-After
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        return {provider: breaker.snapshot() for provider, breaker in self._breakers.items()}
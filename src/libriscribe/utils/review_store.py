@@ -0,0 +1,51 @@
+# src/libriscribe/utils/review_store.py
+"""
+Chapter reviews remembered by content.
+
+A review is stored in the project's reviews.json under the chapter's file name, together
+with a hash of the chapter text, the project language and the reviewer prompt version.
+Any agent reviewing the same unchanged chapter gets the stored review back instead of
+making another full-chapter call; editing the chapter (or the reviewer prompt) changes
+the hash, so a stale review is never reused.
+"""
+
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+from libriscribe.utils.file_utils import read_json_file, write_json_file
+
+logger = logging.getLogger(__name__)
+
+REVIEW_FILE_NAME = "reviews.json"
+
+# Shared by all stores: the reviewer and the editor's own reviewer run in different pipeline stages
+_lock = threading.Lock()
+
+
+def review_key(chapter_content: str, language: str, prompt_version: int) -> str:
+    return hashlib.sha256(f"{prompt_version}\0{language}\0{chapter_content}".encode("utf-8")).hexdigest()
+
+
+class ReviewStore:
+    """The stored reviews of one project."""
+
+    def __init__(self, project_dir: Path):
+        self.path = Path(project_dir) / REVIEW_FILE_NAME
+
+    def get(self, chapter_file: str, key: str) -> Optional[str]:
+        """The stored review of `chapter_file` if it was made for the same `key`, else None."""
+        with _lock:
+            data = read_json_file(str(self.path)) if self.path.exists() else None
+        entry = (data or {}).get(chapter_file)
+        if entry and entry.get("key") == key:
+            return entry.get("review")
+        return None
+
+    def put(self, chapter_file: str, key: str, review: str) -> None:
+        with _lock:
+            data = (read_json_file(str(self.path)) if self.path.exists() else None) or {}
+            data[chapter_file] = {"key": key, "review": review}
+            write_json_file(str(self.path), data)
@@ -0,0 +1,103 @@
+# src/libriscribe/utils/scene_checkpoint.py
+"""
+Scene-level checkpoints for chapter writing.
+
+While a chapter is being written, every finished scene is saved to
+<project>/.scenes/chapter_N/scene_K.md and recorded in that directory's manifest.json
+(status "done" or "failed", plus the scene's key). If the run dies part way, the next
+attempt at the chapter reuses the saved scenes whose key is unchanged and regenerates only
+the missing or failed ones.
+
+The key hashes what the scene is written from: its outline fields and the chapter's story
+context. Retrieved passages and codex notes are left out; they shift with any edit to an
+earlier chapter or the codex, which should not throw away finished scenes. The directory is removed once the chapter
+has been assembled with no failed scenes, so its presence means the chapter is unfinished.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCENE_WORK_DIR = ".scenes"
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    """Writes via a temporary file, so a crash never leaves a half-written file behind."""
+    temp = path.with_name(path.name + ".tmp")
+    temp.write_text(text, encoding="utf-8")
+    os.replace(temp, path)
+
+
+class SceneCheckpoint:
+    """The work directory and manifest of one chapter's scenes."""
+
+    def __init__(self, project_dir: Path, chapter_number: int):
+        self.chapter_number = chapter_number
+        self.dir = self.work_dir(project_dir, chapter_number)
+        self.manifest_path = self.dir / MANIFEST_FILE_NAME
+        self._lock = threading.Lock()
+        self.manifest: Dict[str, Any] = {"chapter": chapter_number, "scenes": {}}
+        if self.manifest_path.exists():
+            try:
+                self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable scene manifest {self.manifest_path}: {e}")
+
+    @staticmethod
+    def work_dir(project_dir: Path, chapter_number: int) -> Path:
+        return Path(project_dir) / SCENE_WORK_DIR / f"chapter_{chapter_number}"
+
+    @classmethod
+    def pending(cls, project_dir: Path, chapter_number: int) -> bool:
+        """True if the chapter was started but not finished (or finished with failed scenes)."""
+        return (cls.work_dir(project_dir, chapter_number) / MANIFEST_FILE_NAME).exists()
+
+    @staticmethod
+    def scene_key(scene_outline: str, story_context: str) -> str:
+        """Key of a scene written from `scene_outline` (its prompt without retrieved notes) after `story_context`."""
+        return hashlib.sha256(f"{story_context}\0{scene_outline}".encode("utf-8")).hexdigest()
+
+    def completed(self, scene_number: int, key: str) -> Optional[str]:
+        """The saved text of the scene if it finished for this same key, else None."""
+        entry = self.manifest["scenes"].get(str(scene_number))
+        if not entry or entry.get("status") != "done" or entry.get("key") != key:
+            return None
+        path = self.dir / entry["file"]
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+    def save(self, scene_number: int, key: str, content: str, failed: bool = False) -> None:
+        """Saves a scene (or records its failure) and updates the manifest."""
+        with self._lock:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            file_name = f"scene_{scene_number}.md"
+            if not failed:
+                _write_atomic(self.dir / file_name, content)
+            self.manifest["scenes"][str(scene_number)] = {
+                "status": "failed" if failed else "done",
+                "key": key,
+                "file": file_name,
+            }
+            _write_atomic(self.manifest_path, json.dumps(self.manifest, indent=4))
+
+    def failed_scenes(self) -> int:
+        return sum(1 for entry in self.manifest["scenes"].values() if entry.get("status") == "failed")
+
+    def finish(self) -> None:
+        """Removes the work directory once the chapter is assembled, unless scenes failed and need a retry."""
+        if self.failed_scenes():
+            logger.info(f"Keeping scene checkpoints of chapter {self.chapter_number}: "
+                        f"{self.failed_scenes()} scene(s) failed")
+            return
+        shutil.rmtree(self.dir, ignore_errors=True)
+        try:
+            self.dir.parent.rmdir()  # Only succeeds once no other chapter has checkpoints
+        except OSError:
+            pass
@@ -0,0 +1,92 @@
+# src/libriscribe/utils/streaming.py
+"""Helpers for writing streamed LLM output to disk with live progress."""
+
+import logging
+import threading
+import time
+from typing import IO, Iterable, Iterator
+
+from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+
+console = Console()
+logger = logging.getLogger(__name__)
+
+# Rich allows one live display at a time; concurrent streams (e.g. in the chapter pipeline) run without one
+_live_display = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token) for progress display."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def ensure_prefix(chunks: Iterable[str], title: str, heading: str) -> Iterator[str]:
+    """
+    Passes streamed chunks through, emitting `heading` first unless the stream already
+    starts with the title in bold or as a Markdown heading.
+    """
+    buffer = ""
+    checked = False
+    for chunk in chunks:
+        if checked:
+            yield chunk
+            continue
+        buffer += chunk
+        if len(buffer.lstrip()) < len(title) + 4:
+            continue
+        checked = True
+        stripped = buffer.lstrip()
+        if not stripped.startswith(f"**{title}**") and not stripped.startswith(f"# {title}"):
+            yield heading
+        yield buffer
+    if not checked and buffer:
+        stripped = buffer.lstrip()
+        if not stripped.startswith(f"**{title}**") and not stripped.startswith(f"# {title}"):
+            yield heading
+        yield buffer
+
+
+def stream_to_file(chunks: Iterable[str], file_handle: IO[str], description: str) -> str:
+    """
+    Appends streamed chunks to an open file as they arrive while showing live tokens/sec.
+    Returns the full streamed text.
+    """
+    parts = []
+    tokens = 0
+    start = time.monotonic()
+    if not _live_display.acquire(blocking=False):
+        for chunk in chunks:
+            if chunk:
+                file_handle.write(chunk)
+                file_handle.flush()
+                parts.append(chunk)
+                tokens += estimate_tokens(chunk)
+    else:
+        try:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("{task.description}"),
+                TextColumn("[cyan]{task.fields[tokens]} tokens"),
+                TextColumn("[green]{task.fields[rate]:.1f} tok/s"),
+                TimeElapsedColumn(),
+                console=console,
+                transient=True,
+            ) as progress:
+                task = progress.add_task(description, tokens=0, rate=0.0)
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    file_handle.write(chunk)
+                    file_handle.flush()
+                    parts.append(chunk)
+                    tokens += estimate_tokens(chunk)
+                    elapsed = time.monotonic() - start
+                    progress.update(task, tokens=tokens, rate=tokens / elapsed if elapsed > 0 else 0.0)
+        finally:
+            _live_display.release()
+
+    elapsed = time.monotonic() - start
+    if tokens:
+        console.print(f"[dim]   {tokens} tokens in {elapsed:.1f}s ({tokens / elapsed if elapsed > 0 else 0:.1f} tok/s)[/dim]")
+    return "".join(parts)
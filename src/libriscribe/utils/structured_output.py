@@ -0,0 +1,118 @@
+# src/libriscribe/utils/structured_output.py
+"""
+Schema-constrained output for LLM calls.
+
+An OutputSchema is derived from a Pydantic model in knowledge_base.py and passed to
+LLMClient.generate_structured(). Each provider enforces it as best it can:
+
+    openai              response_format json_schema
+    claude              a forced tool call whose input_schema is the schema
+    google_ai_studio    response_mime_type application/json with a response_schema
+    deepseek, mistral   JSON mode; the schema is spelled out in the prompt
+    mock                JSON mode
+
+Other providers (openrouter, whose models vary) get the prompt unchanged; their reply is
+parsed locally (file_utils.parse_json_lenient) and only repaired with an extra call if that fails.
+"""
+
+import copy
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+SCHEMA_PROVIDERS = {"openai", "claude", "google_ai_studio"}
+JSON_MODE_PROVIDERS = {"deepseek", "mistral", "mock"}
+
+# Keys of the OpenAPI subset Gemini accepts in a response_schema
+_GEMINI_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "properties", "required", "items"}
+
+
+@dataclass
+class OutputSchema:
+    """A JSON schema for one kind of structured reply. The root is always an object."""
+    name: str
+    schema: Dict[str, Any]
+    list_key: Optional[str] = None  # Set when a list is wrapped as {list_key: [...]}
+
+    @classmethod
+    def from_model(cls, model: Type[BaseModel], name: str, fields: Optional[List[str]] = None,
+                   many: bool = False) -> "OutputSchema":
+        """
+        Schema of `model` (restricted to `fields`, if given) with every property required,
+        so the model fills them all in. many=True asks for a list of such objects.
+        """
+        full = model.model_json_schema()
+        properties = {  # Without defaults such as "Untitled", which the model might echo back
+            key: {k: v for k, v in value.items() if k != "default"}
+            for key, value in full.get("properties", {}).items() if not fields or key in fields
+        }
+        schema = _inline_refs({"type": "object", "properties": properties, "required": list(properties)},
+                              full.get("$defs", {}))
+        if many:
+            return cls(name, {"type": "object", "properties": {name: {"type": "array", "items": schema}},
+                              "required": [name]}, list_key=name)
+        return cls(name, schema)
+
+    def unwrap(self, data: Any) -> Any:
+        """The reply without the list wrapper. Unenforced replies may already be a bare list."""
+        if self.list_key and isinstance(data, dict) and isinstance(data.get(self.list_key), list):
+            return data[self.list_key]
+        return data
+
+    def fingerprint(self) -> str:
+        return json.dumps(self.schema, sort_keys=True)
+
+    def openai_response_format(self) -> Dict[str, Any]:
+        # Not strict: strict mode forbids free-form maps such as Character.relationships
+        return {"type": "json_schema", "json_schema": {"name": self.name, "schema": self.schema, "strict": False}}
+
+    def claude_tool_kwargs(self) -> Dict[str, Any]:
+        return {
+            "tools": [{"name": self.name, "description": f"Record the {self.name.replace('_', ' ')}.",
+                       "input_schema": self.schema}],
+            "tool_choice": {"type": "tool", "name": self.name},
+        }
+
+    def gemini_generation_config(self) -> Dict[str, Any]:
+        return {"response_mime_type": "application/json", "response_schema": _gemini_schema(self.schema)}
+
+    def prompt_suffix(self) -> str:
+        """Schema instructions for JSON-mode providers, which guarantee valid JSON but not its shape."""
+        return ("\n\nRespond with a single JSON object (no markdown) that matches this JSON schema:\n"
+                + json.dumps(self.schema))
+
+
+def _inline_refs(schema: Any, defs: Dict[str, Any]) -> Any:
+    """Replaces "$ref" pointers into `defs` with the definitions themselves."""
+    if isinstance(schema, list):
+        return [_inline_refs(item, defs) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    ref = schema.get("$ref")
+    if isinstance(ref, str) and ref.startswith("#/$defs/"):
+        return _inline_refs(copy.deepcopy(defs[ref[len("#/$defs/"):]]), defs)
+    return {key: _inline_refs(value, defs) for key, value in schema.items() if key != "$defs"}
+
+
+def _gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduces a JSON schema to Gemini's OpenAPI subset: Optional[...] becomes nullable, and
+    free-form maps (objects without properties, which Gemini rejects) become strings.
+    """
+    variants = schema.get("anyOf")
+    if variants:
+        concrete = [variant for variant in variants if variant.get("type") != "null"]
+        reduced = _gemini_schema(concrete[0] if concrete else {"type": "string"})
+        if len(concrete) < len(variants):
+            reduced["nullable"] = True
+        return reduced
+    if schema.get("type") == "object" and not schema.get("properties"):
+        return {"type": "string"}
+    reduced = {key: value for key, value in schema.items() if key in _GEMINI_SCHEMA_KEYS}
+    if "properties" in reduced:
+        reduced["properties"] = {key: _gemini_schema(value) for key, value in reduced["properties"].items()}
+    if "items" in reduced:
+        reduced["items"] = _gemini_schema(reduced["items"])
+    return reduced
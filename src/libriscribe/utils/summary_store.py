@@ -0,0 +1,169 @@
+# src/libriscribe/utils/summary_store.py
+"""
+Hierarchical story summaries used as chapter-writer context.
+
+Each written chapter gets a short summary per scene and a paragraph for the whole chapter
+(one call), and every `story_arc_chapters` chapters roll up into an arc summary. They are
+stored in the project's summaries.json keyed by a hash of the text they summarize, so
+each is generated once and regenerated only when that text changes (e.g. a new
+chapter_N_revised.md).
+
+story_context() turns them into a token-budgeted digest of the whole book so far: arc
+summaries for finished arcs, chapter summaries for the current arc, the previous chapter
+scene by scene, and the last few hundred tokens of its text for a seamless continuation.
+"""
+
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from libriscribe.knowledge_base import ProjectKnowledgeBase
+from libriscribe.utils import prompts_context as prompts
+from libriscribe.utils.context_manager import previous_chapter_context_from_text, read_chapter_text
+from libriscribe.utils.file_utils import read_json_file, write_json_file
+from libriscribe.utils.llm_client import LLMClient
+from libriscribe.utils.structured_output import OutputSchema
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FILE_NAME = "summaries.json"
+
+
+class ChapterSummary(BaseModel):
+    scenes: List[str] = []  # One or two sentences per scene, in order
+    summary: str = ""  # One paragraph for the chapter
+
+
+CHAPTER_SUMMARY_SCHEMA = OutputSchema.from_model(ChapterSummary, "chapter_summary")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SummaryStore:
+    """Scene, chapter and arc summaries of one project, generated on demand and cached by content hash."""
+
+    def __init__(self, project_dir: Path, llm_client: LLMClient):
+        self.project_dir = Path(project_dir)
+        self.path = self.project_dir / SUMMARY_FILE_NAME
+        self.llm_client = llm_client
+        self.settings = llm_client.settings
+        self._lock = threading.Lock()
+        data = read_json_file(str(self.path)) if self.path.exists() else None
+        self._data: Dict[str, Dict[str, Any]] = {
+            "chapters": dict((data or {}).get("chapters", {})),
+            "arcs": dict((data or {}).get("arcs", {})),
+        }
+
+    def chapter_summary(self, kb: ProjectKnowledgeBase, chapter_number: int, text: str) -> Optional[Dict[str, Any]]:
+        """{"hash", "scenes", "summary"} for the chapter text, from the store or a new call; None if that fails."""
+        digest = content_hash(text)
+        entry = self._data["chapters"].get(str(chapter_number))
+        if entry and entry.get("hash") == digest:
+            return entry
+        prompt = prompts.CHAPTER_SUMMARY_PROMPT.format(
+            chapter_number=chapter_number, genre=kb.genre, book_title=kb.title, language=kb.language, chapter_text=text)
+        try:
+            result = ChapterSummary.model_validate(self.llm_client.generate_structured(
+                prompt, CHAPTER_SUMMARY_SCHEMA, max_tokens=1000, temperature=0.3, operation="chapter_summary"))
+        except Exception as e:
+            logger.warning(f"Could not summarize chapter {chapter_number}: {e}")
+            return None
+        entry = {"hash": digest, "scenes": result.scenes, "summary": result.summary}
+        self._store("chapters", str(chapter_number), entry)
+        return entry
+
+    def arc_summary(self, kb: ProjectKnowledgeBase, first: int, last: int,
+                    chapters: Dict[int, Dict[str, Any]]) -> Optional[str]:
+        """Rollup of chapters first..last from their summaries, regenerated when any of them changes."""
+        digest = content_hash("".join(chapters[number]["hash"] for number in sorted(chapters)))
+        key = f"{first}-{last}"
+        entry = self._data["arcs"].get(key)
+        if entry and entry.get("hash") == digest:
+            return entry["summary"]
+        chapter_summaries = "\n\n".join(f"Chapter {number}: {chapters[number]['summary']}" for number in sorted(chapters))
+        prompt = prompts.ARC_SUMMARY_PROMPT.format(
+            first_chapter=first, last_chapter=last, genre=kb.genre, book_title=kb.title, language=kb.language,
+            chapter_summaries=chapter_summaries)
+        try:
+            summary = self.llm_client.generate_content(prompt, max_tokens=800, temperature=0.3, operation="arc_summary")
+        except Exception as e:
+            logger.warning(f"Could not summarize chapters {first}-{last}: {e}")
+            return None
+        self._store("arcs", key, {"hash": digest, "summary": summary.strip()})
+        return summary.strip()
+
+    def story_context(self, kb: ProjectKnowledgeBase, chapter_number: int,
+                      previous_chapter_text: Optional[str] = None) -> str:
+        """
+        Digest of chapters 1..chapter_number-1 within story_summary_tokens, plus the ending
+        of the previous chapter (story_summary_tail_tokens). `previous_chapter_text` overrides
+        the previous chapter's file (e.g. a draft the chapter pipeline kept).
+        """
+        if chapter_number <= 1:
+            return "This is the first chapter. No previous context available."
+        previous = chapter_number - 1
+        arc_size = max(1, self.settings.story_arc_chapters)
+        current_arc_start = (chapter_number - 1) // arc_size * arc_size + 1
+
+        summaries: Dict[int, Dict[str, Any]] = {}
+        for number in range(1, chapter_number):
+            text = previous_chapter_text if number == previous and previous_chapter_text is not None \
+                else read_chapter_text(self.project_dir, number)
+            if text:
+                entry = self.chapter_summary(kb, number, text)
+                if entry:
+                    summaries[number] = entry
+
+        # Oldest first; the oldest sections are dropped first when over budget
+        sections: List[str] = []
+        for first in range(1, current_arc_start, arc_size):
+            last = first + arc_size - 1
+            arc_chapters = {number: summaries[number] for number in range(first, last + 1) if number in summaries}
+            arc = self.arc_summary(kb, first, last, arc_chapters) if len(arc_chapters) == arc_size else None
+            if arc:
+                sections.append(f"Chapters {first}-{last}: {arc}")
+            else:
+                sections.extend(self._chapter_line(kb, number, summaries) for number in range(first, last + 1))
+        sections.extend(self._chapter_line(kb, number, summaries) for number in range(current_arc_start, previous))
+
+        previous_scenes = summaries.get(previous, {}).get("scenes") or []
+        if previous_scenes:
+            scene_lines = "\n".join(f"- Scene {index}: {scene}" for index, scene in enumerate(previous_scenes, 1))
+            last_section = f"Chapter {previous}, scene by scene:\n{scene_lines}"
+        else:
+            last_section = self._chapter_line(kb, previous, summaries)
+
+        budget = self.settings.story_summary_tokens - self.llm_client.count_tokens(last_section)
+        omitted = False
+        while sections and self.llm_client.count_tokens("\n\n".join(sections)) > budget:
+            sections.pop(0)
+            omitted = True
+        if omitted:
+            sections.insert(0, "(Earlier chapters omitted.)")
+        digest = "\n\n".join(sections + [last_section])
+
+        tail = previous_chapter_text if previous_chapter_text is not None else read_chapter_text(self.project_dir, previous)
+        ending = previous_chapter_context_from_text(tail, self.settings.story_summary_tail_tokens,
+                                                    self.llm_client.llm_provider, self.llm_client.model) if tail else ""
+        context = f"Story so far:\n{digest}"
+        if ending:
+            context += f"\n\nEnd of Chapter {previous}:\n{ending}"
+        return context
+
+    def _chapter_line(self, kb: ProjectKnowledgeBase, number: int, summaries: Dict[int, Dict[str, Any]]) -> str:
+        """The chapter's summary, or its outline summary if it has not been written (or summarized)."""
+        if number in summaries:
+            return f"Chapter {number}: {summaries[number]['summary']}"
+        chapter = kb.get_chapter(number)
+        return f"Chapter {number} (outline): {chapter.summary if chapter else 'Not available.'}"
+
+    def _store(self, kind: str, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data[kind][key] = entry
+            write_json_file(str(self.path), self._data)
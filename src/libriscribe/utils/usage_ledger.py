@@ -0,0 +1,119 @@
+# src/libriscribe/utils/usage_ledger.py
+"""
+Per-call LLM usage telemetry.
+
+Every LLMClient call appends one JSON line to <project>/usage.jsonl recording the
+operation, agent, provider, model, token counts, latency, retries and estimated cost.
+Extra labels such as the chapter being written come from usage_context().
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FILE_NAME = "usage.jsonl"
+
+_usage_labels: contextvars.ContextVar = contextvars.ContextVar("libriscribe_usage_labels", default={})
+
+
+@contextmanager
+def usage_context(**labels: Any):
+    """Attaches labels (e.g. chapter=3) to every usage record made inside the block."""
+    token = _usage_labels.set({**_usage_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _usage_labels.reset(token)
+
+
+def current_labels() -> Dict[str, Any]:
+    return dict(_usage_labels.get())
+
+
+@dataclass
+class UsageRecord:
+    """One LLM call (or cache hit)."""
+    operation: str
+    agent: str
+    provider: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    latency_s: float = 0.0
+    retries: int = 0
+    cost_usd: float = 0.0
+    cache_hit: bool = False
+    success: bool = True
+    error: Optional[str] = None  # Error kind (see llm_errors) when the call failed
+    timestamp: float = field(default_factory=time.time)
+    labels: Dict[str, Any] = field(default_factory=dict)
+
+
+class UsageLedger:
+    """Appends usage records to a JSONL file in the project directory."""
+
+    def __init__(self):
+        self.path: Optional[Path] = None
+        self.session_records: List[UsageRecord] = []
+        self._lock = threading.Lock()
+
+    def attach(self, project_dir: Union[str, Path]) -> None:
+        self.path = Path(project_dir) / LEDGER_FILE_NAME
+
+    def record(self, record: UsageRecord) -> None:
+        with self._lock:
+            self.session_records.append(record)
+            if self.path is None:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write usage record to {self.path}: {e}")
+
+
+def load_usage(project_dir: Union[str, Path]) -> List[Dict[str, Any]]:
+    """Reads all usage records for a project, skipping malformed lines."""
+    path = Path(project_dir) / LEDGER_FILE_NAME
+    records = []
+    if not path.exists():
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def summarize_usage(records: Iterable[Dict[str, Any]], by: str) -> Dict[str, Dict[str, float]]:
+    """
+    Aggregates records by a record field (agent, provider, operation, model) or a label (chapter, tier).
+    Each group gets calls, cache hits, tokens, latency, retries and cost totals.
+    """
+    groups: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for record in records:
+        key = record.get(by, record.get("labels", {}).get(by))
+        group = groups["-" if key is None else str(key)]
+        group["calls"] += 1
+        group["cache_hits"] += 1 if record.get("cache_hit") else 0
+        group["failures"] += 0 if record.get("success", True) else 1
+        group["prompt_tokens"] += record.get("prompt_tokens", 0)
+        group["completion_tokens"] += record.get("completion_tokens", 0)
+        group["cached_tokens"] += record.get("cached_tokens", 0)
+        group["latency_s"] += record.get("latency_s", 0.0)
+        group["retries"] += record.get("retries", 0)
+        group["cost_usd"] += record.get("cost_usd", 0.0)
+    return {key: dict(values) for key, values in groups.items()}
@@ -0,0 +1,68 @@
+# tests/test_chunking.py
+import pytest
+
+from libriscribe.utils.chunking import pack_chunks, split_scenes, split_text
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def paragraph(label: str, size: int) -> str:
+    return " ".join(f"{label}{i}." for i in range(size))
+
+
+def chapter(number: int, paragraphs: int = 3, size: int = 10) -> str:
+    body = "\n\n".join(paragraph(f"c{number}p{p}w", size) for p in range(paragraphs))
+    return f"# Chapter {number}\n\n{body}\n\n"
+
+
+@pytest.mark.parametrize("budget", [1, 5, 12, 31, 40, 95, 1000])
+def test_chunks_stay_within_budget_and_keep_every_word_in_order(budget):
+    units = [chapter(n) for n in range(1, 4)]
+    chunks = pack_chunks(units, budget, words)
+    assert all(words(chunk) <= budget for chunk in chunks)
+    assert " ".join(chunks).split() == "".join(units).split()
+
+
+def test_units_that_fit_together_share_a_chunk():
+    units = [chapter(n, paragraphs=1) for n in range(1, 5)]  # 13 words each
+    chunks = pack_chunks(units, 30, words)
+    assert len(chunks) == 2
+    assert chunks[0].startswith("# Chapter 1") and "# Chapter 2" in chunks[0]
+    assert chunks[1].startswith("# Chapter 3")
+
+
+def test_whole_units_are_never_split_when_they_fit():
+    units = [chapter(n) for n in range(1, 4)]  # 33 words each
+    for chunk in pack_chunks(units, 40, words):
+        assert chunk.startswith("# Chapter") and chunk.count("# Chapter") == 1
+        assert words(chunk) == 33
+
+
+def test_long_unit_is_cut_at_paragraphs_before_sentences():
+    chunks = split_text(chapter(1, paragraphs=3, size=10), 12, words)
+    # Heading plus first paragraph is 13 words, so the heading goes alone; every paragraph then fits whole
+    assert chunks == ["# Chapter 1", paragraph("c1p0w", 10), paragraph("c1p1w", 10), paragraph("c1p2w", 10)]
+
+
+def test_paragraph_too_long_is_cut_at_sentences():
+    text = "One two three. Four five six. Seven eight nine."
+    assert split_text(text, 4, words) == ["One two three.", "Four five six.", "Seven eight nine."]
+
+
+def test_text_without_boundaries_falls_back_to_words():
+    chunks = split_text("a b c d e f g", 3, words)
+    assert chunks == ["a b c", "d e f", "g"]
+
+
+def test_empty_units_produce_no_chunks():
+    assert pack_chunks(["", "  \n\n  "], 10, words) == []
+
+
+def test_split_scenes_keeps_the_heading_piece():
+    text = "## Chapter 1: Title\n\n**Scene 1: Start**\n\nOne.\n\n### Scene 2\n\nTwo.\n"
+    pieces = split_scenes(text)
+    assert pieces[0] == "## Chapter 1: Title\n\n"
+    assert pieces[1].startswith("**Scene 1") and pieces[2].startswith("### Scene 2")
+    assert "".join(pieces) == text
@@ -0,0 +1,119 @@
+# tests/test_edit_ops.py
+from types import SimpleNamespace
+
+import pytest
+
+from libriscribe.utils.edit_ops import EditOp, apply_edits, edit_with_ops, locate
+from libriscribe.utils.llm_errors import MalformedOutputError
+
+TEXT = ("Ilse closed the ledger. \"Nobody reads these,\" she said.\n\n"
+        "The archive was cold that night, and the lamps burned low.\n\n"
+        "She closed the ledger again before dawn.")
+
+
+def replace(anchor: str, text: str) -> EditOp:
+    return EditOp(op="replace", anchor=anchor, text=text)
+
+
+# --- locate ---
+
+def test_exact_anchor():
+    start, end = locate(TEXT, "the lamps burned low")
+    assert TEXT[start:end] == "the lamps burned low"
+
+
+def test_anchor_with_other_quotes_whitespace_and_case():
+    start, end = locate(TEXT, "“nobody reads   these,” SHE said")
+    assert TEXT[start:end] == "\"Nobody reads these,\" she said"
+
+
+def test_anchor_across_a_rewrapped_line():
+    text = "The archive was cold\nthat night."
+    start, end = locate(text, "cold that night")
+    assert text[start:end] == "cold\nthat night"
+
+
+def test_fuzzy_anchor_with_a_changed_word():
+    start, end = locate(TEXT, "The archive was cold this night, and the lamps burned low.")
+    assert TEXT[start:end] == "The archive was cold that night, and the lamps burned low."
+
+
+def test_missing_anchor():
+    assert locate(TEXT, "the dragon flew over the harbour") is None
+    assert locate(TEXT, "   ") is None
+
+
+def test_ambiguous_anchor_prefers_the_match_after_start():
+    first = TEXT.find("closed the ledger")
+    second = TEXT.find("closed the ledger", first + 1)
+    assert locate(TEXT, "closed the ledger")[0] == first
+    assert locate(TEXT, "closed the ledger", start=first + 1)[0] == second
+    assert locate(TEXT, "closed the ledger", start=len(TEXT))[0] == first  # Falls back to the start
+
+
+# --- apply_edits ---
+
+def test_replace_insert_and_delete():
+    result = apply_edits(TEXT, [
+        replace("cold that night", "freezing that night"),
+        EditOp(op="insert_after", anchor="the lamps burned low.", text="Somewhere, a clock ticked."),
+        EditOp(op="delete", anchor="again "),
+    ])
+    assert result.applied == 3 and not result.failed
+    assert "The archive was freezing that night, and the lamps burned low. Somewhere, a clock ticked." in result.text
+    assert result.text.endswith("She closed the ledger before dawn.")
+
+
+def test_ambiguous_anchors_apply_in_order():
+    result = apply_edits(TEXT, [replace("closed the ledger", "opened the ledger"),
+                                replace("closed the ledger", "shut the ledger")])
+    assert result.text.startswith("Ilse opened the ledger.")
+    assert "She shut the ledger again" in result.text
+
+
+def test_missing_and_overlapping_edits_are_reported():
+    missing = replace("a sentence that is not there at all", "x")
+    overlapping = replace("lamps burned", "candles burned")
+    result = apply_edits(TEXT, [replace("the lamps burned low", "the lamps went out"), missing, overlapping])
+    assert result.applied == 1
+    assert result.failed == [missing, overlapping]
+    assert result.failure_ratio == pytest.approx(2 / 3)
+    assert "the lamps went out" in result.text
+
+
+def test_delete_leaves_no_double_space():
+    assert apply_edits("One two three.", [EditOp(op="delete", anchor="two")]).text == "One three."
+
+
+def test_no_edits_keep_the_text():
+    result = apply_edits(TEXT, [])
+    assert result.text == TEXT and result.failure_ratio == 0.0
+
+
+# --- edit_with_ops ---
+
+class StubClient:
+    """Answers generate_structured with a fixed reply (or error)."""
+
+    def __init__(self, reply, max_failure_ratio: float = 0.5):
+        self.reply = reply
+        self.settings = SimpleNamespace(edit_ops_max_failure_ratio=max_failure_ratio)
+
+    def generate_structured(self, prompt, schema, **kwargs):
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply
+
+
+def test_edit_with_ops_applies_the_reply():
+    client = StubClient({"edits": [{"op": "replace", "anchor": "lamps burned low", "text": "lamps went out"}]})
+    assert "the lamps went out" in edit_with_ops(client, "Edit this.", TEXT, "edit")
+
+
+@pytest.mark.parametrize("reply", [
+    {"edits": [{"op": "replace", "anchor": "not in the text anywhere at all", "text": "x"}]},  # Too many misses
+    {"edits": [{"op": "rewrite", "anchor": "Ilse", "text": "x"}]},  # Unknown op
+    MalformedOutputError("no JSON"),
+])
+def test_edit_with_ops_falls_back_to_a_rewrite(reply):
+    assert edit_with_ops(StubClient(reply), "Edit this.", TEXT, "edit") is None
@@ -0,0 +1,39 @@
+# tests/test_json_lenient.py
+import json
+from pathlib import Path
+
+import pytest
+
+from libriscribe.utils.file_utils import extract_json_from_markdown, parse_json_lenient
+
+CORPUS = Path(__file__).resolve().parents[1] / "benchmarks" / "json_repair" / "corpus.jsonl"
+CASES = [json.loads(line) for line in CORPUS.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["id"] for case in CASES])
+def test_benchmark_corpus(case):
+    assert parse_json_lenient(case["text"]) == case["expected"]
+
+
+def test_valid_json_is_parsed_unchanged():
+    data = {"title": "It's \"quoted\"", "scenes": [1, 2.5, None, True], "nested": {"a": []}}
+    assert parse_json_lenient(json.dumps(data)) == data
+
+
+def test_first_recoverable_value_after_prose():
+    text = 'Here are the characters: [{"name": "Ilse", "age": 34,}] Let me know if you need more.'
+    assert parse_json_lenient(text) == [{"name": "Ilse", "age": 34}]
+
+
+def test_python_literals_and_single_quotes():
+    assert parse_json_lenient("{'done': True, 'note': None}") == {"done": True, "note": None}
+
+
+@pytest.mark.parametrize("text", ["", "No JSON here.", '{"title": "The Glass', "```json\n```"])
+def test_unrecoverable_text_gives_none(text):
+    assert parse_json_lenient(text) is None
+
+
+def test_extract_json_from_markdown_returns_lists_and_dicts():
+    assert extract_json_from_markdown('```json\n[{"claim": "x"}]\n```') == [{"claim": "x"}]
+    assert extract_json_from_markdown('```json\n{"a": 1,}\n```') == {"a": 1}
@@ -0,0 +1,81 @@
+# tests/test_llm_cache.py
+from types import SimpleNamespace
+
+import pytest
+
+from libriscribe.utils import llm_cache
+from libriscribe.utils.llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.time() for the cache module."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def make_cache(tmp_path, **kwargs) -> LLMResponseCache:
+    cache = LLMResponseCache(**kwargs)
+    cache.attach(tmp_path)
+    return cache
+
+
+def test_detached_cache_is_a_no_op():
+    cache = LLMResponseCache()
+    cache.put("key", "response")
+    assert not cache.enabled
+    assert cache.get("key") is None
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = make_cache(tmp_path)
+    key = LLMResponseCache.make_key("openai", "gpt-4o-mini", "prompt", 100, 0.7)
+    assert cache.get(key) is None
+    cache.put(key, "response", "openai", "gpt-4o-mini")
+    assert cache.get(key) == "response"
+    stats = cache.stats()
+    assert (stats["entries"], stats["total_hits"], stats["total_misses"]) == (1, 1, 1)
+
+
+def test_key_covers_every_request_parameter():
+    base = LLMResponseCache.make_key("openai", "gpt-4o", "prompt", 100, 0.7)
+    assert base == LLMResponseCache.make_key("openai", "gpt-4o", "prompt", 100, 0.70001)
+    for changed in (
+        LLMResponseCache.make_key("claude", "gpt-4o", "prompt", 100, 0.7),
+        LLMResponseCache.make_key("openai", "gpt-4o-mini", "prompt", 100, 0.7),
+        LLMResponseCache.make_key("openai", "gpt-4o", "prompt!", 100, 0.7),
+        LLMResponseCache.make_key("openai", "gpt-4o", "prompt", 200, 0.7),
+        LLMResponseCache.make_key("openai", "gpt-4o", "prompt", 100, 0.2),
+        LLMResponseCache.make_key("openai", "gpt-4o", "prompt", 100, 0.7, prefix="context"),
+    ):
+        assert changed != base
+
+
+def test_evicts_least_recently_used_past_the_size_budget(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=250)
+    for key in ("a", "b"):
+        cache.put(key, "x" * 100)
+        clock[0] += 1
+    assert cache.get("a") is not None  # "a" is now more recently used than "b"
+    clock[0] += 1
+    cache.put("c", "x" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_expired_entries_are_misses_and_get_evicted(tmp_path, clock):
+    cache = make_cache(tmp_path, max_age_days=1)
+    cache.put("old", "response")
+    clock[0] += 2 * 24 * 3600
+    assert cache.get("old") is None
+    assert cache.evict() == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_survives_reopening(tmp_path):
+    make_cache(tmp_path).put("key", "response")
+    assert make_cache(tmp_path).get("key") == "response"
@@ -0,0 +1,78 @@
+# tests/test_pipeline.py
+import threading
+
+from libriscribe.utils.pipeline import Pipeline, Stage
+
+
+def recording_stage(name, log, fail=(), raise_on=()):
+    def run(item):
+        if item in raise_on:
+            raise RuntimeError(f"{name} broke on {item}")
+        log.append((name, item))
+        return item not in fail
+    return Stage(name, run)
+
+
+def test_every_stage_sees_items_in_order():
+    log, finished = [], []
+    pipeline = Pipeline([recording_stage(name, log) for name in ("write", "review", "edit")],
+                        queue_size=1, on_finish=lambda item, ok: finished.append((item, ok)))
+    stats = pipeline.run(range(1, 6))
+
+    for name in ("write", "review", "edit"):
+        assert [item for stage, item in log if stage == name] == [1, 2, 3, 4, 5]
+    assert finished == [(item, True) for item in range(1, 6)]
+    assert [stage.processed for stage in stats] == [5, 5, 5]
+    assert all(stage.max_queue_depth <= 1 for stage in stats)
+
+
+def test_failed_items_stop_there_and_are_reported_once():
+    log, finished = [], []
+    pipeline = Pipeline(
+        [recording_stage("write", log, fail={2}), recording_stage("review", log, raise_on={3}),
+         recording_stage("edit", log)],
+        on_finish=lambda item, ok: finished.append((item, ok)),
+    )
+    stats = pipeline.run([1, 2, 3, 4])
+
+    assert [item for stage, item in log if stage == "review"] == [1, 4]
+    assert [item for stage, item in log if stage == "edit"] == [1, 4]
+    assert sorted(finished) == [(1, True), (2, False), (3, False), (4, True)]
+    assert [(stage.processed, stage.failed) for stage in stats] == [(3, 1), (2, 1), (2, 0)]
+
+
+def test_stages_work_on_different_items_at_once():
+    second_started = threading.Event()
+    overlapped = []
+
+    def write(item):
+        if item == 2:
+            second_started.set()
+
+    def review(item):
+        if item == 1:
+            # Chapter 2 is drafted while chapter 1 is still in review
+            overlapped.append(second_started.wait(timeout=5))
+
+    Pipeline([Stage("write", write), Stage("review", review)]).run([1, 2])
+    assert overlapped == [True]
+
+
+def test_wait_for_runs_before_the_stage_and_counts_as_idle():
+    calls = []
+    stage = Stage("write", lambda item: calls.append(("run", item)), wait_for=lambda item: calls.append(("wait", item)))
+    Pipeline([stage]).run([1, 2])
+    assert calls == [("wait", 1), ("run", 1), ("wait", 2), ("run", 2)]
+
+
+def test_failing_on_finish_does_not_stop_the_pipeline():
+    def on_finish(item, ok):
+        raise RuntimeError("callback broke")
+
+    stats = Pipeline([Stage("write", lambda item: True)], on_finish=on_finish).run([1, 2, 3])
+    assert stats[0].processed == 3
+
+
+def test_empty_input_finishes():
+    stats = Pipeline([Stage("write", lambda item: True), Stage("review", lambda item: True)]).run([])
+    assert [stage.processed for stage in stats] == [0, 0]
@@ -0,0 +1,180 @@
+# tests/test_retry_policy.py
+from types import SimpleNamespace
+
+import pytest
+
+from libriscribe.utils import retry_policy
+from libriscribe.utils.llm_errors import (AuthError, CircuitHalfOpenError, CircuitOpenError, InvalidRequestError,
+                                          RateLimitedError, TransientError)
+from libriscribe.utils.retry_policy import CircuitBreaker, RetryBudget, RetryController
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.monotonic() for the retry policy module."""
+    now = [100.0]
+    monkeypatch.setattr(retry_policy, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def open_breaker(clock, threshold: int = 2) -> CircuitBreaker:
+    breaker = CircuitBreaker("openai", failure_threshold=threshold, cooldown_seconds=30, probe_timeout_seconds=60)
+    for _ in range(threshold):
+        breaker.before_call()
+        breaker.record_failure(TransientError("503"))
+    assert breaker.state == "open"
+    return breaker
+
+
+# --- CircuitBreaker ---
+
+def test_breaker_opens_after_the_failure_threshold(clock):
+    breaker = CircuitBreaker("openai", failure_threshold=3, cooldown_seconds=30)
+    for _ in range(2):
+        assert breaker.before_call() is False
+        breaker.record_failure(TransientError("503"))
+    assert breaker.state == "closed"
+    breaker.record_failure(TransientError("503"))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.fatal
+    assert raised.value.retry_after == pytest.approx(30)
+
+
+def test_request_specific_failures_do_not_trip_the_breaker(clock):
+    breaker = CircuitBreaker("openai", failure_threshold=1, cooldown_seconds=30)
+    breaker.record_failure(InvalidRequestError("bad request"))
+    breaker.record_failure(RateLimitedError("429"))
+    assert breaker.state == "closed"
+
+
+def test_fatal_failure_opens_at_once(clock):
+    breaker = CircuitBreaker("openai", failure_threshold=5, cooldown_seconds=30)
+    breaker.record_failure(AuthError("401"))
+    assert breaker.state == "open"
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 31
+    assert breaker.before_call() is True
+    assert breaker.state == "half_open"
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.before_call() is False
+
+
+def test_only_one_probe_at_a_time(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 31
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitHalfOpenError) as raised:
+        breaker.before_call()
+    assert not raised.value.fatal
+    assert 0 < raised.value.retry_after <= 1.5 * retry_policy.HALF_OPEN_POLL_SECONDS
+
+
+def test_failed_probe_reopens_and_releases_the_probe(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 31
+    assert breaker.before_call() is True
+    breaker.record_failure(TransientError("503"))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock[0] += 31
+    assert breaker.before_call() is True  # A new probe, not blocked by the failed one
+
+
+def test_released_probe_lets_the_next_call_probe(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 31
+    assert breaker.before_call() is True
+    breaker.release_probe()  # e.g. the probe call was cancelled
+    assert breaker.before_call() is True
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_stale_probe_is_taken_over_after_the_timeout(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 31
+    assert breaker.before_call() is True
+    clock[0] += 59
+    with pytest.raises(CircuitHalfOpenError):
+        breaker.before_call()
+    clock[0] += 2
+    assert breaker.before_call() is True
+
+
+# --- RetryBudget ---
+
+def test_budget_drains_and_refills_per_request():
+    budget = RetryBudget(ratio=0.5, reserve=2)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.record_request()
+    assert not budget.withdraw()  # Half a retry earned
+    budget.record_request()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_budget_never_exceeds_its_reserve():
+    budget = RetryBudget(ratio=1.0, reserve=2)
+    for _ in range(10):
+        budget.record_request()
+    assert [budget.withdraw() for _ in range(3)] == [True, True, False]
+
+
+# --- RetryController ---
+
+def make_controller(**overrides) -> RetryController:
+    settings = SimpleNamespace(
+        llm_max_retries={}, llm_retry_budget_ratio=0.1, llm_retry_budget_reserve=2,
+        llm_retry_backoff_seconds=1.0, llm_retry_backoff_max_seconds=8.0,
+        llm_circuit_failure_threshold=3, llm_circuit_cooldown_seconds=30.0, llm_circuit_probe_timeout_seconds=120.0,
+    )
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return RetryController(settings)
+
+
+def test_controller_stops_when_the_budget_is_spent():
+    controller = make_controller()
+    budget = controller.budget("scene_write")
+    error = TransientError("503")
+    assert controller.retry_delay(error, 1, budget) is not None
+    assert controller.retry_delay(error, 2, budget) is not None
+    assert controller.retry_delay(error, 3, budget) is None
+
+
+def test_rate_limit_retries_are_not_charged_to_the_budget():
+    controller = make_controller()
+    budget = controller.budget("review")
+    for attempt in range(1, 6):
+        assert controller.retry_delay(RateLimitedError("429"), attempt, budget) == 0.0
+    assert controller.retry_delay(RateLimitedError("429"), 6, budget) is None  # Past the kind's retry limit
+    assert budget.balance == 2
+
+
+def test_unlisted_kinds_are_not_retried():
+    controller = make_controller()
+    assert controller.retry_delay(AuthError("401"), 1, controller.budget(None)) is None
+    assert not controller.allows_retry("invalid_request")
+
+
+def test_transient_backoff_honours_retry_after():
+    controller = make_controller()
+    delay = controller.retry_delay(TransientError("503", retry_after=20.0), 1, controller.budget("x"))
+    assert delay == 20.0
+
+
+def test_budgets_and_breakers_are_shared_per_key():
+    controller = make_controller()
+    assert controller.budget("review") is controller.budget("review")
+    assert controller.budget("review") is not controller.budget("edit")
+    assert controller.breaker("openai") is controller.breaker("openai")
@@ -0,0 +1,90 @@
+# tests/test_review_store.py
+import pytest
+
+from libriscribe.agents.content_reviewer import ContentReviewerAgent
+from libriscribe.knowledge_base import ProjectKnowledgeBase
+from libriscribe.utils.llm_client import LLMClient
+from libriscribe.utils.review_store import ReviewStore, review_key
+
+CHAPTER = "## Chapter 1: Ledgers\n\nIlse closed the ledger."
+
+
+def test_stored_review_is_returned_for_the_same_text(tmp_path):
+    key = review_key(CHAPTER, "English", 1)
+    ReviewStore(tmp_path).put("chapter_1.md", key, "Tighten the opening.")
+    assert ReviewStore(tmp_path).get("chapter_1.md", review_key(CHAPTER, "English", 1)) == "Tighten the opening."
+
+
+def test_changed_text_language_or_prompt_invalidates_the_review(tmp_path):
+    store = ReviewStore(tmp_path)
+    store.put("chapter_1.md", review_key(CHAPTER, "English", 1), "Tighten the opening.")
+    assert store.get("chapter_1.md", review_key(CHAPTER + " She left.", "English", 1)) is None
+    assert store.get("chapter_1.md", review_key(CHAPTER, "Spanish", 1)) is None
+    assert store.get("chapter_1.md", review_key(CHAPTER, "English", 2)) is None
+
+
+def test_reviews_are_kept_per_chapter_file(tmp_path):
+    store = ReviewStore(tmp_path)
+    key = review_key(CHAPTER, "English", 1)
+    store.put("chapter_1.md", key, "First review.")
+    store.put("chapter_1_revised.md", key, "Revised review.")
+    assert store.get("chapter_1.md", key) == "First review."
+    assert store.get("chapter_1_revised.md", key) == "Revised review."
+    assert store.get("chapter_2.md", key) is None
+
+
+def test_a_new_review_replaces_the_stale_one(tmp_path):
+    store = ReviewStore(tmp_path)
+    old, new = review_key(CHAPTER, "English", 1), review_key(CHAPTER + " Edited.", "English", 1)
+    store.put("chapter_1.md", old, "Old review.")
+    store.put("chapter_1.md", new, "New review.")
+    assert store.get("chapter_1.md", old) is None
+    assert store.get("chapter_1.md", new) == "New review."
+
+
+def test_missing_store_has_no_reviews(tmp_path):
+    assert ReviewStore(tmp_path).get("chapter_1.md", review_key(CHAPTER, "English", 1)) is None
+
+
+# --- ContentReviewerAgent ---
+
+@pytest.fixture
+def reviewer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # No stray .env
+    for name, value in {"MOCK_LATENCY_MS": "0", "LLM_REQUESTS_PER_MINUTE": "0", "LLM_TOKENS_PER_MINUTE": "0"}.items():
+        monkeypatch.setenv(name, value)
+    reviewer = ContentReviewerAgent(LLMClient("mock"))
+    reviewer.calls = 0
+    generate = reviewer.llm_client.generate_content
+
+    def counting_generate(*args, **kwargs):
+        reviewer.calls += 1
+        return generate(*args, **kwargs)
+    reviewer.llm_client.generate_content = counting_generate
+    return reviewer
+
+
+def write_project(project_dir, language: str) -> str:
+    ProjectKnowledgeBase(project_name="reviews", title="The Glass Archive", language=language).save_to_file(
+        str(project_dir / "project_data.json"))
+    chapter_path = project_dir / "chapter_1.md"
+    if not chapter_path.exists():
+        chapter_path.write_text(CHAPTER, encoding="utf-8")
+    return str(chapter_path)
+
+
+def test_reviewer_reuses_reviews_until_text_or_language_changes(reviewer, tmp_path):
+    chapter_path = write_project(tmp_path, "English")
+    first = reviewer.execute(chapter_path)["review"]
+    assert reviewer.execute(chapter_path)["review"] == first
+    assert reviewer.calls == 1
+
+    (tmp_path / "chapter_1.md").write_text(CHAPTER + " She left.", encoding="utf-8")
+    reviewer.execute(chapter_path)
+    assert reviewer.calls == 2
+
+    write_project(tmp_path, "Spanish")
+    reviewer.execute(chapter_path)
+    assert reviewer.calls == 3
+    reviewer.execute(chapter_path)
+    assert reviewer.calls == 3
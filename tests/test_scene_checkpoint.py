@@ -0,0 +1,147 @@
+# tests/test_scene_checkpoint.py
+import pytest
+
+from libriscribe.agents.chapter_writer import ChapterWriterAgent
+from libriscribe.codex import FactEstablished, MasterCodex
+from libriscribe.knowledge_base import Chapter, ProjectKnowledgeBase, Scene
+from libriscribe.utils.llm_client import LLMClient
+from libriscribe.utils.llm_errors import TransientError
+from libriscribe.utils.scene_checkpoint import SceneCheckpoint
+
+KEY = SceneCheckpoint.scene_key("outline", "context")
+
+
+# --- SceneCheckpoint ---
+
+def test_saved_scene_is_restored_by_a_new_checkpoint(tmp_path):
+    SceneCheckpoint(tmp_path, 2).save(1, KEY, "**Scene 1**\n\nText.")
+    assert SceneCheckpoint.pending(tmp_path, 2)
+    assert SceneCheckpoint(tmp_path, 2).completed(1, KEY) == "**Scene 1**\n\nText."
+
+
+def test_changed_key_or_failed_scene_is_not_restored(tmp_path):
+    checkpoint = SceneCheckpoint(tmp_path, 1)
+    checkpoint.save(1, KEY, "Text.")
+    checkpoint.save(2, KEY, "", failed=True)
+    assert checkpoint.completed(1, SceneCheckpoint.scene_key("outline", "other context")) is None
+    assert checkpoint.completed(1, SceneCheckpoint.scene_key("other outline", "context")) is None
+    assert checkpoint.completed(2, KEY) is None
+    assert checkpoint.completed(3, KEY) is None
+
+
+def test_finish_removes_the_work_directory(tmp_path):
+    checkpoint = SceneCheckpoint(tmp_path, 1)
+    checkpoint.save(1, KEY, "Text.")
+    checkpoint.finish()
+    assert not SceneCheckpoint.pending(tmp_path, 1)
+    assert not checkpoint.dir.parent.exists()
+
+
+def test_finish_keeps_chapters_with_failed_scenes(tmp_path):
+    checkpoint = SceneCheckpoint(tmp_path, 1)
+    checkpoint.save(1, KEY, "Text.")
+    checkpoint.save(2, KEY, "", failed=True)
+    checkpoint.finish()
+    assert SceneCheckpoint.pending(tmp_path, 1)
+    assert checkpoint.failed_scenes() == 1
+
+
+def test_unreadable_manifest_starts_over(tmp_path):
+    checkpoint = SceneCheckpoint(tmp_path, 1)
+    checkpoint.save(1, KEY, "Text.")
+    checkpoint.manifest_path.write_text("{not json", encoding="utf-8")
+    assert SceneCheckpoint(tmp_path, 1).completed(1, KEY) is None
+
+
+# --- Resuming a chapter ---
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # No stray .env
+    for name, value in {"MOCK_LATENCY_MS": "0", "LLM_REQUESTS_PER_MINUTE": "0", "LLM_TOKENS_PER_MINUTE": "0",
+                        "STORY_SUMMARIES_ENABLED": "false"}.items():
+        monkeypatch.setenv(name, value)
+    return ChapterWriterAgent(LLMClient("mock"))
+
+
+@pytest.fixture
+def kb(tmp_path):
+    kb = ProjectKnowledgeBase(project_name="resume", title="The Glass Archive", genre="Fantasy", category="Fiction")
+    kb.project_dir = tmp_path
+    kb.add_chapter(Chapter(chapter_number=1, title="Ledgers", summary="Ilse finds a forged ledger.", scenes=[
+        Scene(scene_number=number, summary=f"Scene {number} of the chapter", characters=["Ilse"], setting="Archive")
+        for number in (1, 2, 3)
+    ]))
+    return kb
+
+
+class SceneCalls:
+    """Records which scenes the writer asks the LLM for, optionally failing one with a transient error."""
+
+    def __init__(self, writer: ChapterWriterAgent, failing_scene=None):
+        self.calls = []
+        client = writer.llm_client
+        for name in ("generate_content", "generate_stream"):
+            setattr(client, name, self._wrap(getattr(type(client), name).__get__(client), failing_scene))
+        generate = type(client).agenerate_content.__get__(client)
+
+        async def agenerate_content(prompt, *args, **kwargs):
+            self._record(prompt, failing_scene)
+            return await generate(prompt, *args, **kwargs)
+        client.agenerate_content = agenerate_content
+
+    def _record(self, prompt: str, failing_scene) -> None:
+        number = next(n for n in (1, 2, 3) if f"**Scene {n}:" in prompt)
+        self.calls.append(number)
+        if number == failing_scene:
+            raise TransientError("503")
+
+    def _wrap(self, method, failing_scene):
+        def call(prompt, *args, **kwargs):
+            self._record(prompt, failing_scene)
+            return method(prompt, *args, **kwargs)
+        return call
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_rerun_regenerates_only_the_failed_scene(writer, kb, tmp_path, concurrency):
+    writer.llm_client.settings.scene_concurrency = concurrency
+    first = SceneCalls(writer, failing_scene=2)
+    writer.execute(kb, 1)
+    assert sorted(first.calls) == [1, 2, 3]
+    assert SceneCheckpoint.pending(tmp_path, 1)
+    assert "[Scene 2 content unavailable]" in (tmp_path / "chapter_1.md").read_text(encoding="utf-8")
+
+    rerun = SceneCalls(writer)
+    writer.execute(kb, 1)
+    assert rerun.calls == [2]
+    assert not SceneCheckpoint.pending(tmp_path, 1)
+    chapter = (tmp_path / "chapter_1.md").read_text(encoding="utf-8")
+    assert "content unavailable" not in chapter
+    positions = [chapter.find(f"**Scene {n}:") for n in (1, 2, 3)]
+    assert -1 not in positions and positions == sorted(positions)
+
+
+def test_codex_changes_keep_finished_scenes(writer, kb, tmp_path):
+    SceneCalls(writer, failing_scene=3)
+    writer.execute(kb, 1)
+    chapter, scene = kb.get_chapter(1), kb.get_chapter(1).scenes[0]
+    before = writer.build_scene_prompt(kb, chapter, scene, 3, writer.load_codex(tmp_path))
+
+    codex = MasterCodex(project_name="resume")
+    codex.add_fact(FactEstablished(fact="Ilse cannot read mirrored script.", chapter_established=0))
+    codex.save_to_file(str(tmp_path / "codex.json"))
+    assert writer.build_scene_prompt(kb, chapter, scene, 3, writer.load_codex(tmp_path)) != before
+
+    rerun = SceneCalls(writer)
+    writer.execute(kb, 1)
+    assert rerun.calls == [3]
+
+
+def test_outline_changes_rewrite_the_scene(writer, kb):
+    SceneCalls(writer, failing_scene=3)
+    writer.execute(kb, 1)
+    kb.get_chapter(1).scenes[0].summary = "Ilse burns the ledger instead"
+    rerun = SceneCalls(writer)
+    writer.execute(kb, 1)
+    assert sorted(rerun.calls) == [1, 3]